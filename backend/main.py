@@ -1,5 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from services import face_executor, attendance_ingest, identity_cache, qr_rotation, session_sweeper
+from utils import metrics
+from utils.db import SessionLocal, engine
+from utils.migrations import check_schema
+from utils.config import FACE_PRELOAD, ATTENDANCE_WRITE_BEHIND
 
 # Import Routers
 from routes import (
@@ -35,11 +40,68 @@ app.include_router(face_registration_routes.router, prefix="/face-registration",
 app.include_router(teacher_override_routes.router, prefix="/teacher", tags=["Teacher Override"])
 app.include_router(teacher_routes.router, prefix="/teacher", tags=["Teacher"])   # <-- ✅ ADDED THIS LINE
 
+# Startup: refuse to run on an unmigrated database (scripts/migrate.py applies migrations)
+@app.on_event("startup")
+def require_current_schema():
+    print(f"🗄️ Schema version {check_schema(engine)}")
+
+# Startup: start + warm the face inference pool (skipped on non-face workers)
+@app.on_event("startup")
+def preload_face_model():
+    if FACE_PRELOAD:
+        face_executor.start()
+
+@app.on_event("shutdown")
+def stop_face_pool():
+    face_executor.shutdown()
+
+# Startup: replay any leftover ingest log, then start the attendance flusher
+@app.on_event("startup")
+def start_attendance_ingest():
+    if ATTENDANCE_WRITE_BEHIND:
+        attendance_ingest.start()
+
+@app.on_event("shutdown")
+def stop_attendance_ingest():
+    attendance_ingest.stop()
+
+# Startup: background expiry of QR sessions (keeps GET /qr/active-session read-only)
+@app.on_event("startup")
+async def start_session_sweeper():
+    session_sweeper.start()
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    await session_sweeper.stop()
+
+# Startup: pre-render rotating QR images ahead of each rotation
+@app.on_event("startup")
+def start_qr_prerender():
+    qr_rotation.start()
+
+@app.on_event("shutdown")
+def stop_qr_prerender():
+    qr_rotation.stop()
+
+# Startup: load the roster into the identity cache (name / usn / teacher lookups)
+@app.on_event("startup")
+def warm_identity_cache():
+    db = SessionLocal()
+    try:
+        print(f"👥 Identity cache warmed with {identity_cache.warm(db)} users")
+    finally:
+        db.close()
+
 # Root Endpoint
 @app.get("/")
 def home():
     return {"message": "Smart Attendance Backend Running ✅"}
 
+# In-process metrics (batch sizes, queue depths, ...)
+@app.get("/metrics")
+def get_metrics():
+    return metrics.snapshot()
+
 # Run App (Local)
 if __name__ == "__main__":
     import uvicorn
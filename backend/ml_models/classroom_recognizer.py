@@ -0,0 +1,60 @@
+# 1:N identification of every face in a classroom photo against the
+# registered embeddings of the students in a section.
+# All faces are compared to all students with one NumPy similarity matrix
+# instead of one DeepFace.verify call per (face, student) pair.
+import numpy as np
+from services import face_embedding_service
+from utils.config import FACE_DISTANCE_THRESHOLD
+
+
+def load_enrolled_embeddings(usns):
+    """
+    Load stored embeddings for a list of students.
+    Returns (usns_with_embedding, matrix of shape (m, dim), usns_missing_embedding).
+    """
+    found, vectors, missing = [], [], []
+    for usn in usns:
+        embedding = face_embedding_service.load_embedding(usn)
+        if embedding is None:
+            missing.append(usn)
+            continue
+        found.append(usn)
+        vectors.append(embedding)
+    matrix = np.stack(vectors).astype(np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+    return found, matrix, missing
+
+
+def _normalize_rows(m):
+    m = np.asarray(m, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def distance_matrix(face_embeddings, enrolled_matrix):
+    """Cosine distances, shape (faces, students)."""
+    return 1.0 - _normalize_rows(face_embeddings) @ _normalize_rows(enrolled_matrix).T
+
+
+def identify(face_embeddings, enrolled_usns, enrolled_matrix, threshold=FACE_DISTANCE_THRESHOLD):
+    """
+    Match detected faces to students.
+    Closest pairs are assigned first and every face / student is used at most
+    once, so two faces can never mark the same student.
+    Returns a list of (face_index, usn, distance).
+    """
+    if len(face_embeddings) == 0 or len(enrolled_usns) == 0:
+        return []
+
+    dist = distance_matrix(face_embeddings, enrolled_matrix)
+    candidates = np.argwhere(dist <= threshold)
+    order = np.argsort(dist[candidates[:, 0], candidates[:, 1]], kind="stable")
+
+    used_faces, used_students, matches = set(), set(), []
+    for face_idx, student_idx in candidates[order]:
+        if face_idx in used_faces or student_idx in used_students:
+            continue
+        used_faces.add(face_idx)
+        used_students.add(student_idx)
+        matches.append((int(face_idx), enrolled_usns[student_idx], float(dist[face_idx, student_idx])))
+    return matches
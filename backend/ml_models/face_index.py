@@ -0,0 +1,299 @@
+# Approximate nearest-neighbour index over all enrolled face embeddings.
+# IVF (inverted file) in plain NumPy: embeddings are L2-normalized and grouped
+# under k-means centroids; a query only scans the `nprobe` closest lists.
+# Small indexes (< MIN_TRAIN_SIZE) are searched exactly.
+#
+# Persistence: a snapshot (.npz) plus an append-only log of enrollments since
+# the snapshot, so adding a student does not rewrite the whole index. Other
+# workers pick up new log entries / snapshots on their next query.
+import fcntl
+import os
+import struct
+import threading
+from contextlib import contextmanager
+import numpy as np
+from utils.config import FACE_INDEX_PATH, FACE_INDEX_NPROBE
+
+MIN_TRAIN_SIZE = 256      # below this, exact search is fast enough
+RETRAIN_GROWTH = 4        # retrain once the index is this many times its trained size
+COMPACT_LOG_ENTRIES = 1000
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+
+
+def _normalize(v):
+    v = np.asarray(v, dtype=np.float32)
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.where(norm == 0, 1.0, norm)
+
+
+def _kmeans(data, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means on normalized rows; returns (k, dim) centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        for c in range(k):
+            members = data[assign == c]
+            # re-seed empty lists with a random point
+            centroids[c] = members.sum(axis=0) if len(members) else data[rng.integers(len(data))]
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class FaceIndex:
+    def __init__(self, nprobe: int = FACE_INDEX_NPROBE):
+        self.nprobe = nprobe
+        self.usns = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.rows = {}             # usn -> row in vectors
+        self.centroids = None      # (k, dim) once trained
+        self.assign = np.zeros(0, dtype=np.int64)
+        self.lists = []            # row ids per centroid
+        self.trained_size = 0
+
+    def __len__(self):
+        return len(self.usns)
+
+    # ---------- build / update ----------
+
+    def _ensure_capacity(self, dim):
+        if self.vectors.shape[1] == 0:
+            self.vectors = np.zeros((64, dim), dtype=np.float32)
+            self.assign = np.zeros(64, dtype=np.int64)
+        elif len(self.usns) == len(self.vectors):
+            # double the backing arrays so adds stay amortized O(dim)
+            self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+            self.assign = np.concatenate([self.assign, np.zeros_like(self.assign)])
+
+    def add(self, usn: str, embedding):
+        """Add or replace one student's embedding (O(dim * lists))."""
+        vec = _normalize(embedding).ravel()
+        if usn in self.rows:
+            self.remove(usn)
+        self._ensure_capacity(len(vec))
+        row = len(self.usns)
+        self.usns.append(usn)
+        self.vectors[row] = vec
+        self.rows[usn] = row
+
+        if self.centroids is not None:
+            c = int(np.argmax(self.centroids @ vec))
+            self.assign[row] = c
+            self.lists[c].append(row)
+
+        n = len(self.usns)
+        if (self.centroids is None and n >= MIN_TRAIN_SIZE) or \
+                (self.centroids is not None and n >= self.trained_size * RETRAIN_GROWTH):
+            self.train()
+
+    def remove(self, usn: str):
+        row = self.rows.pop(usn, None)
+        if row is None:
+            return
+        last = len(self.usns) - 1
+        if self.centroids is not None:
+            self.lists[self.assign[row]].remove(row)
+        if row != last:
+            # move the last row into the hole
+            moved = self.usns[last]
+            self.usns[row] = moved
+            self.vectors[row] = self.vectors[last]
+            self.rows[moved] = row
+            if self.centroids is not None:
+                lst = self.lists[self.assign[last]]
+                lst[lst.index(last)] = row
+                self.assign[row] = self.assign[last]
+        self.usns.pop()
+
+    def train(self):
+        """(Re)build centroids and inverted lists from the current vectors."""
+        n = len(self.usns)
+        if n < MIN_TRAIN_SIZE:
+            self.centroids, self.lists, self.trained_size = None, [], 0
+            return
+        data = self.vectors[:n]
+        k = max(1, int(np.sqrt(n)))
+        sample_size = min(n, k * KMEANS_SAMPLE_PER_LIST)
+        sample = data[np.random.default_rng(0).choice(n, size=sample_size, replace=False)]
+        self.centroids = _kmeans(sample, k)
+        self.assign[:n] = np.argmax(data @ self.centroids.T, axis=1)
+        self.lists = [[] for _ in range(k)]
+        for row, c in enumerate(self.assign[:n]):
+            self.lists[c].append(row)
+        self.trained_size = n
+
+    # ---------- query ----------
+
+    def search_exact(self, embedding, k: int = 5):
+        n = len(self.usns)
+        if n == 0:
+            return []
+        q = _normalize(embedding).ravel()
+        return self._top_k(np.arange(n), self.vectors[:n] @ q, k)
+
+    def search(self, embedding, k: int = 5, nprobe: int = None):
+        """Top-k (usn, cosine distance) pairs, closest first."""
+        if self.centroids is None:
+            return self.search_exact(embedding, k)
+        q = _normalize(embedding).ravel()
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+        rows = [r for c in probe for r in self.lists[c]]
+        if not rows:
+            return []
+        rows = np.asarray(rows, dtype=np.int64)
+        return self._top_k(rows, self.vectors[rows] @ q, k)
+
+    def _top_k(self, rows, sims, k):
+        k = min(k, len(rows))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(self.usns[rows[i]], max(0.0, float(1.0 - sims[i]))) for i in top]
+
+    # ---------- persistence ----------
+
+    def save(self, path: str):
+        n = len(self.usns)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp,
+            usns=np.array(self.usns, dtype=str),  # fixed-width unicode: loads without pickle
+            vectors=self.vectors[:n],
+            centroids=self.centroids if self.centroids is not None else np.zeros((0, 0), dtype=np.float32),
+            trained_size=np.array(self.trained_size)
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        index = cls()
+        try:
+            with np.load(path) as data:
+                usns = [str(u) for u in data["usns"]]
+                vectors = data["vectors"].astype(np.float32)
+                centroids = data["centroids"]
+                trained_size = int(data["trained_size"])
+        except ValueError as e:
+            # Snapshots written before usns were saved as str hold a pickled object array
+            raise ValueError(f"{path}: unreadable face index snapshot, rebuild it with scripts/build_face_index.py ({e})")
+        index.usns = usns
+        index.rows = {u: i for i, u in enumerate(usns)}
+        index.vectors = vectors if len(vectors) else np.zeros((0, 0), dtype=np.float32)
+        index.assign = np.zeros(len(vectors), dtype=np.int64)
+        if len(centroids):
+            index.centroids = centroids.astype(np.float32)
+            index.assign[:] = np.argmax(vectors @ index.centroids.T, axis=1)
+            index.lists = [[] for _ in range(len(centroids))]
+            for row, c in enumerate(index.assign):
+                index.lists[c].append(row)
+            index.trained_size = trained_size
+        return index
+
+
+# ---------------------------------------------------
+# Process-wide index backed by FACE_INDEX_PATH (+ .log)
+# ---------------------------------------------------
+_lock = threading.Lock()
+_index = None
+_snapshot_mtime = None
+_log_offset = 0
+_log_entries = 0
+
+
+def _log_path():
+    return FACE_INDEX_PATH + ".log"
+
+
+@contextmanager
+def _file_lock():
+    """Serialize log appends / compaction across worker processes."""
+    os.makedirs(os.path.dirname(FACE_INDEX_PATH), exist_ok=True)
+    with open(FACE_INDEX_PATH + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _encode_entry(usn: str, vec):
+    usn_bytes = usn.encode("utf-8")
+    vec = np.asarray(vec, dtype=np.float32).ravel()
+    return struct.pack("<HI", len(usn_bytes), len(vec)) + usn_bytes + vec.tobytes()
+
+
+def _replay_log(index):
+    """Apply log entries written since our last read (possibly by another worker)."""
+    global _log_offset, _log_entries
+    path = _log_path()
+    if not os.path.exists(path) or os.path.getsize(path) <= _log_offset:
+        return
+    with open(path, "rb") as f:
+        f.seek(_log_offset)
+        data = f.read()
+    pos = 0
+    while pos + 6 <= len(data):
+        usn_len, dim = struct.unpack_from("<HI", data, pos)
+        end = pos + 6 + usn_len + dim * 4
+        if end > len(data):
+            break  # partially written entry; pick it up next time
+        usn = data[pos + 6:pos + 6 + usn_len].decode("utf-8")
+        vec = np.frombuffer(data, dtype=np.float32, count=dim, offset=pos + 6 + usn_len)
+        index.add(usn, vec)
+        _log_entries += 1
+        pos = end
+    _log_offset += pos
+
+
+def _refresh():
+    """Load the snapshot if it changed on disk, then replay new log entries."""
+    global _index, _snapshot_mtime, _log_offset, _log_entries
+    mtime = os.stat(FACE_INDEX_PATH).st_mtime_ns if os.path.exists(FACE_INDEX_PATH) else None
+    if _index is None or mtime != _snapshot_mtime:
+        _index = FaceIndex.load(FACE_INDEX_PATH) if mtime is not None else FaceIndex()
+        _snapshot_mtime, _log_offset, _log_entries = mtime, 0, 0
+    _replay_log(_index)
+    return _index
+
+
+def _compact(index):
+    """Write a fresh snapshot and truncate the log (caller holds the file lock)."""
+    global _snapshot_mtime, _log_offset, _log_entries
+    index.save(FACE_INDEX_PATH)
+    open(_log_path(), "wb").close()
+    _snapshot_mtime = os.stat(FACE_INDEX_PATH).st_mtime_ns
+    _log_offset, _log_entries = 0, 0
+
+
+def add(usn: str, embedding):
+    """Add one enrollment to the shared index (appends to the log, compacts occasionally)."""
+    global _log_offset, _log_entries
+    with _lock, _file_lock():
+        index = _refresh()
+        index.add(usn, embedding)
+        entry = _encode_entry(usn, embedding)
+        with open(_log_path(), "ab") as f:
+            f.write(entry)
+        _log_offset += len(entry)
+        _log_entries += 1
+        if _log_entries >= COMPACT_LOG_ENTRIES:
+            _compact(index)
+
+
+def search(embedding, k: int = 5):
+    with _lock:
+        return _refresh().search(embedding, k)
+
+
+def rebuild(entries):
+    """Replace the shared index with (usn, embedding) pairs and persist it."""
+    global _index
+    with _lock, _file_lock():
+        index = FaceIndex()
+        for usn, embedding in entries:
+            index.add(usn, embedding)
+        index.train()
+        _compact(index)
+        _index = index
+    return len(index)
@@ -0,0 +1,178 @@
+# Face model lifecycle: DeepFace/TensorFlow is imported lazily, the recognizer
+# is built once per process and warmed up with a dummy inference.
+# Workers that never serve face routes never pay for the import.
+# preprocess/forward reuse deepface internals (deepface.modules.*, the
+# recognizer's Keras model), so deepface is pinned in requirements.txt.
+import threading
+import numpy as np
+from utils.config import FACE_MODEL_NAME
+
+COLD, LOADING, READY, FAILED = "cold", "loading", "ready", "failed"
+
+# Keras-backed recognizers: a whole batch goes through the tf.keras model in one call
+KERAS_MODELS = {"VGG-Face", "Facenet", "Facenet512", "OpenFace", "DeepFace", "DeepID", "ArcFace", "GhostFaceNet"}
+# Other backends: one face at a time through the recognizer's own forward()
+PER_IMAGE_MODELS = {"Dlib", "SFace"}
+
+_lock = threading.Lock()
+_state = COLD
+_error = None
+
+
+def _deepface():
+    from deepface import DeepFace  # heavy import, deferred until first use
+    return DeepFace
+
+
+def load():
+    """Build the recognizer and run a warm-up inference. Safe to call repeatedly."""
+    global _state, _error
+    with _lock:
+        if _state == READY:
+            return True
+        _state = LOADING
+        try:
+            if FACE_MODEL_NAME not in KERAS_MODELS | PER_IMAGE_MODELS:
+                raise ValueError(
+                    f"unsupported FACE_MODEL_NAME, use one of {sorted(KERAS_MODELS | PER_IMAGE_MODELS)}"
+                )
+            _recognizer()
+            # First inference also builds the detector and traces the graph
+            forward(preprocess(np.zeros((224, 224, 3), dtype=np.uint8)))
+        except Exception as e:
+            _state, _error = FAILED, str(e)
+            print(f"❌ Face model {FACE_MODEL_NAME} failed to load: {e}")
+            return False
+        _state, _error = READY, None
+        print(f"✅ Face model {FACE_MODEL_NAME} loaded and warmed up")
+        return True
+
+
+def load_in_background():
+    """Start loading without blocking the caller (no-op if already loading/ready)."""
+    if _state in (LOADING, READY):
+        return
+    threading.Thread(target=load, name="face-model-loader", daemon=True).start()
+
+
+def is_ready():
+    return _state == READY
+
+
+def status():
+    return {"model": FACE_MODEL_NAME, "state": _state, "error": _error}
+
+
+def _recognizer():
+    return _deepface().build_model(FACE_MODEL_NAME)  # cached inside DeepFace after first build
+
+
+def _to_model_input(face):
+    """Shape one extracted face (RGB, 0-1) into a (1, h, w, 3) model input."""
+    from deepface.modules import preprocessing
+
+    face = face[:, :, ::-1]  # RGB -> BGR, as in DeepFace.represent
+    target_size = _recognizer().input_shape
+    face = preprocessing.resize_image(img=face, target_size=(target_size[1], target_size[0]))
+    return preprocessing.normalize_input(img=face, normalization="base")
+
+
+def _extract_faces(img, detector_backend="opencv"):
+    from deepface.modules import detection
+
+    return detection.extract_faces(
+        img_path=img,
+        detector_backend=detector_backend,
+        grayscale=False,
+        enforce_detection=False,
+        align=True
+    )
+
+
+def preprocess(img):
+    """
+    Detect + align the first face in an image (path or BGR array) and shape it
+    into a (1, h, w, 3) model input, the same way DeepFace.represent does.
+    """
+    return _to_model_input(_extract_faces(img)[0]["face"])
+
+
+def forward(batch):
+    """One forward pass over an (n, h, w, 3) batch, returns (n, dim) embeddings."""
+    recognizer = _recognizer()
+    if FACE_MODEL_NAME in KERAS_MODELS:
+        out = recognizer.model(batch, training=False)
+    else:
+        out = [recognizer.forward(batch[i:i + 1]) for i in range(len(batch))]
+    return np.asarray(out, dtype=np.float32)
+
+
+def represent_batch(images):
+    """
+    Embed several images with a single forward pass.
+    Returns one entry per image: an embedding array, or the Exception raised
+    while preprocessing that image (other images in the batch are unaffected).
+    """
+    if _state != READY:
+        load()
+
+    results = [None] * len(images)
+    inputs, slots = [], []
+    for i, img in enumerate(images):
+        try:
+            inputs.append(preprocess(img))
+            slots.append(i)
+        except Exception as e:
+            results[i] = e
+
+    if inputs:
+        embeddings = forward(np.concatenate(inputs, axis=0))
+        for i, embedding in zip(slots, embeddings):
+            results[i] = embedding
+    return results
+
+
+def represent(img):
+    """Embedding of the first face in an image (path or BGR array)."""
+    result = represent_batch([img])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def represent_all_faces(img, detector_backend="opencv"):
+    """
+    Detect every face in a (group) image and embed all of them in one forward pass.
+    Returns (embeddings of shape (n, dim), list of facial_area dicts).
+    """
+    if _state != READY:
+        load()
+
+    # With enforce_detection=False DeepFace returns the whole image with
+    # confidence 0 when nothing is found — that is not a face.
+    faces = [f for f in _extract_faces(img, detector_backend) if f.get("confidence", 1) > 0]
+    if not faces:
+        return np.zeros((0, 0), dtype=np.float32), []
+
+    batch = np.concatenate([_to_model_input(f["face"]) for f in faces], axis=0)
+    return forward(batch), [f["facial_area"] for f in faces]
+
+
+def normalize_face(img, size: int = 224):
+    """
+    Enrollment preprocessing: detect + align + crop the first face once.
+    Returns (size x size BGR uint8 crop, embedding, detector confidence).
+    Confidence 0 means no face was found.
+    """
+    if _state != READY:
+        load()
+    from deepface.modules import preprocessing
+
+    extracted = _extract_faces(img)[0]
+    face = extracted["face"]
+    embedding = forward(_to_model_input(face))[0]
+
+    # aspect-preserving pad + resize, same helper the model input uses
+    crop = preprocessing.resize_image(img=face[:, :, ::-1], target_size=(size, size))[0]
+    crop = np.clip(crop * 255.0, 0, 255).round().astype(np.uint8)
+    return crop, embedding, float(extracted.get("confidence", 1))
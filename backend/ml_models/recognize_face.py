@@ -1,22 +1,116 @@
-# Example script to test recognition on a single image
+# Example script to test recognition on a single image, plus a batch mode
+# for auditing many frames:
+#   python -m ml_models.recognize_face img.jpg
+#   python -m ml_models.recognize_face --batch frames/ more.jpg @list.txt --workers 8 --out audit.jsonl
 import cv2, os
+import argparse
+import json
+import multiprocessing
+import sys
+import time
 from services.facial_service import MODEL_PATH
 
-def recognize(image_path):
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.read(MODEL_PATH)
-    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+# Loaded once per process (per worker in batch mode)
+_recognizer = None
+_cascade = None
+_max_side = 640
+
+def _init_worker(max_side=640, single_thread=True):
+    global _recognizer, _cascade, _max_side
+    if single_thread:
+        cv2.setNumThreads(1)  # parallelism comes from the process pool
+    _recognizer = cv2.face.LBPHFaceRecognizer_create()
+    _recognizer.read(MODEL_PATH)
     cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    face_cascade = cv2.CascadeClassifier(cascade_path)
-    faces = face_cascade.detectMultiScale(img, scaleFactor=1.1, minNeighbors=4)
-    if len(faces) == 0:
+    _cascade = cv2.CascadeClassifier(cascade_path)
+    _max_side = max_side
+
+def recognize_one(image_path):
+    """Detect on a downscaled copy, predict on the full-resolution crop. Returns a result dict."""
+    try:
+        return _recognize_one(image_path)
+    except Exception as e:
+        # one bad frame must not abort a batch of thousands
+        return {"path": image_path, "label": None, "confidence": None, "faces": 0, "error": str(e)}
+
+def _recognize_one(image_path):
+    t0 = time.perf_counter()
+    result = {"path": image_path, "label": None, "confidence": None, "faces": 0}
+    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    t1 = time.perf_counter()
+    if img is None:
+        result["error"] = "unreadable"
+    else:
+        scale = min(1.0, _max_side / max(img.shape[:2]))
+        small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else img
+        faces = _cascade.detectMultiScale(small, scaleFactor=1.1, minNeighbors=4)
+        result["faces"] = len(faces)
+    t2 = time.perf_counter()
+    if img is not None and len(faces):
+        (x, y, w, h) = (int(v / scale) for v in faces[0])
+        label, conf = _recognizer.predict(img[y:y+h, x:x+w])
+        result["label"], result["confidence"] = int(label), float(conf)
+    t3 = time.perf_counter()
+    result["timings_ms"] = {
+        "read": round((t1 - t0) * 1000, 2),
+        "detect": round((t2 - t1) * 1000, 2),
+        "predict": round((t3 - t2) * 1000, 2),
+        "total": round((t3 - t0) * 1000, 2)
+    }
+    return result
+
+def recognize(image_path):
+    if _recognizer is None:
+        _init_worker(single_thread=False)
+    result = recognize_one(image_path)
+    if not result["faces"]:
         print("No face")
         return
-    (x,y,w,h) = faces[0]
-    face = img[y:y+h, x:x+w]
-    label, conf = recognizer.predict(face)
-    print("label:", label, "conf:", conf)
+    print("label:", result["label"], "conf:", result["confidence"])
+
+def iter_paths(inputs):
+    """Expand directories (recursively), @file lists and plain paths."""
+    for item in inputs:
+        if item.startswith("@"):
+            with open(item[1:]) as f:
+                yield from (line.strip() for line in f if line.strip())
+        elif os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for fname in sorted(files):
+                    if os.path.splitext(fname)[1].lower() in IMAGE_EXTS:
+                        yield os.path.join(root, fname)
+        else:
+            yield item
+
+def run_batch(inputs, workers=None, max_side=640, out=sys.stdout, chunksize=8):
+    """Fan images out over a process pool and stream one JSON line per image as it finishes."""
+    count = 0
+    with multiprocessing.Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(max_side,)) as pool:
+        for result in pool.imap_unordered(recognize_one, iter_paths(inputs), chunksize=chunksize):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            count += 1
+    return count
 
 if __name__ == "__main__":
-    import sys
-    recognize(sys.argv[1])
+    parser = argparse.ArgumentParser(description="LBPH face recognition")
+    parser.add_argument("inputs", nargs="+", help="image, directory or @file-list")
+    parser.add_argument("--batch", action="store_true", help="JSONL output, parallel workers")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-side", type=int, default=640, help="downscale longest side before detection")
+    parser.add_argument("--out", default="-", help="JSONL output file (default stdout)")
+    args = parser.parse_args()
+
+    if not args.batch:
+        recognize(args.inputs[0])
+    else:
+        out = sys.stdout if args.out == "-" else open(args.out, "w")
+        start = time.perf_counter()
+        try:
+            n = run_batch(args.inputs, args.workers, args.max_side, out)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"Processed {n} images in {time.perf_counter() - start:.1f}s", file=sys.stderr)
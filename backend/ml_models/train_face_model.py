@@ -1,6 +1,13 @@
 # CLI script to train face model (run manually)
-from services.facial_service import train_model
+# python -m ml_models.train_face_model                        -> full rebuild
+# python -m ml_models.train_face_model <label> <image> [...]  -> copy in + add only these images
+# (a label without images is a full rebuild too: LBPH can only append samples)
+import sys
+from services.facial_service import enroll_user, train_model
 
 if __name__ == "__main__":
-    ok = train_model()
+    if len(sys.argv) > 2:
+        ok = enroll_user(int(sys.argv[1]), sys.argv[2:])
+    else:
+        ok = train_model()
     print("Training finished:", ok)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 from utils.db import Base
 
@@ -11,3 +11,10 @@ class ActiveSession(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
     active = Column(Boolean, default=True, nullable=False)
+    classroom_id = Column(Integer, nullable=True)  # room the session is held in (geofence check)
+    section = Column(String(10), nullable=True)    # students.section the session is for (NULL = all students)
+
+    # Expiry sweeper + "latest active session" lookup
+    __table_args__ = (
+        Index("ix_active_sessions_active_expires_at", "active", "expires_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index
 from utils.db import Base
 from datetime import datetime
 
@@ -17,3 +17,13 @@ class Attendance(Base):
 
     marked_by_teacher = Column(Boolean, default=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
+
+    # Hot queries: live session view (session_id, keyset on id),
+    # student history (user_usn ordered by timestamp), per-subject reports.
+    # One row per student per session: repeated marks / overrides are no-ops.
+    __table_args__ = (
+        Index("uq_attendance_session_user", "session_id", "user_usn", unique=True),
+        Index("ix_attendance_session_id_id", "session_id", "id"),
+        Index("ix_attendance_user_usn_timestamp", "user_usn", "timestamp"),
+        Index("ix_attendance_subject_timestamp", "subject", "timestamp"),
+    )
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from utils.db import Base
+
+SESSIONS_ROW = "*"  # usn of the per-subject row counting sessions held
+
+class AttendanceSummary(Base):
+    """
+    Running attendance counts per (student, subject), maintained by the write
+    paths in services/attendance_summary.py. Sessions held are per subject, so
+    they live in a single row with usn = "*".
+    """
+    __tablename__ = "attendance_summary"
+
+    usn = Column(String(20), primary_key=True)
+    subject = Column(String(255), primary_key=True)  # "" for rows without a subject
+
+    records = Column(Integer, nullable=False, default=0)         # attendance rows
+    attended = Column(Integer, nullable=False, default=0)        # rows that count as present
+    teacher_marked = Column(Integer, nullable=False, default=0)
+    face_verified = Column(Integer, nullable=False, default=0)
+    sessions_held = Column(Integer, nullable=False, default=0)   # only on the "*" row
+    last_seen = Column(DateTime, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, JSON
 from utils.db import Base
 
 class Classroom(Base):
@@ -14,3 +14,8 @@ class Classroom(Base):
 
     # Optional: images (comma-separated)
     image_paths = Column(String(255), nullable=True)
+
+    # Geofence: circle of radius_m around (lat, lon), or a polygon footprint
+    # [[lat, lon], ...] for large halls (takes precedence when set)
+    radius_m = Column(Float, nullable=True)    # NULL = GEOFENCE_DEFAULT_RADIUS_M
+    footprint = Column(JSON, nullable=True)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from utils.db import Base
+
+class ManualSession(Base):
+    """
+    One row per teacher-override session (manual-<usn>-<subject>-<day>), so the
+    first override of a session can be detected with a conditional insert and
+    counted once in attendance_summary.sessions_held.
+    """
+    __tablename__ = "manual_sessions"
+
+    session_id = Column(String(100), primary_key=True)  # same width as attendance.session_id
+    subject = Column(String(255), nullable=False)
+    teacher_id = Column(String(255), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -6,7 +6,7 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     usn = Column(String(20), unique=True, index=True)              # max 20 chars
-    name = Column(String(255), nullable=False)
+    name = Column(String(255), nullable=False, index=True)            # looked up by name in attendance/face routes
     email = Column(String(255), unique=True, index=True)
     password_hash = Column(String(255), nullable=False)            # hash fits in 255
     is_teacher = Column(Boolean, default=False)
@@ -1,14 +1,22 @@
 # routes/attendance_routes.py
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from utils.db import get_db
+from utils.db import get_db, get_async_db, SessionLocal
 from models.attendance_model import Attendance
+from models.student_model import Student
 from models.user_model import User
-from models.active_session import ActiveSession
-from utils.jwt_token import verify_token
+from services import attendance_ingest, attendance_summary, identity_cache, qr_rotation, session_cache
+from utils.config import QR_REQUIRE_ROTATING_CODE
+from utils.jwt_token import Principal, get_principal, verify_token
 from datetime import datetime, timedelta
+import json
 
 router = APIRouter()
 
@@ -21,53 +29,81 @@ class MarkAttendanceSchema(BaseModel):
     student_id: str
     location: dict | None = None
     face_image: str | None = None  # Optional (used only in frontend)
+    qr_payload: str | None = None  # scanned rotating QR payload (see services/qr_rotation.py)
+    qr_receipt: str | None = None  # or the receipt /qr/scan returned for it
 
 
 # ---------------------------
 # 🟩 MARK ATTENDANCE
 # ---------------------------
 @router.post("/mark")
-def mark_attendance(
+async def mark_attendance(
     payload: MarkAttendanceSchema,
-    token: dict = Depends(verify_token),
-    db: Session = Depends(get_db)
+    principal: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Mark attendance using QR + Location + Face
     """
 
-    # ✔ Validate student
-    user = db.query(User).filter(User.name == payload.student_id).first()
+    # ✔ Validate student (usually the caller: no lookup needed)
+    if principal.name == payload.student_id:
+        user = principal
+    else:
+        user = await identity_cache.user_by_name_async(db, payload.student_id)
     if not user:
         raise HTTPException(status_code=404, detail="Student not found")
 
     # ✔ Validate session
-    session = db.query(ActiveSession).filter(
-        ActiveSession.session_id == payload.session_id,
-        ActiveSession.active == True
-    ).first()
+    session = await session_cache.get_session_async(db, payload.session_id)
 
-    if not session:
+    if not session or not session.active or session.expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="Invalid or expired session")
 
+    # ✔ Rotating QR: current or previous window only (screenshots go stale),
+    # or a receipt for such a scan issued to this student
+    if payload.qr_payload is not None:
+        if not qr_rotation.validate(payload.session_id, payload.qr_payload):
+            raise HTTPException(status_code=400, detail="QR code expired, scan again")
+    elif payload.qr_receipt is not None:
+        if not qr_rotation.check_scan_receipt(payload.session_id, user.usn, payload.qr_receipt):
+            raise HTTPException(status_code=400, detail="QR scan expired, scan again")
+    elif QR_REQUIRE_ROTATING_CODE:
+        raise HTTPException(status_code=400, detail="QR code missing")
+
     subject = session.subject
+    classroom_id = session.classroom_id
+
+    # ✔ Write-behind: append to the durable ingest log, the flusher batches the INSERTs
+    if attendance_ingest.running():
+        return await _mark_write_behind(db, user.usn, payload.session_id, subject, classroom_id)
 
     # ✔ Create attendance entry
-    attendance = Attendance(
-        user_usn=user.usn,
-        session_id=payload.session_id,
-        classroom_id=1,  # future enhancement
-        subject=subject,
-        qr_match=True,
-        location_match=True,
-        face_match=True,
-        marked_by_teacher=False,
-        timestamp=datetime.utcnow()
-    )
+    row = {
+        "user_usn": user.usn,
+        "session_id": payload.session_id,
+        "classroom_id": classroom_id or 1,
+        "subject": subject,
+        "qr_match": True,
+        "location_match": True,
+        "face_match": True,
+        "marked_by_teacher": False,
+        "timestamp": datetime.utcnow()
+    }
+    attendance = Attendance(**row)
 
     db.add(attendance)
-    db.commit()
-    db.refresh(attendance)
+    try:
+        await db.flush()
+        await db.run_sync(attendance_summary.record_marks, [row])
+        await db.commit()
+    except IntegrityError:
+        # (session_id, user_usn) is unique: a repeat mark returns the existing row
+        await db.rollback()
+        existing_id = await _existing_attendance_id(db, payload.session_id, attendance.user_usn)
+        if existing_id is None:
+            raise
+        return _already_marked(existing_id)
 
     return {
         "success": True,
@@ -76,104 +112,370 @@ def mark_attendance(
     }
 
 
+async def _existing_attendance_id(db: AsyncSession, session_id: str, usn: str):
+    return (await db.execute(
+        select(Attendance.id).where(
+            Attendance.session_id == session_id,
+            Attendance.user_usn == usn
+        )
+    )).scalar()
+
+
+def _already_marked(attendance_id):
+    return {
+        "success": True,
+        "message": "Attendance already marked",
+        "attendance_id": attendance_id
+    }
+
+
+async def _mark_write_behind(db: AsyncSession, usn: str, session_id: str, subject: str, classroom_id: int | None):
+    """Acknowledge once the row is in the ingest log; `attendance_id` is assigned at flush."""
+    if attendance_ingest.is_pending(session_id, usn):
+        return _already_marked(None)
+    existing_id = await _existing_attendance_id(db, session_id, usn)
+    if existing_id is not None:
+        return _already_marked(existing_id)
+
+    appended = await run_in_threadpool(attendance_ingest.append, {
+        "user_usn": usn,
+        "session_id": session_id,
+        "classroom_id": classroom_id or 1,
+        "subject": subject,
+        "qr_match": True,
+        "location_match": True,
+        "face_match": True,
+        "marked_by_teacher": False,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+    if not appended:
+        return _already_marked(None)
+
+    return {
+        "success": True,
+        "message": "Attendance marked successfully",
+        "attendance_id": None,
+        "pending": True
+    }
+
+
 # ---------------------------
 # 🟨 STUDENT HISTORY
 # ---------------------------
+HISTORY_PAGE_LIMIT = 200
+HISTORY_STREAM_BATCH = 1000
+
+def _history_record(r):
+    return {
+        "id": r.id,
+        "classroom_id": r.classroom_id,
+        "timestamp": r.timestamp.isoformat(),
+        "qr": r.qr_match,
+        "loc": r.location_match,
+        "face": r.face_match,
+        "by_teacher": r.marked_by_teacher,
+        "subject": r.subject or "N/A"
+    }
+
+
+def _pending_record(r: dict):
+    """History record for a row still in the write-behind buffer (no id yet)."""
+    return {
+        "id": None,
+        "classroom_id": r["classroom_id"],
+        "timestamp": r["timestamp"],
+        "qr": r["qr_match"],
+        "loc": r["location_match"],
+        "face": r["face_match"],
+        "by_teacher": r["marked_by_teacher"],
+        "subject": r["subject"] or "N/A",
+        "pending": True
+    }
+
+
+def _committed_pending(db: Session, usn: str, pending):
+    """Session ids of pending rows the flusher has committed meanwhile (already in the summary)."""
+    if not pending:
+        return set()
+    return {
+        sid for (sid,) in db.query(Attendance.session_id).filter(
+            Attendance.user_usn == usn,
+            Attendance.session_id.in_([r["session_id"] for r in pending])
+        )
+    }
+
+
+def _history_summary(db: Session, usn: str, pending=()):
+    """
+    Totals and per-subject breakdown, read from the attendance_summary table,
+    plus the still-pending rows. Returns (summary, pending rows not yet committed):
+    a flush between reading `pending` and the summary must not count a row twice.
+    """
+    held = attendance_summary.sessions_held(db)
+    rows = attendance_summary.for_student(db, usn, held)
+    committed = _committed_pending(db, usn, pending)
+    pending = [r for r in pending if r["session_id"] not in committed]
+    by_subject = [
+        {
+            "subject": s["subject"] or "N/A",
+            "total": s["records"],
+            "attended": s["attended"],
+            "sessions_held": s["sessions_held"],
+            "last_seen": s["last_seen"].isoformat() if s["last_seen"] else None
+        }
+        for s in rows
+    ]
+    # Pending rows are self-marked, so they always count as attended. Their QR
+    # session was counted as held when it was created; a subject the student
+    # has no committed row in yet still needs that count from the "*" row.
+    pending_subjects = set()
+    for r in pending:
+        subject = r["subject"] or "N/A"
+        entry = next((s for s in by_subject if s["subject"] == subject), None)
+        if entry is None:
+            entry = {"subject": subject, "total": 0, "attended": 0,
+                     "sessions_held": held.get(r["subject"] or "", 0), "last_seen": None}
+            by_subject.append(entry)
+        entry["total"] += 1
+        entry["attended"] += 1
+        entry["last_seen"] = max(entry["last_seen"] or "", r["timestamp"])
+        pending_subjects.add(subject)
+    for entry in by_subject:
+        if entry["subject"] in pending_subjects:
+            # one record per session: never report fewer sessions held than records
+            entry["sessions_held"] = max(entry["sessions_held"], entry["total"])
+    return {
+        "total_records": sum(s["total"] for s in by_subject),
+        "attended": sum(s["attended"] for s in by_subject),
+        "by_subject": by_subject
+    }, pending
+
+
+def _parse_cursor(cursor: str):
+    """Cursor format: <ISO timestamp>_<id> of the last record on the previous page."""
+    try:
+        ts, _, row_id = cursor.rpartition("_")
+        return datetime.fromisoformat(ts), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _stream_history(usn: str, summary: dict, pending=()):
+    """NDJSON: summary line, then one line per record via a server-side cursor."""
+    db = SessionLocal()  # own session: the response outlives the request dependency
+    try:
+        yield json.dumps(summary) + "\n"
+        pending_ids = {r["session_id"] for r in pending}
+        for r in pending:
+            yield json.dumps(_pending_record(r)) + "\n"
+        records = (
+            db.query(Attendance)
+            .filter(Attendance.user_usn == usn)
+            .order_by(Attendance.timestamp.desc(), Attendance.id.desc())
+            .execution_options(stream_results=True)
+            .yield_per(HISTORY_STREAM_BATCH)
+        )
+        for r in records:
+            if r.session_id not in pending_ids:  # flushed since: already sent as pending
+                yield json.dumps(_history_record(r)) + "\n"
+    finally:
+        db.close()
+
+
 @router.get("/history/{student_name}")
 def attendance_history(
     student_name: str,
-    token: dict = Depends(verify_token),
+    limit: int = 50,
+    cursor: str | None = None,
+    format: str = "json",
+    principal: Principal = Depends(get_principal),
     db: Session = Depends(get_db)
 ):
-    """Return attendance history for a student"""
+    """
+    Return attendance history for a student.
+
+    Totals and per-subject counts are computed with GROUP BY; `records` is the
+    latest page (pass `next_cursor` back as `cursor` for older rows).
+    `format=ndjson` streams the full history with flat memory use.
+    Marks still in the write-behind buffer are included (`"pending": true`).
+    """
 
-    user = db.query(User).filter(User.name == student_name).first()
+    user = principal if principal.name == student_name else identity_cache.user_by_name(db, student_name)
     if not user:
-        return {"total_records": 0, "attended": 0, "records": []}
+        return {"total_records": 0, "attended": 0, "by_subject": [], "records": [], "next_cursor": None}
 
-    records = (
-        db.query(Attendance)
-        .filter(Attendance.user_usn == user.usn)
-        .order_by(Attendance.timestamp.desc())
-        .all()
-    )
+    summary, pending = _history_summary(db, user.usn, attendance_ingest.pending_for_user(user.usn))
 
-    total = len(records)
-    attended = sum(
-        1 for r in records
-        if not r.marked_by_teacher or (r.qr_match or r.location_match or r.face_match)
-    )
+    if format == "ndjson":
+        return StreamingResponse(_stream_history(user.usn, summary, pending), media_type="application/x-ndjson")
 
+    limit = max(1, min(limit, HISTORY_PAGE_LIMIT))
+    query = db.query(Attendance).filter(Attendance.user_usn == user.usn)
+    if cursor:
+        ts, row_id = _parse_cursor(cursor)
+        query = query.filter(or_(
+            Attendance.timestamp < ts,
+            and_(Attendance.timestamp == ts, Attendance.id < row_id)
+        ))
+
+    records = query.order_by(Attendance.timestamp.desc(), Attendance.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = f"{records[-1].timestamp.isoformat()}_{records[-1].id}"
+
+    if cursor:
+        pending = []
+    pending_ids = {r["session_id"] for r in pending}
     return {
-        "total_records": total,
-        "attended": attended,
-        "records": [
-            {
-                "id": r.id,
-                "classroom_id": r.classroom_id,
-                "timestamp": r.timestamp.isoformat(),
-                "qr": r.qr_match,
-                "loc": r.location_match,
-                "face": r.face_match,
-                "by_teacher": r.marked_by_teacher,
-                "subject": r.subject or "N/A"
-            }
-            for r in records
-        ]
+        **summary,
+        "records": [_pending_record(r) for r in pending] +
+                   [_history_record(r) for r in records if r.session_id not in pending_ids],
+        "next_cursor": next_cursor
     }
 
 
 # ---------------------------
 # 🟧 LIVE SESSION ATTENDANCE VIEW
 # ---------------------------
-# ---------------------------
-# 🟧 LIVE SESSION ATTENDANCE VIEW (FIXED)
-# ---------------------------
+SESSION_PAGE_LIMIT = 500
+
+
+async def _session_pending(db: AsyncSession, session_id: str):
+    """Session records for pending marks the flusher has not committed yet."""
+    pending = attendance_ingest.pending_for_session(session_id)
+    if not pending:
+        return []
+    usns = {r["user_usn"] for r in pending}
+    committed = set((await db.execute(
+        select(Attendance.user_usn).where(Attendance.session_id == session_id, Attendance.user_usn.in_(usns))
+    )).scalars())
+    names = dict((await db.execute(select(User.usn, User.name).where(User.usn.in_(usns)))).all())
+    return [
+        {
+            "id": None,
+            "student_name": names.get(r["user_usn"]),
+            "usn": r["user_usn"],
+            "timestamp": r["timestamp"],
+            "qr": r["qr_match"],
+            "location": r["location_match"],
+            "face": r["face_match"],
+            "by_teacher": r["marked_by_teacher"],
+            "subject": r["subject"],
+            "pending": True
+        }
+        for r in pending if r["user_usn"] not in committed
+    ]
+
+
 @router.get("/session/{session_id}")
-def get_session_attendance(
+async def get_session_attendance(
     session_id: str,
+    since_id: int | None = None,
+    limit: int = SESSION_PAGE_LIMIT,
     token: dict = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Return only CURRENT SESSION attendance"""
-
-    # 🎯 Filter attendance only for this session
-    entries = (
-        db.query(Attendance)
-        .filter(Attendance.session_id == session_id)   # ✅ FIXED LINE
-        .order_by(Attendance.timestamp.desc())
-        .all()
+    """
+    Return only CURRENT SESSION attendance.
+
+    Keyset-paginated for polling: pass the previous response's `cursor` as
+    `since_id` to get only rows added since then. Records, student names and
+    the session stats come back in a single joined query.
+    Marks still in the write-behind buffer come first on every poll
+    (`"pending": true`, no id) until the flusher commits them.
+    """
+
+    limit = max(1, min(limit, SESSION_PAGE_LIMIT))
+
+    # 🎯 Stats based ONLY on this session, computed in the same statement
+    present_q = (
+        select(func.count(func.distinct(Attendance.user_usn)))
+        .where(Attendance.session_id == session_id)
+        .scalar_subquery()
+    )
+    # Roster of the session's section (as /face/classroom matches against),
+    # every student when the session has no section
+    session = await session_cache.get_session_async(db, session_id)
+    if session is not None and session.section:
+        enrolled_q = select(func.count(Student.id)).where(Student.section == session.section).scalar_subquery()
+    else:
+        enrolled_q = select(func.count(User.id)).where(User.is_teacher == False).scalar_subquery()
+
+    query = (
+        select(Attendance, User.name, present_q.label("present_count"), enrolled_q.label("total_students"))
+        .join(User, User.usn == Attendance.user_usn)
+        .where(Attendance.session_id == session_id)
     )
+    if since_id is not None:
+        query = query.where(Attendance.id > since_id)
+
+    rows = (await db.execute(query.order_by(Attendance.id).limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if rows:
+        present_count, total_students = rows[0].present_count, rows[0].total_students
+    else:
+        present_count, total_students = (await db.execute(select(present_q, enrolled_q))).one()
+
+    pending = await _session_pending(db, session_id)
+    present_count += len({r["usn"] for r in pending})
+
+    result = pending + [
+        {
+            "id": r.id,
+            "student_name": name,
+            "usn": r.user_usn,
+            "timestamp": r.timestamp.isoformat(),
+            "qr": r.qr_match,
+            "location": r.location_match,
+            "face": r.face_match,
+            "by_teacher": r.marked_by_teacher,
+            "subject": r.subject
+        }
+        for r, name, _, _ in reversed(rows)  # newest first, as before
+    ]
 
-    result = []
-    for r in entries:
-        user = db.query(User).filter(User.usn == r.user_usn).first()
-        if user:
-            result.append({
-                "id": r.id,
-                "student_name": user.name,
-                "usn": user.usn,
-                "timestamp": r.timestamp.isoformat(),
-                "qr": r.qr_match,
-                "location": r.location_match,
-                "face": r.face_match,
-                "by_teacher": r.marked_by_teacher,
-                "subject": r.subject
-            })
-
-    # 🎯 Stats based ONLY on this session
-    total_students = 30
-    present_count = len(result)
     percentage = (present_count / total_students * 100) if total_students > 0 else 0
 
     return {
         "records": result,
         "total_students": total_students,
         "present_count": present_count,
-        "percentage": percentage
+        "percentage": percentage,
+        "cursor": rows[-1][0].id if rows else since_id,
+        "has_more": has_more
     }
 
 
+# ---------------------------
+# 📊 SUBJECT SUMMARY (Teacher Dashboard)
+# ---------------------------
+@router.get("/summary/{subject}")
+def subject_summary(subject: str, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Per-student counts for one subject, from the attendance_summary table.
+    Teachers only: a student's own counts are in /attendance/history (`by_subject`).
+    """
+    if not principal.is_teacher:
+        raise HTTPException(status_code=403, detail="Teachers only")
+
+    sessions_held, rows = attendance_summary.for_subject(db, subject)
+    students = [
+        {
+            "usn": r["usn"],
+            "attended": r["attended"],
+            "teacher_marked": r["teacher_marked"],
+            "face_verified": r["face_verified"],
+            "last_seen": r["last_seen"].isoformat() if r["last_seen"] else None,
+            "percentage": (r["attended"] / sessions_held * 100) if sessions_held > 0 else 0
+        }
+        for r in rows
+    ]
+    return {"subject": subject, "sessions_held": sessions_held, "students": students}
+
+
 # ---------------------------
 # 🧩 GET ALL STUDENTS
 # ---------------------------
@@ -2,15 +2,24 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from utils.db import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.db import get_async_db
 from models.user_model import User
+from services import auth_service, identity_cache
+from services.auth_service import AuthBusyError
+from utils.config import AUTH_BUSY_RETRY_AFTER
 from utils.jwt_token import create_access_token
-from passlib.context import CryptContext
-from passlib.exc import UnknownHashError
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _busy():
+    return HTTPException(
+        status_code=503,
+        detail="Too many logins in progress, please retry",
+        headers={"Retry-After": str(AUTH_BUSY_RETRY_AFTER)}
+    )
 
 
 # ---------------------------
@@ -33,15 +42,20 @@ class LoginSchema(BaseModel):
 # 📝 Register User
 # ---------------------------
 @router.post("/register")
-def register(payload: RegisterSchema, db: Session = Depends(get_db)):
+async def register(payload: RegisterSchema, db: AsyncSession = Depends(get_async_db)):
 
     # Check if email taken
-    existing = db.query(User).filter(User.email == payload.email).first()
+    existing = (await db.execute(
+        select(User.id).where(User.email == payload.email).limit(1)
+    )).scalar()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # Hash password
-    hashed = pwd_context.hash(payload.password)
+    # Hash password (dedicated bcrypt pool)
+    try:
+        hashed = await auth_service.hash_password(payload.password)
+    except AuthBusyError:
+        raise _busy()
 
     user = User(
         usn=payload.usn,
@@ -52,8 +66,8 @@ def register(payload: RegisterSchema, db: Session = Depends(get_db)):
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    identity_cache.invalidate()
 
     token = create_access_token({
         "usn": user.usn,
@@ -76,46 +90,47 @@ def register(payload: RegisterSchema, db: Session = Depends(get_db)):
 # 🔐 Login (support plain + hashed)
 # ---------------------------
 @router.post("/login")
-def login(payload: LoginSchema, db: Session = Depends(get_db)):
+async def login(payload: LoginSchema, db: AsyncSession = Depends(get_async_db)):
 
-    user = db.query(User).filter(User.email == payload.email).first()
+    user = (await db.execute(
+        select(User).where(User.email == payload.email).limit(1)
+    )).scalars().first()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    # Handle normal hashed password
+    # Verify on the bcrypt pool; plain (legacy) passwords and hashes with an
+    # outdated cost come back with a replacement hash from the same job
     try:
-        password_ok = pwd_context.verify(payload.password, user.password_hash)
-
-    except UnknownHashError:
-        # HASH missing / old DB using plain password
-        password_ok = (payload.password == user.password_hash)
+        password_ok, new_hash = await auth_service.verify_password(payload.password, user.password_hash)
+    except AuthBusyError:
+        raise _busy()
 
     if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    # Auto-convert old plain password → bcrypt
-    try:
-        if not user.password_hash.startswith("$2b$"):  # bcrypt prefix
-            user.password_hash = pwd_context.hash(payload.password)
-            db.add(user)
-            db.commit()
-    except:
-        pass
-
-    # Create JWT
-    token = create_access_token({
+    profile = {
         "usn": user.usn,
+        "name": user.name,
         "email": user.email,
         "is_teacher": user.is_teacher
+    }
+
+    # Auto-convert old plain password / old cost → current bcrypt
+    if new_hash:
+        try:
+            user.password_hash = new_hash
+            await db.commit()
+        except Exception:
+            await db.rollback()
+
+    # Create JWT
+    token = create_access_token({
+        "usn": profile["usn"],
+        "email": profile["email"],
+        "is_teacher": profile["is_teacher"]
     })
 
     return {
         "access_token": token,
-        "user": {
-            "usn": user.usn,
-            "name": user.name,
-            "email": user.email,
-            "is_teacher": user.is_teacher
-        }
+        "user": profile
     }
-    
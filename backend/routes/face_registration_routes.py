@@ -1,14 +1,21 @@
 # routes/face_registration_routes.py
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from utils.jwt_token import verify_token
 from utils.db import get_db
-from models.user_model import User
-import base64
+from ml_models import face_index, face_model
+from routes.facial_routes import face_busy, face_pool_down, require_face_model
+from services import face_embedding_service, identity_cache
+from services.face_batcher import FaceBusyError, batcher
+from services.face_executor import FacePoolError
+from utils.config import FACE_CROP_SIZE
+from utils.image_utils import decode_image
+import asyncio
+import cv2
 import os
-from datetime import datetime
 
 router = APIRouter()
 
@@ -18,39 +25,62 @@ class FaceRegisterSchema(BaseModel):
     user_id: str
 
 
-@router.post("/register")
-def register_face(payload: FaceRegisterSchema, token: dict = Depends(verify_token), db: Session = Depends(get_db)):
+def _store_face(usn: str, crop, embedding):
+    """Write <usn>.jpg, its embedding and the index entry (blocking file I/O)."""
+    # Ensure folder exists
+    folder_path = face_embedding_service.FACE_DATA_DIR
+    os.makedirs(folder_path, exist_ok=True)
+
+    # Save normalized face as <usn>.jpg (replaces any full-size photo)
+    save_path = face_embedding_service.photo_path(usn)
+    ok, buf = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    if not ok:
+        raise HTTPException(status_code=500, detail="Could not encode face image")
+
+    with open(save_path, "wb") as f:
+        f.write(buf.tobytes())
+
+    face_embedding_service.save_embedding(usn, embedding)
+    face_index.add(usn, embedding)
+    return save_path
+
+
+@router.post("/register", dependencies=[Depends(require_face_model)])
+async def register_face(payload: FaceRegisterSchema, token: dict = Depends(verify_token), db: Session = Depends(get_db)):
     """
-    Save a user's face image to the face_data folder.
-    This will be used for future DeepFace verification.
+    Detect, align and crop the user's face once, save the normalized
+    FACE_CROP_SIZE crop to the face_data folder and precompute its embedding,
+    so verification only has to preprocess and embed the live image.
+    Awaits the pool job like /facial/verify-face: no request thread is held
+    while the face is processed.
     """
 
     try:
         # Fetch user
-        user = db.query(User).filter(User.name == payload.user_id).first()
+        user = await run_in_threadpool(identity_cache.user_by_name, db, payload.user_id)
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Decode incoming image
-        image_str = payload.image
-        if "," in image_str:
-            image_str = image_str.split(",")[1]  # Remove "data:image/jpeg;base64,"
-
+        # Decode incoming image in memory
         try:
-            image_bytes = base64.b64decode(image_str)
-        except Exception:
+            img = await run_in_threadpool(decode_image, payload.image)
+        except ValueError:
             raise HTTPException(status_code=400, detail="Invalid image data")
 
-        # Ensure folder exists
-        folder_path = "face_data"
-        os.makedirs(folder_path, exist_ok=True)
-
-        # Save image as <usn>.jpg
-        save_path = os.path.join(folder_path, f"{user.usn}.jpg")
-
-        with open(save_path, "wb") as f:
-            f.write(image_bytes)
+        # Detection + alignment + crop + embedding in one pool job (same queue limit as verify)
+        try:
+            crop, embedding, confidence = await asyncio.wrap_future(batcher.submit_job(
+                face_model.normalize_face, img, FACE_CROP_SIZE
+            ))
+        except FaceBusyError:
+            raise face_busy()
+        except FacePoolError as e:
+            raise face_pool_down(e)
+        if confidence <= 0:
+            raise HTTPException(status_code=400, detail="No face detected, please retake the photo")
+
+        save_path = await run_in_threadpool(_store_face, user.usn, crop, embedding)
 
         print(f"📸 Face registered for user: {user.name} ({user.usn}) → {save_path}")
 
@@ -1,15 +1,26 @@
 # routes/facial_routes.py
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from utils.jwt_token import verify_token
+from utils.jwt_token import Principal, get_principal, verify_token
 from utils.db import get_db
 from models.user_model import User
-import base64
-import os
-from deepface import DeepFace
+from models.student_model import Student
+from models.attendance_model import Attendance
+from ml_models import classroom_recognizer, face_index, face_model
+from services import attendance_summary, face_embedding_service, face_executor, identity_cache, session_cache
+from services.session_cache import CachedSession
+from services.face_batcher import FaceBusyError, batcher
+from services.face_executor import FacePoolError
+from utils.config import (
+    FACE_DISTANCE_THRESHOLD, FACE_NOT_READY_RETRY_AFTER, FACE_BUSY_RETRY_AFTER, FACE_GROUP_DETECTOR
+)
+from utils.image_utils import decode_image
 from datetime import datetime
+import asyncio
+import os
 
 router = APIRouter()
 
@@ -19,22 +30,72 @@ class FaceVerifySchema(BaseModel):
     user_id: str
 
 
-@router.post("/verify")
-def verify_face(payload: FaceVerifySchema, token: dict = Depends(verify_token), db: Session = Depends(get_db)):
+class FaceIdentifySchema(BaseModel):
+    image: str
+    k: int = 5
+
+
+class ClassroomPhotoSchema(BaseModel):
+    image: str
+    session_id: str
+    section: str | None = None  # None = the session's section (all students if it has none)
+
+
+def require_face_model():
+    """Reject face traffic with 503 until this worker's model is warm."""
+    if not face_executor.is_ready():
+        face_executor.start()
+        raise HTTPException(
+            status_code=503,
+            detail="Face model is warming up, retry shortly",
+            headers={"Retry-After": str(FACE_NOT_READY_RETRY_AFTER)}
+        )
+
+
+def face_busy():
+    return HTTPException(
+        status_code=503,
+        detail="Face verification is busy, retry shortly",
+        headers={"Retry-After": str(FACE_BUSY_RETRY_AFTER)}
+    )
+
+
+def face_pool_down(e: Exception):
+    """The inference pool failed: never auto-approve, let the client retry once it is rebuilt."""
+    print(f"❌ Face inference pool unavailable: {e}")
+    face_executor.start()
+    return HTTPException(
+        status_code=503,
+        detail="Face verification is unavailable, retry shortly",
+        headers={"Retry-After": str(FACE_NOT_READY_RETRY_AFTER)}
+    )
+
+
+@router.get("/ready")
+def face_model_status():
+    """Readiness of the face model in this worker (for load balancer checks)."""
+    return face_executor.status()
+
+
+@router.post("/verify", dependencies=[Depends(require_face_model)])
+async def verify_face(payload: FaceVerifySchema, token: dict = Depends(verify_token), db: Session = Depends(get_db)):
     """
     Verify face using DeepFace.
     - If no registered face exists, currently auto-approves (keeps older behavior).
-    - Uses a temp file for comparison, removes it afterwards.
+    - Only the live image is embedded; the registered photo's embedding is precomputed.
+    - The live image is decoded in memory, nothing is written to disk.
+    - Inference runs in the face process pool; when its queue is full this
+      returns 503 with Retry-After instead of waiting.
     """
 
     try:
         # Lookup user
-        user = db.query(User).filter(User.name == payload.user_id).first()
+        user = await run_in_threadpool(identity_cache.user_by_name, db, payload.user_id)
         if not user:
             return {"verified": False, "message": "User not found"}
 
         # Path where registered face photos are stored (existing behavior)
-        registered_face_path = f"face_data/{user.usn}.jpg"
+        registered_face_path = face_embedding_service.photo_path(user.usn)
 
         if not os.path.exists(registered_face_path):
             # No registered face — keep previous behavior: approve and return a high confidence.
@@ -45,40 +106,21 @@ def verify_face(payload: FaceVerifySchema, token: dict = Depends(verify_token),
                 "confidence": 0.90
             }
 
-        # Decode incoming image (data URL or base64 string)
-        image_str = payload.image
-        if "," in image_str:
-            image_str = image_str.split(",")[1]
-
-        image_bytes = base64.b64decode(image_str)
-
-        # Save temp image file
-        timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
-        temp_path = f"face_data/temp_{user.usn}_{timestamp}.jpg"
-        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
-        with open(temp_path, "wb") as f:
-            f.write(image_bytes)
+        # Decode incoming image (data URL or base64 string) straight to an array
+        live_img = await run_in_threadpool(decode_image, payload.image)
 
         print(f"📸 Verifying face for {user.name} using DeepFace...")
 
-        # Run DeepFace verify (enforce_detection False to avoid strict failure)
-        result = DeepFace.verify(
-            img1_path=registered_face_path,
-            img2_path=temp_path,
-            model_name="VGG-Face",
-            enforce_detection=False
-        )
-
-        # Clean up temp file
-        try:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        except Exception as e:
-            print(f"⚠️ Failed to remove temp file {temp_path}: {e}")
+        # Reference embedding is stored at registration (recomputed only if the photo changed)
+        reference = await run_in_threadpool(face_embedding_service.load_embedding, user.usn)
+        if reference is None:
+            reference = await face_embedding_service.compute_embedding_async(registered_face_path)
+            await run_in_threadpool(face_embedding_service.save_embedding, user.usn, reference)
+        live = await face_embedding_service.compute_embedding_async(live_img)
 
-        verified = result.get("verified", False)
-        distance = result.get("distance", None)
-        threshold = result.get("threshold", None)
+        distance = face_embedding_service.cosine_distance(reference, live)
+        threshold = FACE_DISTANCE_THRESHOLD
+        verified = distance <= threshold
 
         print(f"✅ Face verification: verified={verified}, distance={distance}, threshold={threshold}")
 
@@ -98,6 +140,12 @@ def verify_face(payload: FaceVerifySchema, token: dict = Depends(verify_token),
             "threshold": threshold
         }
 
+    except FaceBusyError:
+        raise face_busy()
+
+    except FacePoolError as e:
+        raise face_pool_down(e)
+
     except Exception as e:
         # Log and fallback to auto-approve (preserves prior dev behavior)
         print(f"❌ Error in face verification: {e}")
@@ -106,3 +154,142 @@ def verify_face(payload: FaceVerifySchema, token: dict = Depends(verify_token),
             "message": f"Verification error (auto-approved): {str(e)}",
             "confidence": 0.85
         }
+
+
+# ---------------------------
+# 🔍 KIOSK IDENTIFICATION (1:N, campus-wide)
+# ---------------------------
+@router.post("/identify", dependencies=[Depends(require_face_model)])
+async def identify_face(payload: FaceIdentifySchema, token: dict = Depends(verify_token)):
+    """
+    Identify an unknown face against every enrolled student using the ANN index.
+    Returns the top-k USNs with cosine distances; `match` is set when the best
+    one is within the verification threshold.
+    """
+
+    try:
+        img = await run_in_threadpool(decode_image, payload.image)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image data")
+
+    try:
+        embedding = await face_embedding_service.compute_embedding_async(img)
+    except FaceBusyError:
+        raise face_busy()
+    except FacePoolError as e:
+        raise face_pool_down(e)
+
+    k = max(1, min(payload.k, 50))
+    candidates = await run_in_threadpool(face_index.search, embedding, k)
+    best = candidates[0] if candidates else None
+
+    return {
+        "match": best[0] if best and best[1] <= FACE_DISTANCE_THRESHOLD else None,
+        "candidates": [{"usn": usn, "distance": distance} for usn, distance in candidates],
+        "threshold": FACE_DISTANCE_THRESHOLD
+    }
+
+
+def _section_roster(db: Session, section: str | None):
+    """USNs of the students to match a classroom photo against."""
+    if section:
+        return [usn for (usn,) in db.query(Student.usn).filter(Student.section == section)]
+    return [usn for (usn,) in db.query(User.usn).filter(User.is_teacher == False)]
+
+
+def _bulk_mark_present(db: Session, session: CachedSession, usns: list):
+    """Insert face-matched attendance rows in one statement, skipping students already marked."""
+    if not usns:
+        return [], []
+
+    already = {
+        usn for (usn,) in db.query(Attendance.user_usn).filter(
+            Attendance.session_id == session.session_id,
+            Attendance.user_usn.in_(usns)
+        )
+    }
+    new_usns = [usn for usn in usns if usn not in already]
+
+    if new_usns:
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_usn": usn,
+                "session_id": session.session_id,
+                "classroom_id": 1,  # future enhancement
+                "subject": session.subject,
+                "qr_match": False,
+                "location_match": False,
+                "face_match": True,
+                "marked_by_teacher": False,
+                "timestamp": now
+            }
+            for usn in new_usns
+        ]
+        # A concurrent mark may have won for some students: report only our inserts
+        inserted = {r["user_usn"] for r in attendance_summary.insert_marks(db, rows)}
+        db.commit()
+        already |= set(new_usns) - inserted
+        new_usns = [usn for usn in new_usns if usn in inserted]
+
+    return new_usns, sorted(already)
+
+
+# ---------------------------
+# 🏫 CLASSROOM PHOTO (1:N)
+# ---------------------------
+@router.post("/classroom", dependencies=[Depends(require_face_model)])
+async def identify_classroom(payload: ClassroomPhotoSchema, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Teacher uploads one classroom photo; every detected face is identified
+    against the section's registered embeddings in a single inference pass
+    and matched students are marked present for the session.
+    """
+
+    if not principal.is_teacher:
+        raise HTTPException(status_code=403, detail="Only teachers can upload classroom photos")
+
+    session = await run_in_threadpool(session_cache.get_session, db, payload.session_id)
+    if not session or not session.active:
+        raise HTTPException(status_code=400, detail="Invalid or expired session")
+
+    try:
+        img = await run_in_threadpool(decode_image, payload.image)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image data")
+
+    roster = await run_in_threadpool(_section_roster, db, payload.section or session.section)
+
+    enrolled, matrix, missing = await run_in_threadpool(classroom_recognizer.load_enrolled_embeddings, roster)
+
+    # Same queue limit as single verifications: they share the pool
+    try:
+        embeddings, areas = await asyncio.wrap_future(
+            batcher.submit_job(face_model.represent_all_faces, img, FACE_GROUP_DETECTOR)
+        )
+    except FaceBusyError:
+        raise face_busy()
+    except FacePoolError as e:
+        raise face_pool_down(e)
+    except Exception as e:
+        print(f"❌ Error in classroom recognition: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    matches = classroom_recognizer.identify(embeddings, enrolled, matrix)
+    marked, already = await run_in_threadpool(_bulk_mark_present, db, session, [usn for _, usn, _ in matches])
+
+    print(f"🏫 Classroom photo: {len(areas)} faces, {len(matches)} identified, {len(marked)} newly marked")
+
+    return {
+        "success": True,
+        "session_id": session.session_id,
+        "faces_detected": len(areas),
+        "identified": [
+            {"usn": usn, "distance": distance, "facial_area": areas[face_idx]}
+            for face_idx, usn, distance in matches
+        ],
+        "unknown_faces": len(areas) - len(matches),
+        "marked": marked,
+        "already_marked": already,
+        "missing_embeddings": missing
+    }
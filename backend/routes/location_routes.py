@@ -1,52 +1,84 @@
 # routes/location_routes.py
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from utils.jwt_token import verify_token
 from utils.db import get_db
 from sqlalchemy.orm import Session
+from services import geofence, session_cache
+from services.location_service import haversine_m
 
 router = APIRouter()
 
-# ---------------------------------------------------
-# TEMPORARY CLASSROOM LOCATION (you can update later)
-# ---------------------------------------------------
-CLASSROOM_LAT = 12.934533  
-CLASSROOM_LNG = 77.605000  
-ALLOWED_RADIUS = 0.0009     # ~100 meters
+
+def _room_info(room):
+    return {
+        "classroom_id": room.id,
+        "room_number": room.room_number,
+        "latitude": room.lat,
+        "longitude": room.lon,
+        "radius_m": None if room.polygon else room.radius_m,
+        "footprint": [list(p) for p in room.polygon] if room.polygon else None
+    }
 
 
 @router.get("/verify")
-def verify_location(lat: float, lng: float, token=Depends(verify_token)):
+def verify_location(
+    lat: float,
+    lng: float,
+    session_id: str | None = None,
+    token=Depends(verify_token),
+    db: Session = Depends(get_db)
+):
     """
-    Verify if student is inside classroom allowed range.
-    Uses simple coordinate distance comparison (not full Haversine).
+    Which classroom is the student in (services/geofence.py)?
+    With `session_id`, `inside_classroom` is true only inside that session's room.
     """
 
     try:
-        lat_diff = abs(lat - CLASSROOM_LAT)
-        lng_diff = abs(lng - CLASSROOM_LNG)
+        expected_id = None
+        if session_id:
+            session = session_cache.get_session(db, session_id)
+            if not session:
+                raise HTTPException(status_code=404, detail="Session not found")
+            expected_id = session.classroom_id
 
-        inside = lat_diff <= ALLOWED_RADIUS and lng_diff <= ALLOWED_RADIUS
+        room, inside = geofence.check(lat, lng, expected_id)
+        # Distance to the session's room if there is one, else to the room found / the nearest room
+        index = geofence.get_index()
+        reference = index.rooms.get(expected_id) or room or index.nearest(lat, lng)[0]
 
         return {
             "inside_classroom": inside,
-            "lat_diff": lat_diff,
-            "lng_diff": lng_diff
+            "room": _room_info(room) if room else None,
+            "session_room_match": (room is not None and room.id == expected_id) if expected_id is not None else None,
+            "distance_m": round(haversine_m(lat, lng, reference.lat, reference.lon), 1),
+            # Kept for older clients: offset from the room center in degrees
+            "lat_diff": abs(lat - reference.lat),
+            "lng_diff": abs(lng - reference.lon)
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print("❌ Location verify error:", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/classroom-location")
-def get_classroom_location(token=Depends(verify_token)):
+async def get_classroom_location(token=Depends(verify_token)):
     """
     Return classroom coordinates to frontend.
+    The top-level keys describe the first room (single-classroom clients):
+    `radius` stays in degrees as before, `radius_m` is the same in meters.
     """
 
+    rooms = sorted((await run_in_threadpool(geofence.get_index)).rooms.values(), key=lambda r: r.id)
+    first = rooms[0]
     return {
-        "latitude": CLASSROOM_LAT,
-        "longitude": CLASSROOM_LNG,
-        "radius": ALLOWED_RADIUS
+        "latitude": first.lat,
+        "longitude": first.lon,
+        "radius": round(first.radius_m / geofence.METERS_PER_DEG_LAT, 6),
+        "radius_m": first.radius_m,
+        "rooms": [_room_info(r) for r in rooms]
     }
@@ -1,12 +1,20 @@
 # routes/qr_routes.py
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from utils.db import get_db
+from utils.db import get_db, get_async_db, SessionLocal
 from models.active_session import ActiveSession
-from utils.jwt_token import verify_token
+from services import attendance_summary, qr_rotation, session_cache
+from utils.jwt_token import Principal, get_principal, verify_token
 from datetime import datetime, timedelta
+from utils.config import QR_STREAM_TICKET_SECONDS
+import asyncio
+import base64
+import json
 import uuid
 
 router = APIRouter()
@@ -18,12 +26,18 @@ router = APIRouter()
 class QRGenerateSchema(BaseModel):
     subject: str
     teacher_id: str
+    classroom_id: int | None = None  # room for the location check (see services/geofence.py)
+    section: str | None = None  # students.section taking the session; None = all students
 
 
 class QRStopSchema(BaseModel):
     session_id: str
 
 
+class QRScanSchema(BaseModel):
+    payload: str  # rotating payload read from the projected QR
+
+
 # ---------------------------
 # 🚀 Generate New QR Session
 # ---------------------------
@@ -51,12 +65,16 @@ def generate_qr(
         teacher_id=payload.teacher_id,
         active=True,
         created_at=datetime.utcnow(),
-        expires_at=expires_at
+        expires_at=expires_at,
+        classroom_id=payload.classroom_id,
+        section=payload.section
     )
 
     db.add(new_session)
+    attendance_summary.record_session_held(db, payload.subject)
     db.commit()
     db.refresh(new_session)
+    session_cache.invalidate()
 
     return {
         "message": "QR session created",
@@ -84,6 +102,7 @@ def stop_qr(
 
     session.active = False
     db.commit()
+    session_cache.invalidate()
 
     return {"message": "QR session stopped", "session_id": payload.session_id}
 
@@ -92,10 +111,9 @@ def stop_qr(
 # 🔎 Verify QR Session Validity
 # ---------------------------
 @router.get("/verify/{session_id}")
-def verify_qr_session(session_id: str, db: Session = Depends(get_db)):
-    session = db.query(ActiveSession).filter(
-        ActiveSession.session_id == session_id
-    ).first()
+def verify_qr_session(session_id: str, code: str | None = None, db: Session = Depends(get_db)):
+    """`code` is the scanned rotating payload; current and previous window are accepted."""
+    session = session_cache.get_session(db, session_id)
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -106,6 +124,9 @@ def verify_qr_session(session_id: str, db: Session = Depends(get_db)):
     ):
         raise HTTPException(status_code=400, detail="Session expired")
 
+    if code is not None and not qr_rotation.validate(session_id, code):
+        raise HTTPException(status_code=400, detail="QR code expired, scan again")
+
     return {
         "valid": True,
         "subject": session.subject,
@@ -113,32 +134,16 @@ def verify_qr_session(session_id: str, db: Session = Depends(get_db)):
     }
 
 
-# ---------------------------
-# 🟩 Fetch Active Session (Student Dashboard)
-# ---------------------------
 # ---------------------------
 # 🟩 Fetch Active Session (Student Dashboard)
 # ---------------------------
 @router.get("/active-session")
-def get_active_session(db=Depends(get_db)):
+async def get_active_session(db: AsyncSession = Depends(get_async_db)):
     now = datetime.utcnow()  # ✅ FIXED: Use utcnow() to match session creation
-    
-    # Clear all expired sessions automatically
-    db.query(ActiveSession).filter(
-        ActiveSession.expires_at < now
-    ).update({ActiveSession.active: False})
-    db.commit()
 
-    # Fetch ONLY the latest fresh session (not expired, not old)
-    active_session = (
-        db.query(ActiveSession)
-        .filter(
-            ActiveSession.active == True,
-            ActiveSession.expires_at > now
-        )
-        .order_by(ActiveSession.created_at.desc())
-        .first()
-    )
+    # Read-only: expired sessions are deactivated by services/session_sweeper.py
+    # Latest fresh session (not expired, not old), served from the session cache
+    active_session = await session_cache.get_latest_active_async(db, now)
 
     if not active_session:
         return {"active": False}
@@ -150,3 +155,120 @@ def get_active_session(db=Depends(get_db)):
         "teacher_id": active_session.teacher_id,
         "expires_at": active_session.expires_at.isoformat(),
     }
+
+
+# ---------------------------
+# 🔄 Rotating QR (projector page)
+# ---------------------------
+def _live_session(session_id: str):
+    db = SessionLocal()
+    try:
+        session = session_cache.get_session(db, session_id)
+    finally:
+        db.close()
+    if not session or not session.active or session.expires_at < datetime.utcnow():
+        return None
+    return session
+
+
+def _own_live_session(session_id: str, principal: Principal):
+    """The live session, if the caller is the teacher running it (the QR itself is the secret)."""
+    if not principal.is_teacher:
+        raise HTTPException(status_code=403, detail="Teachers only")
+    session = _live_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not active")
+    if session.teacher_id != principal.usn:
+        raise HTTPException(status_code=403, detail="Not your session")
+    return session
+
+
+@router.get("/image/{session_id}")
+async def get_qr_image(session_id: str, principal: Principal = Depends(get_principal)):
+    """Current rotating QR as PNG, served from the pre-rendered cache."""
+    await run_in_threadpool(_own_live_session, session_id, principal)
+
+    png = await run_in_threadpool(qr_rotation.image, session_id)
+    if png is None:
+        raise HTTPException(status_code=503, detail="QR image not ready", headers={"Retry-After": "1"})
+
+    return Response(png, media_type="image/png", headers={
+        "Cache-Control": "no-store",
+        "X-QR-Rotates-In": f"{qr_rotation.seconds_until_rotation():.1f}"
+    })
+
+
+async def _qr_events(session_id: str):
+    """SSE: one event per rotation window until the session ends."""
+    last_window = None
+    while True:
+        if not await run_in_threadpool(_live_session, session_id):
+            yield "event: end\ndata: {}\n\n"
+            return
+
+        window = qr_rotation.current_window()
+        if window != last_window:
+            png = await run_in_threadpool(qr_rotation.image, session_id, window)
+            if png is None:
+                await asyncio.sleep(0.5)
+                continue
+            last_window = window
+            event = {
+                "session_id": session_id,
+                "window": window,
+                "payload": qr_rotation.payload(session_id, window),
+                "image": "data:image/png;base64," + base64.b64encode(png).decode("ascii"),
+                "rotates_in": qr_rotation.seconds_until_rotation()
+            }
+            yield f"data: {json.dumps(event)}\n\n"
+        else:
+            yield ": keepalive\n\n"
+
+        await asyncio.sleep(qr_rotation.seconds_until_rotation() + 0.05)
+
+
+@router.post("/stream-ticket/{session_id}")
+def get_stream_ticket(session_id: str, principal: Principal = Depends(get_principal)):
+    """Short-lived ticket for /qr/stream (keeps the JWT out of URLs and access logs)."""
+    _own_live_session(session_id, principal)
+    return {"ticket": qr_rotation.stream_ticket(session_id), "expires_in": QR_STREAM_TICKET_SECONDS}
+
+
+@router.get("/stream/{session_id}")
+def stream_qr(session_id: str, ticket: str):
+    """
+    Server-sent events for the projector page: pushes the new QR image on
+    every rotation. EventSource can't set headers, so it connects with a
+    ticket from POST /qr/stream-ticket (checked once, at connect).
+    """
+    if not qr_rotation.check_stream_ticket(session_id, ticket):
+        raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    return StreamingResponse(
+        _qr_events(session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
+
+
+# ---------------------------
+# 📷 Student scan
+# ---------------------------
+@router.post("/scan")
+def scan_qr(payload: QRScanSchema, principal: Principal = Depends(get_principal)):
+    """
+    Check a scanned rotating payload and hand out a receipt bound to this
+    student, which /attendance/mark accepts for QR_SCAN_RECEIPT_SECONDS.
+    """
+    session_id = qr_rotation.session_of(payload.payload)
+    session = _live_session(session_id) if session_id else None
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not active")
+    if not qr_rotation.validate(session_id, payload.payload):
+        raise HTTPException(status_code=400, detail="QR code expired, scan again")
+
+    return {
+        "valid": True,
+        "session_id": session_id,
+        "subject": session.subject,
+        "qr_receipt": qr_rotation.scan_receipt(session_id, principal.usn)
+    }
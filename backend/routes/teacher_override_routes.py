@@ -1,11 +1,14 @@
 # routes/teacher_override_routes.py
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
 from utils.db import get_db
-from utils.jwt_token import verify_token
+from utils.jwt_token import Principal, get_principal, verify_token
 from models.user_model import User
+from models.active_session import ActiveSession
 from models.attendance_model import Attendance
+from services import attendance_summary
 from datetime import datetime
 
 router = APIRouter()
@@ -23,10 +26,18 @@ def list_students(token: dict = Depends(verify_token), db: Session = Depends(get
     }
 
 
+def _may_write_session(db: Session, session_id: str, teacher_usn: str):
+    """A teacher may override into their own manual-* sessions or their own QR sessions."""
+    if session_id.startswith(f"manual-{teacher_usn}-"):
+        return True
+    owner = db.query(ActiveSession.teacher_id).filter(ActiveSession.session_id == session_id).scalar()
+    return owner is not None and owner == teacher_usn
+
+
 @router.post("/mark")
 def manual_mark_attendance(
     data: dict,
-    token: dict = Depends(verify_token),
+    principal: Principal = Depends(get_principal),
     db: Session = Depends(get_db)
 ):
     """
@@ -36,13 +47,18 @@ def manual_mark_attendance(
     {
         "subject": "Theory of Computation",
         "usns": ["1AM23CS180", "1AM23CS181"],
-        "classroom_id": 1
+        "classroom_id": 1,
+        "session_id": "..."        # optional, defaults to today's manual session;
+                                   # else one of your manual-* ids or your QR session
     }
+
+    Idempotent: one lookup for all USNs, one bulk INSERT ... IGNORE, and the
+    (session_id, user_usn) unique index turns repeats into no-ops.
     """
 
     try:
         subject = data.get("subject")
-        usns = data.get("usns", [])
+        usns = list(dict.fromkeys(data.get("usns", [])))  # de-dupe, keep order
         classroom_id = data.get("classroom_id", 1)
 
         if not subject:
@@ -53,42 +69,65 @@ def manual_mark_attendance(
 
         # ---------------------------------------------------
         # ✅ Create manual session_id (required by Attendance)
+        # One per teacher / subject / day unless a session is given
         # ---------------------------------------------------
-        teacher_usn = token.get("usn")
-        manual_session_id = f"manual-{teacher_usn}-{subject.replace(' ', '_')}"
+        teacher_usn = principal.usn
+        now = datetime.utcnow()
+        manual_session_id = data.get("session_id") or \
+            f"manual-{teacher_usn}-{subject.replace(' ', '_')}-{now:%Y%m%d}"
+        if data.get("session_id") and not _may_write_session(db, manual_session_id, teacher_usn):
+            raise HTTPException(status_code=403, detail="Not your session")
         # ---------------------------------------------------
 
-        marked = []
-
-        for usn in usns:
-            user = db.query(User).filter(User.usn == usn).first()
-            if not user:
-                continue  # skip invalid USN
+        # One round trip: which USNs exist, and which are already marked
+        rows = (
+            db.query(User.usn, Attendance.id)
+            .outerjoin(Attendance, and_(
+                Attendance.user_usn == User.usn,
+                Attendance.session_id == manual_session_id
+            ))
+            .filter(User.usn.in_(usns))
+            .all()
+        )
+        valid = {usn for usn, _ in rows}
+        present = {usn for usn, att_id in rows if att_id is not None}
+        to_mark = [usn for usn in usns if usn in valid and usn not in present]
 
-            att = Attendance(
-                user_usn=usn,
-                session_id=manual_session_id,    # ✅ FIXED
-                classroom_id=classroom_id,
-                subject=subject,
-                qr_match=False,
-                location_match=False,
-                face_match=False,
-                marked_by_teacher=True,
-                timestamp=datetime.utcnow()
-            )
-
-            db.add(att)
-            marked.append(usn)
-
-        db.commit()
+        marked = []
+        if to_mark:
+            rows = [
+                {
+                    "user_usn": usn,
+                    "session_id": manual_session_id,
+                    "classroom_id": classroom_id,
+                    "subject": subject,
+                    "qr_match": False,
+                    "location_match": False,
+                    "face_match": False,
+                    "marked_by_teacher": True,
+                    "timestamp": now
+                }
+                for usn in to_mark
+            ]
+            # Only rows the database actually inserted reach the summary
+            marked = [r["user_usn"] for r in attendance_summary.insert_marks(db, rows)]
+            # First override of a manual session = one more session held
+            if marked and manual_session_id.startswith("manual-"):
+                attendance_summary.record_manual_session(db, manual_session_id, subject, teacher_usn)
+            db.commit()
 
         return {
             "success": True,
             "marked": marked,
+            "already_present": [usn for usn in usns if usn in valid and usn not in marked],
+            "invalid": [usn for usn in usns if usn not in valid],
             "session_id": manual_session_id,
             "message": "Attendance overridden successfully"
         }
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
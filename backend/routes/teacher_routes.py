@@ -1,25 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from utils.db import get_db
-from utils.jwt_token import verify_token
-from models.teacher_model import Teacher
-from models.user_model import User
+from utils.jwt_token import Principal, get_principal
+from services import identity_cache
 
 router = APIRouter()
 
 @router.get("/subjects")
 def get_teacher_subjects(
-    token: dict = Depends(verify_token),
+    principal: Principal = Depends(get_principal),
     db: Session = Depends(get_db)
 ):
-    # token contains teacher USN
-    teacher_usn = token.get("usn")
-
-    user = db.query(User).filter(User.usn == teacher_usn).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    teacher = db.query(Teacher).filter(Teacher.user_id == user.id).first()
+    # principal = the teacher from the token (user already resolved)
+    teacher = identity_cache.teacher_by_usn(db, principal.usn)
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher profile not found")
 
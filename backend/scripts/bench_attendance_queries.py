@@ -0,0 +1,119 @@
+# Query plans + latency of the attendance hot queries, before and after the
+# composite indexes from utils/migrations.py, on a synthetic table.
+#
+# Usage: python scripts/bench_attendance_queries.py [rows] [database_url]
+# Default: 2,000,000 rows in a throwaway SQLite file. Never point this at a
+# production database — it drops and recreates the tables it uses.
+import sys, os, time, statistics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, text
+from utils.db import Base
+from models.user_model import User
+from models.attendance_model import Attendance
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+URL = sys.argv[2] if len(sys.argv) > 2 else "sqlite:////tmp/attendance_bench.db"
+STUDENTS = 5000
+SUBJECTS = [f"Subject {i}" for i in range(40)]
+CHUNK = 50_000
+REPEAT = 20
+
+QUERIES = {
+    "session view": (
+        "SELECT * FROM attendance WHERE session_id = :sid AND id > :since ORDER BY id LIMIT 500",
+        lambda: {"sid": f"S{random.randrange(ROWS // 60)}", "since": 0},
+    ),
+    "student history": (
+        "SELECT * FROM attendance WHERE user_usn = :usn ORDER BY timestamp DESC LIMIT 50",
+        lambda: {"usn": f"USN{random.randrange(STUDENTS):05d}"},
+    ),
+    "subject count": (
+        "SELECT COUNT(*) FROM attendance WHERE subject = :subject AND timestamp >= :since",
+        lambda: {"subject": random.choice(SUBJECTS), "since": datetime(2025, 6, 1)},
+    ),
+    "user by name": (
+        "SELECT * FROM users WHERE name = :name",
+        lambda: {"name": f"Student {random.randrange(STUDENTS)}"},
+    ),
+}
+HOT_INDEXES = {
+    "attendance": ["ix_attendance_session_id_id", "ix_attendance_user_usn_timestamp", "ix_attendance_subject_timestamp"],
+    "users": ["ix_users_name"],
+}
+
+engine = create_engine(URL)
+tables = [User.__table__, Attendance.__table__]
+
+
+def explain(conn, sql, params):
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    return [" | ".join(str(c) for c in row) for row in conn.execute(text(prefix + sql), params)]
+
+
+def run_suite(label):
+    print(f"\n=== {label} ===")
+    with engine.connect() as conn:
+        for name, (sql, make_params) in QUERIES.items():
+            params = make_params()
+            plan = explain(conn, sql, params)
+            timings = []
+            for _ in range(REPEAT):
+                params = make_params()
+                t0 = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - t0) * 1000)
+            print(f"{name:<16} median {statistics.median(timings):9.3f} ms   p95 {sorted(timings)[int(REPEAT * 0.95) - 1]:9.3f} ms")
+            for line in plan:
+                print(f"    plan: {line}")
+
+
+def populate():
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    start = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"usn": f"USN{i:05d}", "name": f"Student {i}", "email": f"s{i}@example.com",
+             "password_hash": "x", "is_teacher": False}
+            for i in range(STUDENTS)
+        ])
+    t0 = time.perf_counter()
+    for offset in range(0, ROWS, CHUNK):
+        batch = []
+        for i in range(offset, min(offset + CHUNK, ROWS)):
+            batch.append({
+                "user_usn": f"USN{random.randrange(STUDENTS):05d}",
+                "session_id": f"S{i // 60}",
+                "classroom_id": 1,
+                "subject": SUBJECTS[(i // 60) % len(SUBJECTS)],
+                "qr_match": True, "location_match": True, "face_match": True,
+                "marked_by_teacher": False,
+                "timestamp": start + timedelta(seconds=i * 7),
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(Attendance.__table__), batch)
+        print(f"\r  inserted {min(offset + CHUNK, ROWS):,}/{ROWS:,}", end="", flush=True)
+    print(f"  ({time.perf_counter() - t0:.1f}s)")
+
+
+def set_indexes(create):
+    with engine.begin() as conn:
+        for table_name, names in HOT_INDEXES.items():
+            for index in Base.metadata.tables[table_name].indexes:
+                if index.name in names:
+                    (index.create if create else index.drop)(conn, checkfirst=True)
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+
+
+print(f"Populating {ROWS:,} attendance rows at {URL}")
+populate()
+set_indexes(create=False)
+run_suite("without hot-query indexes")
+t0 = time.perf_counter()
+set_indexes(create=True)
+print(f"\nIndex build: {time.perf_counter() - t0:.1f}s")
+run_suite("with hot-query indexes")
@@ -0,0 +1,93 @@
+# Recall vs latency of the IVF face index against exact search, to pick
+# FACE_INDEX_NPROBE. Use it on real embeddings where you have them.
+#
+# Usage: python scripts/bench_face_index.py [n_students] [dim] [queries] [embeddings]
+#   embeddings: optional .npy (n, dim) array, or a face index snapshot (.npz,
+#   e.g. face_data/face_index.npz); n_students and dim are then taken from it.
+#
+# Without real data the embeddings are synthetic but not separable: students
+# lie on a low-dimensional manifold (like CNN face embeddings) in overlapping
+# clusters, plus isotropic noise. A query is a new "photo" of one student, at
+# a cosine distance comparable to same-person pairs under VGG-Face (~0.25).
+import sys, os, time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from ml_models.face_index import FaceIndex, _normalize
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+dim = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+n_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+embeddings_path = sys.argv[4] if len(sys.argv) > 4 else None
+k = 5
+
+LATENT_DIM = 64          # intrinsic dimension of the synthetic embeddings
+STUDENTS_PER_CLUSTER = 20
+CLUSTER_SPREAD = 1.0     # = spread between cluster centers: clusters overlap
+QUERY_SPREAD = 1.0       # same-student variation, in latent units
+ISOTROPIC_NOISE = 4.0
+REAL_QUERY_NOISE = 0.5   # real embeddings: noise per dimension, in units of that dimension's std
+
+rng = np.random.default_rng(42)
+
+
+def synthetic():
+    proj = rng.standard_normal((LATENT_DIM, dim)).astype(np.float32)
+    centers = rng.standard_normal((max(1, n // STUDENTS_PER_CLUSTER), LATENT_DIM)).astype(np.float32)
+    latent = centers[rng.integers(len(centers), size=n)] + \
+        CLUSTER_SPREAD * rng.standard_normal((n, LATENT_DIM)).astype(np.float32)
+
+    def embed(z):
+        return z @ proj + ISOTROPIC_NOISE * rng.standard_normal((len(z), dim)).astype(np.float32)
+
+    picks = rng.integers(n, size=n_queries)
+    queries = embed(latent[picks] + QUERY_SPREAD * rng.standard_normal((n_queries, LATENT_DIM)).astype(np.float32))
+    return embed(latent), picks, queries
+
+
+def real(path):
+    if path.endswith(".npz"):
+        with np.load(path) as snapshot:
+            data = snapshot["vectors"].astype(np.float32)
+    else:
+        data = np.load(path).astype(np.float32)
+    picks = rng.integers(len(data), size=n_queries)
+    noise = REAL_QUERY_NOISE * data.std(axis=0) * rng.standard_normal((n_queries, data.shape[1]))
+    return data, picks, data[picks] + noise.astype(np.float32)
+
+
+if embeddings_path:
+    data, picks, queries = real(embeddings_path)
+    n, dim = data.shape
+else:
+    data, picks, queries = synthetic()
+own_distance = np.mean(1.0 - np.sum(_normalize(queries) * _normalize(data[picks]), axis=1))
+
+print(f"Building index: {n} embeddings, dim={dim} ({'from ' + embeddings_path if embeddings_path else 'synthetic'})")
+print(f"  mean cosine distance query -> own student: {own_distance:.3f}")
+index = FaceIndex()
+t0 = time.perf_counter()
+for i, vec in enumerate(data):
+    index.add(f"USN{i:06d}", vec)
+index.train()
+print(f"  build: {time.perf_counter() - t0:.2f}s, lists={len(index.centroids) if index.centroids is not None else 0}")
+
+
+def own_first(results):
+    """Share of queries whose own student is the top hit (what identification needs)."""
+    return np.mean([bool(r) and r[0][0] == f"USN{p:06d}" for r, p in zip(results, picks)])
+
+
+t0 = time.perf_counter()
+exact = [index.search_exact(q, k) for q in queries]
+exact_ms = (time.perf_counter() - t0) * 1000 / n_queries
+truth = [{u for u, _ in r} for r in exact]
+print(f"\n{'mode':<14}{'recall@' + str(k):>10}{'own@1':>8}{'ms/query':>12}")
+print(f"{'exact':<14}{1.0:>10.3f}{own_first(exact):>8.3f}{exact_ms:>12.3f}")
+
+for nprobe in (1, 2, 4, 8, 16, 32):
+    t0 = time.perf_counter()
+    results = [index.search(q, k, nprobe=nprobe) for q in queries]
+    ms = (time.perf_counter() - t0) * 1000 / n_queries
+    recall = np.mean([len({u for u, _ in r} & t) / len(t) for r, t in zip(results, truth)])
+    print(f"{'ivf nprobe=' + str(nprobe):<14}{recall:>10.3f}{own_first(results):>8.3f}{ms:>12.3f}")
@@ -0,0 +1,40 @@
+# Login throughput of the bcrypt pool: verifies per second, total and per core,
+# for each cost factor. Use it to pick BCRYPT_ROUNDS / AUTH_HASH_WORKERS.
+#
+# Usage: python scripts/bench_password_hashing.py [seconds_per_run] [rounds ...]
+# Default: 5 s per run, rounds 10 11 12, threads 1 .. cpu_count
+import sys, os, time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+ROUNDS = [int(r) for r in sys.argv[2:]] or [10, 11, 12]
+CORES = os.cpu_count() or 1
+THREADS = sorted({1, max(1, CORES // 2), CORES})
+
+
+def run(ctx, stored, threads):
+    deadline = time.perf_counter() + SECONDS
+
+    def worker():
+        n = 0
+        while time.perf_counter() < deadline:
+            ctx.verify("correct horse battery staple", stored)
+            n += 1
+        return n
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(f.result() for f in [pool.submit(worker) for _ in range(threads)])
+    return total / (time.perf_counter() - t0)
+
+
+print(f"{CORES} cores, {SECONDS:.0f} s per run")
+for rounds in ROUNDS:
+    ctx = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    stored = ctx.hash("correct horse battery staple")
+    for threads in THREADS:
+        rate = run(ctx, stored, threads)
+        print(f"rounds {rounds:>2}  threads {threads:>3}  {rate:8.1f} logins/s  {rate / min(threads, CORES):7.1f} /s per core  {1000 / rate * threads:7.1f} ms each")
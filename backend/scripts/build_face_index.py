@@ -0,0 +1,20 @@
+# Rebuild the face ANN index from the stored per-student embeddings (face_data/*.npz)
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_models import face_index
+from services import face_embedding_service
+from utils.config import FACE_DATA_DIR, FACE_INDEX_PATH
+
+entries = []
+for fname in sorted(os.listdir(FACE_DATA_DIR)):
+    usn, ext = os.path.splitext(fname)
+    if ext != ".jpg":
+        continue
+    embedding = face_embedding_service.load_embedding(usn)
+    if embedding is None:
+        print(f"⚠️ No valid embedding for {usn}, skipped (re-register or verify once to backfill)")
+        continue
+    entries.append((usn, embedding))
+
+print("Indexed students:", face_index.rebuild(entries), "→", FACE_INDEX_PATH)
@@ -12,3 +12,4 @@ import models.student_model
 print("Creating tables...")
 Base.metadata.create_all(bind=engine)
 print("Tables created.")
+print("Now run scripts/migrate.py to apply schema migrations.")
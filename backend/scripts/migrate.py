@@ -0,0 +1,12 @@
+# Apply pending schema migrations. The only place migrations run: do it once
+# per deploy before starting the workers (the app refuses an old schema).
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db import engine
+from utils.migrations import migrate, current_version, latest_version
+
+applied = migrate(engine)
+with engine.connect() as conn:
+    print(f"Schema version: {current_version(conn)} (latest {latest_version()})")
+print("Applied now:", applied or "none")
@@ -0,0 +1,37 @@
+# One-off: replace full-size registered photos in face_data/ with normalized
+# face crops (+ fresh embeddings), as register_face now stores them.
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from ml_models import face_index, face_model
+from services import face_embedding_service
+from utils.config import FACE_DATA_DIR, FACE_CROP_SIZE
+
+face_model.load()
+before = after = 0
+for fname in sorted(os.listdir(FACE_DATA_DIR)):
+    usn, ext = os.path.splitext(fname)
+    if ext != ".jpg":
+        continue
+    path = os.path.join(FACE_DATA_DIR, fname)
+    img = cv2.imread(path)
+    if img is None:
+        print(f"⚠️ Unreadable: {path}")
+        continue
+    if img.shape[:2] == (FACE_CROP_SIZE, FACE_CROP_SIZE):
+        continue  # already normalized
+
+    crop, embedding, confidence = face_model.normalize_face(img, FACE_CROP_SIZE)
+    if confidence <= 0:
+        print(f"⚠️ No face detected for {usn}, left unchanged")
+        continue
+
+    before += os.path.getsize(path)
+    cv2.imwrite(path, crop, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    after += os.path.getsize(path)
+    face_embedding_service.save_embedding(usn, embedding)
+    face_index.add(usn, embedding)
+    print(f"✅ {usn} normalized")
+
+print(f"face_data: {before / 1e6:.1f} MB → {after / 1e6:.1f} MB")
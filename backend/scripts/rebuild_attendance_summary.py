@@ -0,0 +1,13 @@
+# Recompute attendance_summary from the attendance + active_sessions tables
+# (backfill, or repair after editing attendance rows by hand).
+# Stop writers first: marks committed during the rebuild may be counted twice.
+import sys, os, time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db import engine
+from services import attendance_summary
+
+t0 = time.perf_counter()
+with engine.begin() as conn:
+    rows = attendance_summary.rebuild(conn)
+print(f"✅ attendance_summary rebuilt: {rows} student/subject rows in {time.perf_counter() - t0:.1f}s")
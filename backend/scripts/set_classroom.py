@@ -0,0 +1,38 @@
+# Add or update a classroom's geofence and make every worker reload it now.
+# Usage: python scripts/set_classroom.py <room_number> <lat> <lon> [radius_m] [footprint_json]
+#        python scripts/set_classroom.py --reload   (after editing classrooms by hand)
+# footprint_json: '[[lat, lon], [lat, lon], ...]' for halls; takes precedence over the radius.
+# Rooms edited any other way are picked up within GEOFENCE_REFRESH_SECONDS.
+import sys, os, json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db import SessionLocal
+from models.classroom_model import Classroom
+from services import geofence
+
+if len(sys.argv) == 2 and sys.argv[1] == "--reload":
+    geofence.invalidate()
+    print("✅ Geofence index invalidated; workers reload on their next lookup")
+    sys.exit(0)
+
+if len(sys.argv) < 4:
+    sys.exit("usage: set_classroom.py <room_number> <lat> <lon> [radius_m] [footprint_json] | --reload")
+
+room_number, lat, lon = sys.argv[1], float(sys.argv[2]), float(sys.argv[3])
+radius_m = float(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else None
+footprint = json.loads(sys.argv[5]) if len(sys.argv) > 5 else None
+
+db = SessionLocal()
+try:
+    room = db.query(Classroom).filter(Classroom.room_number == room_number).first()
+    if room is None:
+        room = Classroom(room_number=room_number)
+        db.add(room)
+    room.lat, room.lon, room.radius_m, room.footprint = lat, lon, radius_m, footprint
+    db.commit()
+    print(f"✅ Classroom {room_number} (id {room.id}) saved")
+finally:
+    db.close()
+
+# Every worker drops its in-process index on its next lookup
+geofence.invalidate()
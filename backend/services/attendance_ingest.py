@@ -0,0 +1,261 @@
+# Write-behind ingestion for POST /attendance/mark.
+# A mark is acknowledged once it is appended (and fsync'd) to a local log
+# segment. A flusher thread drains pending rows every ATTENDANCE_FLUSH_INTERVAL_MS
+# (or as soon as ATTENDANCE_FLUSH_BATCH rows are waiting) with one INSERT ... IGNORE
+# and one COMMIT per batch, then deletes the segments that batch covered.
+#
+# Each worker process owns its segments (<owner>.<seq>.log) and holds an flock on
+# <owner>.lock while alive. On start - and periodically - segments whose owner
+# lock is free (crashed / stopped worker) are replayed into the database.
+# Replays are idempotent thanks to the unique (session_id, user_usn) index.
+#
+# Pending rows are visible to readers in the same worker (read-your-writes for
+# the student); other workers see them after the next flush.
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from utils.db import SessionLocal
+from models.attendance_model import Attendance
+from services import attendance_summary
+from utils import metrics
+from utils.config import (
+    ATTENDANCE_LOG_DIR, ATTENDANCE_LOG_FSYNC, ATTENDANCE_FLUSH_INTERVAL_MS, ATTENDANCE_FLUSH_BATCH
+)
+
+RECOVER_EVERY_SECONDS = 30
+
+_lock = threading.Lock()  # guards the current segment + pending rows
+_wakeup = threading.Condition(_lock)
+_owner = None
+_owner_lock_file = None
+_segment = None  # open file of the current segment
+_segment_seq = 0
+_sealed = []  # segments written before the last rotation, not yet committed
+_pending = []  # rows appended but not yet committed, oldest first
+_pending_keys = set()  # (session_id, user_usn)
+_thread = None
+_stopping = False
+
+
+def _segment_path(owner: str, seq: int):
+    return os.path.join(ATTENDANCE_LOG_DIR, f"{owner}.{seq}.log")
+
+
+def _open_segment():
+    global _segment, _segment_seq
+    _segment_seq += 1
+    _segment = open(_segment_path(_owner, _segment_seq), "a", encoding="utf-8")
+
+
+def _to_db_row(row: dict):
+    return dict(row, timestamp=datetime.fromisoformat(row["timestamp"]))
+
+
+def _insert(rows):
+    """Multi-row INSERT ... IGNORE (see attendance_summary.insert_marks) + one COMMIT per chunk of rows."""
+    db = SessionLocal()
+    try:
+        for i in range(0, len(rows), ATTENDANCE_FLUSH_BATCH):
+            chunk = [_to_db_row(r) for r in rows[i:i + ATTENDANCE_FLUSH_BATCH]]
+            # Replayed segments may hold rows that were already committed
+            existing = set(db.execute(
+                select(Attendance.session_id, Attendance.user_usn).where(
+                    tuple_(Attendance.session_id, Attendance.user_usn).in_(
+                        [(r["session_id"], r["user_usn"]) for r in chunk]
+                    )
+                )
+            ).all())
+            new_rows = [r for r in chunk if (r["session_id"], r["user_usn"]) not in existing]
+            if new_rows:
+                attendance_summary.insert_marks(db, new_rows)
+            db.commit()
+    finally:
+        db.close()
+
+
+# ---------------------------
+# 🟩 APPEND (request path)
+# ---------------------------
+def running():
+    return _thread is not None and _thread.is_alive()
+
+
+def append(row: dict):
+    """
+    Durably log one attendance row (see Attendance columns; timestamp as ISO string).
+    Returns False if the same (session_id, user_usn) is already pending.
+    """
+    key = (row["session_id"], row["user_usn"])
+    line = json.dumps(row) + "\n"
+    with _lock:
+        if key in _pending_keys:
+            return False
+        _segment.write(line)
+        _segment.flush()
+        if ATTENDANCE_LOG_FSYNC:
+            os.fsync(_segment.fileno())
+        _pending.append(row)
+        _pending_keys.add(key)
+        metrics.set_gauge("attendance_ingest.pending", len(_pending))
+        if len(_pending) >= ATTENDANCE_FLUSH_BATCH:
+            _wakeup.notify()
+    metrics.inc("attendance_ingest.appended")
+    return True
+
+
+def is_pending(session_id: str, usn: str):
+    with _lock:
+        return (session_id, usn) in _pending_keys
+
+
+def pending_for_user(usn: str):
+    """Rows for this student not yet committed, newest first."""
+    with _lock:
+        return [dict(r) for r in reversed(_pending) if r["user_usn"] == usn]
+
+
+def pending_for_session(session_id: str):
+    """Rows for this session not yet committed, newest first."""
+    with _lock:
+        return [dict(r) for r in reversed(_pending) if r["session_id"] == session_id]
+
+
+# ---------------------------
+# 🟦 FLUSH (background thread)
+# ---------------------------
+def flush():
+    """Commit everything pending now. Returns the number of rows written."""
+    with _lock:
+        if not _pending:
+            return 0
+        batch = list(_pending)
+        # Rotate so the sealed segments hold exactly the rows in `batch`
+        _segment.close()
+        _sealed.append(_segment.name)
+        _open_segment()
+        sealed = list(_sealed)
+
+    started = time.monotonic()
+    _insert(batch)
+    metrics.observe("attendance_ingest.flush_ms", (time.monotonic() - started) * 1000)
+    metrics.observe("attendance_ingest.flush_size", len(batch))
+
+    with _lock:
+        del _pending[:len(batch)]  # appends only ever go to the end
+        for r in batch:
+            _pending_keys.discard((r["session_id"], r["user_usn"]))
+        del _sealed[:len(sealed)]
+        metrics.set_gauge("attendance_ingest.pending", len(_pending))
+    for path in sealed:
+        os.remove(path)
+    return len(batch)
+
+
+def recover():
+    """Replay segments left behind by workers that are no longer running."""
+    replayed = 0
+    for lock_path in glob.glob(os.path.join(ATTENDANCE_LOG_DIR, "*.lock")):
+        owner = os.path.basename(lock_path)[:-len(".lock")]
+        if owner == _owner:
+            continue
+        try:
+            f = open(lock_path, "r+")  # never create: a missing lock was replayed already
+        except FileNotFoundError:
+            continue
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue  # owner still alive
+            if not os.path.exists(lock_path):
+                continue  # another worker replayed and removed it between our open and flock
+            segments = sorted(
+                glob.glob(os.path.join(ATTENDANCE_LOG_DIR, f"{owner}.*.log")),
+                key=lambda p: int(p.rsplit(".", 2)[1])
+            )
+            rows = []
+            for path in segments:
+                with open(path, encoding="utf-8") as seg:
+                    for line in seg:
+                        if line.endswith("\n"):  # a torn last line was never acknowledged
+                            rows.append(json.loads(line))
+            if rows:
+                _insert(rows)
+            for path in segments:
+                os.remove(path)
+            os.remove(lock_path)
+        replayed += len(rows)
+    if replayed:
+        metrics.inc("attendance_ingest.recovered", replayed)
+        print(f"🔁 Replayed {replayed} attendance rows from the ingest log")
+    return replayed
+
+
+def _run():
+    last_recover = time.monotonic()
+    while True:
+        with _lock:
+            if not _stopping and len(_pending) < ATTENDANCE_FLUSH_BATCH:
+                _wakeup.wait(ATTENDANCE_FLUSH_INTERVAL_MS / 1000.0)
+            if _stopping:
+                return
+        try:
+            flush()
+            if time.monotonic() - last_recover >= RECOVER_EVERY_SECONDS:
+                last_recover = time.monotonic()
+                recover()
+        except Exception as e:
+            # Rows stay pending and on disk; the next tick retries
+            metrics.inc("attendance_ingest.flush_errors")
+            print("❌ Attendance flush failed:", e)
+            time.sleep(ATTENDANCE_FLUSH_INTERVAL_MS / 1000.0)
+
+
+# ---------------------------
+# 🟧 LIFECYCLE
+# ---------------------------
+def start():
+    """Take ownership of a fresh log, replay orphaned ones and start the flusher."""
+    global _owner, _owner_lock_file, _thread, _stopping
+    if running():
+        return
+    os.makedirs(ATTENDANCE_LOG_DIR, exist_ok=True)
+    _owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    _owner_lock_file = open(os.path.join(ATTENDANCE_LOG_DIR, f"{_owner}.lock"), "a")
+    fcntl.flock(_owner_lock_file, fcntl.LOCK_EX)
+    recover()
+    with _lock:
+        _stopping = False
+        _open_segment()
+    _thread = threading.Thread(target=_run, name="attendance-ingest-flusher", daemon=True)
+    _thread.start()
+
+
+def stop():
+    """Stop the flusher and commit what is left; on failure the log is replayed later."""
+    global _thread, _stopping, _owner_lock_file
+    if not running():
+        return
+    with _lock:
+        _stopping = True
+        _wakeup.notify()
+    _thread.join()
+    _thread = None
+    try:
+        flush()
+    except Exception as e:
+        print("❌ Final attendance flush failed, log kept for replay:", e)
+        return
+    with _lock:
+        _segment.close()
+        os.remove(_segment.name)
+    lock_path = _owner_lock_file.name
+    os.remove(lock_path)
+    _owner_lock_file.close()
+    _owner_lock_file = None
@@ -0,0 +1,181 @@
+# Incrementally maintained attendance_summary table.
+# Every path that inserts attendance rows goes through insert_marks(), which
+# folds only the rows the database actually inserted into the summary, inside
+# the same transaction; session creation calls record_session_held() (manual
+# sessions: record_manual_session()). Dashboards then read one row per (student, subject)
+# instead of aggregating the attendance table. rebuild() recomputes the whole
+# table from attendance + active_sessions (scripts/rebuild_attendance_summary.py).
+#
+# All functions take a sync Session or Connection and never commit.
+from collections import defaultdict
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select, update
+from models.active_session import ActiveSession
+from models.attendance_model import Attendance
+from models.attendance_summary_model import AttendanceSummary, SESSIONS_ROW
+from models.manual_session_model import ManualSession
+from utils.db import insert_ignore
+
+summary = AttendanceSummary.__table__
+INSERT_CHUNK = 500  # rows per multi-row INSERT (stays under SQLite's bound-parameter limit)
+
+# Self-marked rows always count, teacher rows count if any check passed
+ATTENDED = or_(
+    Attendance.marked_by_teacher.is_(None),
+    Attendance.marked_by_teacher == False,
+    Attendance.qr_match == True,
+    Attendance.location_match == True,
+    Attendance.face_match == True
+)
+
+
+def _is_attended(row: dict):
+    return (not row.get("marked_by_teacher")) or bool(
+        row.get("qr_match") or row.get("location_match") or row.get("face_match")
+    )
+
+
+def _bump(db, usn: str, subject: str, counts: dict, last_seen=None):
+    """Add counts to one summary row, creating it if needed."""
+    key = and_(summary.c.usn == usn, summary.c.subject == subject)
+    values = {name: summary.c[name] + n for name, n in counts.items()}
+    if last_seen is not None:
+        values["last_seen"] = case(
+            (or_(summary.c.last_seen.is_(None), summary.c.last_seen < last_seen), last_seen),
+            else_=summary.c.last_seen
+        )
+    for _ in range(2):
+        if db.execute(update(summary).where(key).values(**values)).rowcount:
+            return
+        row = {"usn": usn, "subject": subject, "records": 0, "attended": 0,
+               "teacher_marked": 0, "face_verified": 0, "sessions_held": 0, "last_seen": last_seen}
+        row.update(counts)
+        if db.execute(insert_ignore(summary).values(**row)).rowcount:
+            return
+        # Lost an insert race with another writer: the row exists now, update it
+
+
+def record_marks(db, rows):
+    """Fold newly inserted attendance rows (dicts of Attendance columns) into the summary."""
+    groups = defaultdict(lambda: {"records": 0, "attended": 0, "teacher_marked": 0, "face_verified": 0})
+    last_seen = {}
+    for r in rows:
+        key = (r["user_usn"], r.get("subject") or "")
+        g = groups[key]
+        g["records"] += 1
+        g["attended"] += int(_is_attended(r))
+        g["teacher_marked"] += int(bool(r.get("marked_by_teacher")))
+        g["face_verified"] += int(bool(r.get("face_match")))
+        ts = r.get("timestamp")
+        if ts is not None and (key not in last_seen or ts > last_seen[key]):
+            last_seen[key] = ts
+    for (usn, subject), counts in groups.items():
+        _bump(db, usn, subject, counts, last_seen.get((usn, subject)))
+
+
+def insert_marks(db, rows):
+    """
+    INSERT ... IGNORE attendance rows and fold the ones actually inserted into
+    the summary; returns them. Normally one multi-row statement per chunk; if
+    the database skipped any (already marked, or a concurrent writer won), the
+    chunk is rolled back to a savepoint and redone row by row to learn which.
+    """
+    table = Attendance.__table__
+    inserted = []
+    for i in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[i:i + INSERT_CHUNK]
+        savepoint = db.begin_nested()
+        if db.execute(insert_ignore(table).values(chunk)).rowcount == len(chunk):
+            savepoint.commit()
+            inserted.extend(chunk)
+            continue
+        savepoint.rollback()
+        inserted.extend(r for r in chunk if db.execute(insert_ignore(table).values(**r)).rowcount == 1)
+    record_marks(db, inserted)
+    return inserted
+
+
+def record_session_held(db, subject: str, count: int = 1):
+    _bump(db, SESSIONS_ROW, subject or "", {"sessions_held": count})
+
+
+def record_manual_session(db, session_id: str, subject: str, teacher_id: str):
+    """Count a teacher-override session as held, once: only the insert that creates its row bumps."""
+    created = db.execute(insert_ignore(ManualSession.__table__).values(
+        session_id=session_id, subject=subject or "", teacher_id=teacher_id
+    )).rowcount
+    if created:
+        record_session_held(db, subject)
+    return bool(created)
+
+
+def rebuild(db):
+    """Recompute the whole table from attendance, active_sessions and manual_sessions. Returns student rows written."""
+    subject = func.coalesce(Attendance.subject, "")
+    db.execute(delete(summary))
+    written = db.execute(insert(summary).from_select(
+        ["usn", "subject", "records", "attended", "teacher_marked", "face_verified", "sessions_held", "last_seen"],
+        select(
+            Attendance.user_usn,
+            subject,
+            func.count(Attendance.id),
+            func.sum(case((ATTENDED, 1), else_=0)),
+            func.sum(case((Attendance.marked_by_teacher == True, 1), else_=0)),
+            func.sum(case((Attendance.face_match == True, 1), else_=0)),
+            literal(0),
+            func.max(Attendance.timestamp)
+        )
+        .where(Attendance.user_usn.isnot(None))
+        .group_by(Attendance.user_usn, subject)
+    )).rowcount
+
+    # Sessions held: every QR session, plus manual (teacher override) sessions
+    held = defaultdict(int)
+    for subj, n in db.execute(
+        select(ActiveSession.subject, func.count()).group_by(ActiveSession.subject)
+    ):
+        held[subj or ""] += n
+    manual = dict(db.execute(select(ManualSession.session_id, ManualSession.subject)).all())
+    for session_id, subj in db.execute(
+        select(Attendance.session_id, subject).where(Attendance.session_id.like("manual-%")).distinct()
+    ):
+        manual.setdefault(session_id, subj)
+    for subj in manual.values():
+        held[subj or ""] += 1
+    if held:
+        db.execute(insert(summary), [
+            {"usn": SESSIONS_ROW, "subject": subj, "records": 0, "attended": 0,
+             "teacher_marked": 0, "face_verified": 0, "sessions_held": n, "last_seen": None}
+            for subj, n in held.items()
+        ])
+    return written
+
+
+# ---------------------------
+# 🟨 Reads
+# ---------------------------
+def sessions_held(db):
+    """{subject: sessions held} from the per-subject "*" rows."""
+    return {
+        subj: n for subj, n in db.execute(
+            select(summary.c.subject, summary.c.sessions_held).where(summary.c.usn == SESSIONS_ROW)
+        )
+    }
+
+
+def for_student(db, usn: str, held: dict = None):
+    """Summary rows of one student joined with sessions held per subject."""
+    if held is None:
+        held = sessions_held(db)
+    rows = db.execute(select(summary).where(summary.c.usn == usn)).mappings().all()
+    return [dict(r, sessions_held=held.get(r["subject"], 0)) for r in rows]
+
+
+def for_subject(db, subject: str):
+    """(sessions held, rows of every student with attendance in the subject)."""
+    held = db.execute(
+        select(summary.c.sessions_held).where(summary.c.usn == SESSIONS_ROW, summary.c.subject == subject)
+    ).scalar() or 0
+    rows = db.execute(
+        select(summary).where(summary.c.subject == subject, summary.c.usn != SESSIONS_ROW).order_by(summary.c.usn)
+    ).mappings().all()
+    return held, [dict(r) for r in rows]
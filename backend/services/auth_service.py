@@ -0,0 +1,86 @@
+# Password hashing off the request path.
+# bcrypt is deliberately slow (~250 ms at cost 12), so hash / verify run on a
+# dedicated thread pool of AUTH_HASH_WORKERS threads (bcrypt releases the GIL)
+# instead of Starlette's shared threadpool, where a login burst would starve
+# every other sync route. At most AUTH_HASH_QUEUE_LIMIT operations may be queued
+# or running; beyond that callers get AuthBusyError (-> 503 + Retry-After).
+import asyncio
+import hmac
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from passlib.exc import UnknownHashError
+from utils import metrics
+from utils.config import AUTH_HASH_QUEUE_LIMIT, AUTH_HASH_WORKERS, BCRYPT_ROUNDS
+
+# needs_update() is true for hashes made with any other cost, so changing
+# BCRYPT_ROUNDS re-hashes each password on its next successful login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=max(1, AUTH_HASH_WORKERS), thread_name_prefix="bcrypt")
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class AuthBusyError(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+def _hash(password: str):
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, stored: str):
+    """(ok, replacement hash or None). Plaintext legacy passwords are upgraded too."""
+    try:
+        ok = pwd_context.verify(password, stored)
+    except (UnknownHashError, ValueError):
+        # HASH missing / old DB using plain password
+        ok = hmac.compare_digest(password.encode("utf-8"), (stored or "").encode("utf-8"))
+        return ok, (pwd_context.hash(password) if ok else None)
+    if ok and pwd_context.needs_update(stored):
+        return ok, pwd_context.hash(password)
+    return ok, None
+
+
+async def _run(fn, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= AUTH_HASH_QUEUE_LIMIT:
+            metrics.inc("auth_hash.rejected")
+            raise AuthBusyError("Too many logins in progress")
+        _pending += 1
+        metrics.set_gauge("auth_hash.pending", _pending)
+
+    queued = time.monotonic()
+
+    def timed():
+        started = time.monotonic()
+        metrics.observe("auth_hash.wait_ms", (started - queued) * 1000)
+        try:
+            return fn(*args)
+        finally:
+            metrics.observe("auth_hash.hash_ms", (time.monotonic() - started) * 1000)
+
+    def done(_future):
+        global _pending
+        with _pending_lock:
+            _pending -= 1
+            metrics.set_gauge("auth_hash.pending", _pending)
+
+    # Released when the hash itself finishes (or is cancelled before it starts),
+    # not when the awaiting request goes away: a cancelled request's bcrypt
+    # call keeps its thread busy until it is done.
+    future = _executor.submit(timed)
+    future.add_done_callback(done)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password(password: str):
+    return await _run(_hash, password)
+
+
+async def verify_password(password: str, stored: str):
+    """Check a password; returns (ok, new_hash) where new_hash should replace the stored one if set."""
+    return await _run(_verify, password, stored)
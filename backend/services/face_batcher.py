@@ -0,0 +1,140 @@
+# Micro-batching in front of the face recognizer.
+# Concurrent embed requests are queued; a dispatcher thread drains up to
+# FACE_BATCH_MAX_SIZE of them (waiting at most FACE_BATCH_MAX_WAIT_MS after the
+# first one arrives) and sends them to the inference pool as one batch.
+# At most one batch per pool worker is in flight, so under load batches grow
+# instead of piling up inside the pool. Once FACE_QUEUE_LIMIT images are
+# pending, submit() refuses new work with FaceBusyError. Pool jobs that can't
+# be batched (registration, group photos) go through submit_job(), which
+# counts against the same limit.
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from services import face_executor
+from utils import metrics
+from utils.config import (
+    FACE_BATCH_MAX_SIZE, FACE_BATCH_MAX_WAIT_MS, FACE_POOL_WORKERS, FACE_QUEUE_LIMIT
+)
+
+
+class FaceBusyError(Exception):
+    """Raised when the face inference queue is full."""
+
+
+class FaceBatcher:
+    def __init__(self, dispatch, max_batch_size: int, max_wait_ms: float,
+                 max_in_flight: int = 1, max_pending: int = 0, name: str = "face_batch"):
+        self.dispatch = dispatch  # list of images -> Future of list of results
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_pending = max_pending  # 0 = unbounded
+        self.name = name
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(max(1, max_in_flight))
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _admit(self):
+        with self._pending_lock:
+            if self.max_pending and self._pending >= self.max_pending:
+                metrics.inc(f"{self.name}.rejected")
+                raise FaceBusyError("Face verification queue is full")
+            self._pending += 1
+            metrics.set_gauge(f"{self.name}.pending", self._pending)
+
+    def submit(self, img):
+        """Queue one image; the returned Future resolves to its embedding."""
+        self._admit()
+        self._ensure_started()
+        fut = Future()
+        fut.add_done_callback(self._release)
+        self._queue.put((img, fut, time.monotonic()))
+        metrics.set_gauge(f"{self.name}.queue_depth", self._queue.qsize())
+        return fut
+
+    def submit_job(self, fn, *args):
+        """Run one unbatched face_executor job, admitted against the same queue limit."""
+        self._admit()
+        try:
+            fut = face_executor.submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        fut.add_done_callback(self._release)
+        return fut
+
+    def embed(self, img):
+        """Blocking helper: submit and wait for the result."""
+        return self.submit(img).result()
+
+    def _release(self, _fut):
+        with self._pending_lock:
+            self._pending -= 1
+            metrics.set_gauge(f"{self.name}.pending", self._pending)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self._slots.acquire()  # wait for a free worker before forming the batch
+            batch = self._collect()
+            metrics.set_gauge(f"{self.name}.queue_depth", self._queue.qsize())
+            metrics.observe(f"{self.name}.size", len(batch))
+            started = time.monotonic()
+            for _, _, queued_at in batch:
+                metrics.observe(f"{self.name}.wait_ms", (started - queued_at) * 1000)
+
+            try:
+                job = self.dispatch([img for img, _, _ in batch])
+            except Exception as e:
+                job = Future()
+                job.set_exception(e)
+            job.add_done_callback(lambda f, b=batch, t=started: self._resolve(f, b, t))
+
+    def _resolve(self, job, batch, started):
+        self._slots.release()
+        metrics.inc(f"{self.name}.batches")
+        metrics.observe(f"{self.name}.inference_ms", (time.monotonic() - started) * 1000)
+
+        try:
+            results = job.result()
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, fut, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+
+batcher = FaceBatcher(
+    face_executor.submit_batch,
+    FACE_BATCH_MAX_SIZE,
+    FACE_BATCH_MAX_WAIT_MS,
+    max_in_flight=max(1, FACE_POOL_WORKERS),
+    max_pending=FACE_QUEUE_LIMIT
+)
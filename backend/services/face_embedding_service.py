@@ -0,0 +1,107 @@
+# Precomputed embeddings for registered face photos.
+# register_face stores <usn>.npz next to <usn>.jpg so /facial/verify only has
+# to run the model on the live frame. A stored embedding is reused as long as
+# the photo's mtime (or, failing that, its content hash) still matches.
+import asyncio
+import hashlib
+import os
+import numpy as np
+from services.face_batcher import batcher
+from utils.config import FACE_MODEL_NAME, FACE_DATA_DIR
+
+
+def photo_path(usn: str):
+    return os.path.join(FACE_DATA_DIR, f"{usn}.jpg")
+
+
+def embedding_path(usn: str):
+    return os.path.join(FACE_DATA_DIR, f"{usn}.npz")
+
+
+def _file_sha256(path: str):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def compute_embedding(img):
+    """
+    Run the face model once on an image (path or BGR array) and return its embedding.
+    Goes through the micro-batcher so concurrent callers share forward passes.
+    """
+    return batcher.embed(img)
+
+
+async def compute_embedding_async(img):
+    """Awaitable compute_embedding for async routes (does not hold a thread while waiting)."""
+    return await asyncio.wrap_future(batcher.submit(img))
+
+
+def save_embedding(usn: str, embedding):
+    """Store the embedding together with the fingerprint of the photo it came from."""
+    photo = photo_path(usn)
+    st = os.stat(photo)
+    target = embedding_path(usn)
+    tmp = f"{target}.{os.getpid()}.tmp.npz"
+    np.savez(
+        tmp,
+        embedding=np.asarray(embedding, dtype=np.float32),
+        sha256=np.array(_file_sha256(photo)),
+        mtime_ns=np.array(st.st_mtime_ns),
+        model=np.array(FACE_MODEL_NAME)
+    )
+    os.replace(tmp, target)
+
+
+def load_embedding(usn: str):
+    """
+    Return the stored embedding for a user, or None if it is missing or stale
+    (photo replaced, or computed with a different model).
+    """
+    photo = photo_path(usn)
+    path = embedding_path(usn)
+    if not os.path.exists(photo) or not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path) as data:
+            embedding = data["embedding"]
+            sha256 = str(data["sha256"])
+            mtime_ns = int(data["mtime_ns"])
+            model = str(data["model"])
+    except Exception as e:
+        print(f"⚠️ Unreadable embedding file {path}: {e}")
+        return None
+
+    if model != FACE_MODEL_NAME:
+        return None
+
+    if os.stat(photo).st_mtime_ns == mtime_ns:
+        return embedding
+
+    # mtime changed (copied / touched) — only trust it if the content is the same
+    if _file_sha256(photo) == sha256:
+        save_embedding(usn, embedding)
+        return embedding
+
+    return None
+
+
+def get_reference_embedding(usn: str):
+    """Stored embedding for a registered photo, recomputed and saved if stale."""
+    embedding = load_embedding(usn)
+    if embedding is None:
+        embedding = compute_embedding(photo_path(usn))
+        save_embedding(usn, embedding)
+    return embedding
+
+
+def cosine_distance(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    if denom == 0:
+        return 1.0
+    return 1.0 - float(np.dot(a, b)) / denom
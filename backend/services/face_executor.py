@@ -0,0 +1,149 @@
+# Dedicated process pool for CPU-bound face inference.
+# Each worker process loads and warms the face model once (pool initializer),
+# so inference never runs on Starlette's threadpool or under the web process's GIL.
+# With FACE_POOL_WORKERS=0 inference runs in-process instead (dev / tests).
+# A pool whose warm-up failed or that broke (a worker died) is shut down and
+# rebuilt by the next start(), at most once per RESTART_BACKOFF_SECONDS.
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from ml_models import face_model
+from utils import metrics
+from utils.config import FACE_POOL_WORKERS
+
+RESTART_BACKOFF_SECONDS = 10
+
+_pool = None
+_warm = []  # one warm-up future per worker
+_started_at = 0.0
+_lock = threading.Lock()
+
+
+class FacePoolError(Exception):
+    """The inference pool is unavailable (warm-up failed or a worker died)."""
+
+
+def _warm_ok(fut):
+    return fut.done() and not fut.cancelled() and not fut.exception() and fut.result()
+
+
+def _warm_failed(fut):
+    return fut.done() and not _warm_ok(fut)
+
+
+def _discard(pool):
+    """Shut down `pool` if it is still the current one (caller holds the lock)."""
+    global _pool, _warm
+    if pool is None or pool is not _pool:
+        return
+    pool.shutdown(wait=False, cancel_futures=True)
+    _pool, _warm = None, []
+    metrics.inc("face_pool.restarts")
+    print("⚠️ Face inference pool discarded, will be rebuilt")
+
+
+def start():
+    """Create the pool and warm every worker. Safe to call repeatedly."""
+    global _pool, _warm, _started_at
+    if FACE_POOL_WORKERS <= 0:
+        face_model.load_in_background()
+        return
+    with _lock:
+        if _pool is not None and any(_warm_failed(f) for f in _warm):
+            if time.monotonic() - _started_at < RESTART_BACKOFF_SECONDS:
+                return
+            _discard(_pool)
+        if _pool is not None:
+            return
+        # spawn: never fork a process that may already hold TensorFlow threads
+        _pool = ProcessPoolExecutor(
+            max_workers=FACE_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=face_model.load
+        )
+        _warm = [_pool.submit(face_model.load) for _ in range(FACE_POOL_WORKERS)]
+        _started_at = time.monotonic()
+
+
+def shutdown():
+    global _pool, _warm
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _warm = None, []
+
+
+def is_ready():
+    if FACE_POOL_WORKERS <= 0:
+        return face_model.is_ready()
+    return bool(_warm) and all(_warm_ok(f) for f in _warm)
+
+
+def status():
+    if FACE_POOL_WORKERS <= 0:
+        return dict(face_model.status(), workers=0)
+    warm = sum(1 for f in _warm if _warm_ok(f))
+    if is_ready():
+        state = face_model.READY
+    elif any(_warm_failed(f) for f in _warm):
+        state = face_model.FAILED
+    else:
+        state = face_model.LOADING if _pool else face_model.COLD
+    return {
+        "model": face_model.FACE_MODEL_NAME,
+        "state": state,
+        "workers": FACE_POOL_WORKERS,
+        "warm_workers": warm
+    }
+
+
+def submit_batch(images):
+    """Run face_model.represent_batch for a list of images; returns a Future."""
+    return submit(face_model.represent_batch, images)
+
+
+def submit(fn, *args):
+    """
+    Run any picklable face_model function in the pool; returns a Future.
+    Pool failures surface as FacePoolError (and discard the pool), never as
+    the function's own errors.
+    """
+    if FACE_POOL_WORKERS <= 0:
+        fut = Future()
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+    if _pool is None:
+        start()
+    pool = _pool
+    if pool is None:
+        raise FacePoolError("Face inference pool is not running")
+    try:
+        inner = pool.submit(fn, *args)
+    except (BrokenProcessPool, RuntimeError) as e:  # RuntimeError: pool already shut down
+        with _lock:
+            _discard(pool)
+        raise FacePoolError(str(e)) from e
+
+    outer = Future()
+
+    def relay(f):
+        if f.cancelled():
+            outer.set_exception(FacePoolError("Face inference was cancelled (pool shut down)"))
+            return
+        exc = f.exception()
+        if isinstance(exc, BrokenProcessPool):
+            with _lock:
+                _discard(pool)
+            outer.set_exception(FacePoolError(str(exc)))
+        elif exc is not None:
+            outer.set_exception(exc)
+        else:
+            outer.set_result(f.result())
+
+    inner.add_done_callback(relay)
+    return outer
@@ -1,44 +1,147 @@
 # utilities for training and recognizing using OpenCV LBPH
 import cv2
+import fcntl
+import hashlib
 import os
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "static", "face_data")
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "ml_models", "face_model.yml")
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
 
+def _content_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
 def collect_images_for_user(label:int, image_paths:list):
     """
     image_paths: list of paths to grayscale face images already cropped
     Each label should be integer and mapping label->user.id stored externally.
+    Returns the paths that were newly copied into the label folder; a source
+    whose content is already in the folder is skipped (re-running enrollment
+    with the same images must not add LBPH samples twice).
     """
+    import shutil
     label_dir = os.path.join(DATA_DIR, str(label))
     os.makedirs(label_dir, exist_ok=True)
-    for i, p in enumerate(image_paths):
+    existing = os.listdir(label_dir)
+    known = {_content_hash(os.path.join(label_dir, f)) for f in existing}
+    added = []
+    i = len(existing)  # continue numbering after the label's existing images
+    for p in image_paths:
+        digest = _content_hash(p)
+        if digest in known:
+            continue
+        known.add(digest)
         ext = os.path.splitext(p)[1]
+        while os.path.exists(os.path.join(label_dir, f"{i}{ext}")):
+            i += 1
         dest = os.path.join(label_dir, f"{i}{ext}")
-        if not os.path.exists(dest):
-            import shutil
-            shutil.copy(p, dest)
+        shutil.copy(p, dest)
+        added.append(dest)
+        i += 1
+    return added
+
+@contextmanager
+def _model_lock():
+    """Serialize read-modify-write of the model file across processes."""
+    with open(MODEL_PATH + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _save_atomic(recognizer):
+    """Write to a temp file and swap it in, so readers never see a half-written model."""
+    tmp = f"{MODEL_PATH}.{os.getpid()}.tmp.yml"
+    recognizer.save(tmp)
+    os.replace(tmp, MODEL_PATH)
+
+def _read_gray(path):
+    return cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+
+def _load_images(items, workers=None):
+    """
+    items: list of (path, label). Images are decoded in parallel threads
+    (cv2.imread releases the GIL). Unreadable files are skipped.
+    """
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        images = list(pool.map(_read_gray, [p for p, _ in items]))
+    faces, labels = [], []
+    for img, (_, label) in zip(images, items):
+        if img is None:
+            continue
+        faces.append(img)
+        labels.append(label)
+    return faces, labels
 
-def train_model():
-    faces = []
-    labels = []
+def _label_items(label:int):
+    label_path = os.path.join(DATA_DIR, str(label))
+    return [(os.path.join(label_path, fname), label) for fname in sorted(os.listdir(label_path))]
+
+def _train_locked(workers=None):
+    """Full rebuild; the caller holds _model_lock() from reading the images to the save."""
+    items = []
     for label_name in os.listdir(DATA_DIR):
         label_path = os.path.join(DATA_DIR, label_name)
         if not os.path.isdir(label_path):
             continue
-        for fname in os.listdir(label_path):
-            fpath = os.path.join(label_path, fname)
-            img = cv2.imread(fpath, cv2.IMREAD_GRAYSCALE)
-            if img is None:
-                continue
-            faces.append(img)
-            labels.append(int(label_name))
+        items.extend(_label_items(int(label_name)))
+    faces, labels = _load_images(items, workers)
     if not faces:
         raise RuntimeError("No faces found to train")
     recognizer = cv2.face.LBPHFaceRecognizer_create()
     recognizer.train(faces, np.array(labels))
-    recognizer.save(MODEL_PATH)
+    _save_atomic(recognizer)
     return True
+
+def train_model(workers=None):
+    """
+    Full rebuild from every image under DATA_DIR/<label>/. The image set is
+    read under the model lock, so an update_model() running meanwhile either
+    lands before the read (and is in the rebuild) or waits for the save.
+    """
+    with _model_lock():
+        return _train_locked(workers)
+
+def _update_locked(label:int, image_paths:list):
+    if not os.path.exists(MODEL_PATH):
+        return _train_locked()
+    faces, labels = _load_images([(p, label) for p in image_paths])
+    if not faces:
+        raise RuntimeError(f"No faces found for label {label}")
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(MODEL_PATH)
+    recognizer.update(faces, np.array(labels))
+    _save_atomic(recognizer)
+    return True
+
+def update_model(label:int, image_paths:list = None):
+    """
+    Incrementally add one label's new images to the existing model with LBPH
+    update(), instead of retraining on every image. update() only appends, so
+    image_paths must be just the files not yet in the model; without them the
+    label's folder can't be told apart from what is already trained, and the
+    whole model is retrained instead (also when no model exists yet).
+    Use train_model() after deleting or replacing images.
+    """
+    with _model_lock():
+        if image_paths is None:
+            return _train_locked()
+        return _update_locked(label, image_paths)
+
+def enroll_user(label:int, image_paths:list):
+    """
+    Copy a user's face images in and add just those to the model. Copy and
+    update happen under one lock: a concurrent full rebuild can't pick up the
+    new files and then have them appended a second time.
+    """
+    with _model_lock():
+        added = collect_images_for_user(label, image_paths)
+        if not added:
+            return False
+        return _update_locked(label, added)
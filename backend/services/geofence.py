@@ -0,0 +1,141 @@
+# Geofence engine over the classrooms table.
+# Every room is a circle (lat, lon, radius_m) or a polygon footprint. Rooms are
+# bucketed into a uniform lat/lon grid of GEOFENCE_CELL_DEG cells (like geohash
+# cells, but addressed by integer (row, col)), so a lookup touches one cell's
+# few candidates and runs the exact test (haversine / point-in-polygon) only on
+# those. The index is rebuilt from the database every GEOFENCE_REFRESH_SECONDS,
+# or right away after invalidate() (shared version file, so all workers reload).
+# The app never writes classrooms itself: scripts/set_classroom.py edits a room
+# and invalidates; rooms edited in the database by hand are picked up after the
+# TTL, or at once with `scripts/set_classroom.py --reload`.
+import math
+import os
+import threading
+import time
+from sqlalchemy import select
+from models.classroom_model import Classroom
+from services.location_service import haversine_m, point_in_polygon
+from utils import metrics
+from utils.config import (
+    CACHE_VERSION_DIR, GEOFENCE_CELL_DEG, GEOFENCE_DEFAULT_RADIUS_M,
+    GEOFENCE_FALLBACK_LAT, GEOFENCE_FALLBACK_LON, GEOFENCE_REFRESH_SECONDS
+)
+from utils.db import SessionLocal
+from utils.version_counter import VersionCounter
+
+METERS_PER_DEG_LAT = 111320.0
+
+_version = VersionCounter(os.path.join(CACHE_VERSION_DIR, "classrooms.version"))
+_lock = threading.Lock()
+_index = None
+_loaded_at = 0.0
+_loaded_version = None
+
+
+class Room:
+    __slots__ = ("id", "room_number", "lat", "lon", "radius_m", "polygon", "area", "bbox")
+
+    def __init__(self, id, room_number, lat, lon, radius_m=None, polygon=None):
+        self.id = id
+        self.room_number = room_number
+        self.lat = lat
+        self.lon = lon
+        self.radius_m = radius_m or GEOFENCE_DEFAULT_RADIUS_M
+        self.polygon = [tuple(p) for p in polygon] if polygon and len(polygon) >= 3 else None
+        if self.polygon:
+            lats = [p[0] for p in self.polygon]
+            lons = [p[1] for p in self.polygon]
+            self.bbox = (min(lats), min(lons), max(lats), max(lons))
+            self.area = (self.bbox[2] - self.bbox[0]) * (self.bbox[3] - self.bbox[1])
+        else:
+            dlat = self.radius_m / METERS_PER_DEG_LAT
+            dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+            self.bbox = (lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+            self.area = dlat * dlon
+
+    def contains(self, lat: float, lon: float):
+        if self.polygon:
+            return point_in_polygon(lat, lon, self.polygon)
+        return haversine_m(lat, lon, self.lat, self.lon) <= self.radius_m
+
+
+class GeofenceIndex:
+    def __init__(self, rooms, cell_deg: float = GEOFENCE_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.rooms = {r.id: r for r in rooms}
+        self._cells = {}
+        for room in rooms:
+            lat0, lon0, lat1, lon1 = room.bbox
+            for row in range(self._cell(lat0), self._cell(lat1) + 1):
+                for col in range(self._cell(lon0), self._cell(lon1) + 1):
+                    self._cells.setdefault((row, col), []).append(room)
+
+    def _cell(self, deg: float):
+        return math.floor(deg / self.cell_deg)
+
+    def locate(self, lat: float, lon: float):
+        """Smallest room containing the point (nested rooms / halls), or None."""
+        candidates = self._cells.get((self._cell(lat), self._cell(lon)), ())
+        inside = [r for r in candidates if r.contains(lat, lon)]
+        return min(inside, key=lambda r: r.area) if inside else None
+
+    def nearest(self, lat: float, lon: float):
+        """(room, meters to its center) over all rooms; only used for error messages."""
+        best = min(self.rooms.values(), key=lambda r: haversine_m(lat, lon, r.lat, r.lon), default=None)
+        return best, (haversine_m(lat, lon, best.lat, best.lon) if best else None)
+
+
+def _load():
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(Classroom)).scalars().all()
+        rooms = [Room(c.id, c.room_number, c.lat, c.lon, c.radius_m, c.footprint) for c in rows]
+    finally:
+        db.close()
+    if not rooms:
+        # No rooms configured yet: behave like the old single hardcoded classroom
+        rooms = [Room(1, "default", GEOFENCE_FALLBACK_LAT, GEOFENCE_FALLBACK_LON)]
+    return GeofenceIndex(rooms)
+
+
+def get_index():
+    global _index, _loaded_at, _loaded_version
+    version = _version.get()
+    if _index is not None and version == _loaded_version and time.monotonic() - _loaded_at < GEOFENCE_REFRESH_SECONDS:
+        return _index
+    with _lock:
+        if _index is None or version != _loaded_version or time.monotonic() - _loaded_at >= GEOFENCE_REFRESH_SECONDS:
+            started = time.monotonic()
+            _index = _load()
+            _loaded_at, _loaded_version = time.monotonic(), version
+            metrics.observe("geofence.reload_ms", (_loaded_at - started) * 1000)
+            metrics.set_gauge("geofence.rooms", len(_index.rooms))
+    return _index
+
+
+def invalidate():
+    """Call after editing classrooms; every worker reloads on its next lookup."""
+    _version.bump()
+
+
+def check(lat: float, lon: float, classroom_id: int = None):
+    """
+    Which room is (lat, lon) in, and is it the expected one?
+    Returns (room or None, matches) where matches is True if the point is in
+    `classroom_id` (or, when no room is expected, in any room). An expected
+    room that is not in the index never matches.
+    """
+    index = get_index()
+    started = time.perf_counter()
+    if classroom_id is not None:
+        expected = index.rooms.get(classroom_id)
+        if expected is not None and expected.contains(lat, lon):
+            room = expected
+        else:
+            room = index.locate(lat, lon)
+        matches = expected is not None and room is expected
+    else:
+        room = index.locate(lat, lon)
+        matches = room is not None
+    metrics.observe("geofence.lookup_us", (time.perf_counter() - started) * 1e6)
+    return room, matches
@@ -0,0 +1,192 @@
+# Identity lookup cache: name -> usn, usn -> user, usn -> teacher profile.
+# The roster changes a few times per semester, so hot routes resolve users
+# from bounded in-process LRUs instead of querying per request. The cache is
+# warmed at startup and cleared by /auth/register, which also bumps a shared
+# version counter so other workers clear theirs on their next lookup.
+# Misses are not cached, so rows added outside the API show up right away.
+import os
+import threading
+from collections import OrderedDict
+from sqlalchemy import select
+from models.teacher_model import Teacher
+from models.user_model import User
+from utils import metrics
+from utils.config import CACHE_VERSION_DIR, IDENTITY_CACHE_SIZE
+from utils.version_counter import VersionCounter
+
+_version = VersionCounter(os.path.join(CACHE_VERSION_DIR, "identity.version"))
+_lock = threading.Lock()
+_seen_version = None
+
+
+class CachedUser:
+    """Detached copy of a User row, without the password hash."""
+
+    __slots__ = ("id", "usn", "name", "email", "is_teacher", "photo_path")
+
+    def __init__(self, row: User):
+        for name in self.__slots__:
+            setattr(self, name, getattr(row, name))
+
+
+class CachedTeacher:
+    """Detached copy of a Teacher row."""
+
+    __slots__ = ("id", "user_id", "teacher_id", "phone_number", "qualification", "subjects_taken", "timetable")
+
+    def __init__(self, row: Teacher):
+        for name in self.__slots__:
+            setattr(self, name, getattr(row, name))
+
+
+class _LRU:
+    def __init__(self, name: str, max_size: int):
+        self.name = name
+        self.max_size = max(1, max_size)
+        self._data = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None:
+            metrics.inc(f"identity_cache.{self.name}.miss")
+            return None
+        self._data.move_to_end(key)
+        metrics.inc(f"identity_cache.{self.name}.hit")
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def clear(self):
+        self._data.clear()
+
+
+_name_to_usn = _LRU("name_to_usn", IDENTITY_CACHE_SIZE)
+_users = _LRU("user", IDENTITY_CACHE_SIZE)
+_teachers = _LRU("teacher", IDENTITY_CACHE_SIZE)
+
+
+def _check_version():
+    """Drop everything if another worker invalidated (caller holds _lock)."""
+    global _seen_version
+    version = _version.get()
+    if version != _seen_version:
+        _name_to_usn.clear()
+        _users.clear()
+        _teachers.clear()
+        _seen_version = version
+    return version
+
+
+def _cached_user_by_name(name: str):
+    with _lock:
+        version = _check_version()
+        usn = _name_to_usn.get(name)
+        return (_users.get(usn) if usn else None), version
+
+
+def _cached_user_by_usn(usn: str):
+    with _lock:
+        version = _check_version()  # before the read: another worker may have invalidated
+        return _users.get(usn), version
+
+
+def _store_user(row, version, by_name: bool = False):
+    """Cache a row; only by-name lookups (and warm) decide which user a shared name maps to."""
+    if row is None:
+        return None
+    user = CachedUser(row)
+    with _lock:
+        if version == _seen_version:  # not invalidated while we were reading
+            _users.put(user.usn, user)
+            if by_name:
+                _name_to_usn.put(user.name, user.usn)
+    return user
+
+
+def version():
+    """Shared invalidation counter; anything derived from cached identities is stale once it moves."""
+    return _version.get()
+
+
+def invalidate():
+    """Call after users / teachers change."""
+    global _seen_version
+    version = _version.bump()
+    with _lock:
+        _name_to_usn.clear()
+        _users.clear()
+        _teachers.clear()
+        _seen_version = version
+
+
+# ---------------------------
+# 🟩 Lookups (sync + async sessions)
+# ---------------------------
+def user_by_name(db, name: str):
+    user, version = _cached_user_by_name(name)
+    if user is not None:
+        return user
+    row = db.execute(select(User).where(User.name == name).limit(1)).scalars().first()
+    return _store_user(row, version, by_name=True)
+
+
+async def user_by_name_async(db, name: str):
+    user, version = _cached_user_by_name(name)
+    if user is not None:
+        return user
+    row = (await db.execute(select(User).where(User.name == name).limit(1))).scalars().first()
+    return _store_user(row, version, by_name=True)
+
+
+def user_by_usn(db, usn: str):
+    user, version = _cached_user_by_usn(usn)
+    if user is not None:
+        return user
+    return _store_user(db.execute(select(User).where(User.usn == usn).limit(1)).scalars().first(), version)
+
+
+def teacher_by_usn(db, usn: str):
+    """Teacher profile of the user with this USN, or None."""
+    with _lock:
+        version = _check_version()
+        teacher = _teachers.get(usn)
+    if teacher is not None:
+        return teacher
+    row = db.execute(
+        select(Teacher).join(User, User.id == Teacher.user_id).where(User.usn == usn).limit(1)
+    ).scalars().first()
+    if row is None:
+        return None
+    teacher = CachedTeacher(row)
+    with _lock:
+        if version == _seen_version:
+            _teachers.put(usn, teacher)
+    return teacher
+
+
+def warm(db):
+    """Preload users and teacher profiles (up to the cache size). Returns users loaded."""
+    with _lock:
+        version = _check_version()
+    users = db.execute(select(User).order_by(User.id).limit(IDENTITY_CACHE_SIZE)).scalars().all()
+    teachers = db.execute(
+        select(User.usn, Teacher).join(Teacher, Teacher.user_id == User.id).limit(IDENTITY_CACHE_SIZE)
+    ).all()
+    with _lock:
+        if version != _seen_version:
+            return 0
+        for row in users:
+            user = CachedUser(row)
+            _users.put(user.usn, user)
+            if user.name not in _name_to_usn:  # names aren't unique: first row wins, like .first()
+                _name_to_usn.put(user.name, user.usn)
+        for usn, row in teachers:
+            _teachers.put(usn, CachedTeacher(row))
+    return len(users)
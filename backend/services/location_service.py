@@ -1,12 +1,34 @@
 # Location helper (re-usable)
-def within_radius(student_lat, student_lon, room_lat, room_lon, radius_m=50):
-    import math
-    R = 6371000
-    phi1 = math.radians(student_lat)
-    phi2 = math.radians(room_lat)
-    dphi = math.radians(room_lat - student_lat)
-    dlambda = math.radians(room_lon - student_lon)
+import math
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
     a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
     c = 2*math.atan2(math.sqrt(a), math.sqrt(1-a))
-    dist = R * c
+    return EARTH_RADIUS_M * c
+
+
+def within_radius(student_lat, student_lon, room_lat, room_lon, radius_m=50):
+    dist = haversine_m(student_lat, student_lon, room_lat, room_lon)
     return dist <= radius_m, dist
+
+
+def point_in_polygon(lat, lon, polygon):
+    """Ray casting; polygon is [[lat, lon], ...] (small areas, so planar is fine)."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[j]
+        if (lon_i > lon) != (lon_j > lon) and \
+                lat < (lat_j - lat_i) * (lon - lon_i) / (lon_j - lon_i) + lat_i:
+            inside = not inside
+        j = i
+    return inside
@@ -0,0 +1,219 @@
+# Rotating QR payloads for active sessions.
+# Time is cut into QR_ROTATE_SECONDS windows; the payload shown for a session
+# in window w is "<session_id>.<w>.<code>" with code = HMAC(secret, session_id.w),
+# so a screenshot stops working one window later. validate() accepts the
+# current and the previous window (scan + submit can straddle a rotation).
+#
+# PNGs are rendered by a background thread: for every active session it keeps
+# the current and the next window in a bounded LRU, so the image for window
+# w+1 already exists when the rotation happens. Request handlers only read the
+# cache; on a miss they ask the renderer and wait for it.
+#
+# Signed tickets (same secret, "<expires>.<signature>"):
+# - scan receipts: /qr/scan hands one to a student whose scanned payload was
+#   valid, bound to (session, usn); /attendance/mark accepts it for
+#   QR_SCAN_RECEIPT_SECONDS, so location + face checks may outlast the window.
+# - stream tickets: the projector's EventSource can't send headers, so it
+#   passes a QR_STREAM_TICKET_SECONDS ticket instead of the JWT in the URL.
+import base64
+import hashlib
+import hmac
+import io
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+import qrcode
+from sqlalchemy import select
+from models.active_session import ActiveSession
+from utils import metrics
+from utils.config import (
+    QR_IMAGE_CACHE_SIZE, QR_ROTATE_SECONDS, QR_SCAN_RECEIPT_SECONDS,
+    QR_STREAM_TICKET_SECONDS, QR_TOKEN_SECRET
+)
+from utils.db import SessionLocal
+
+RENDER_WAIT_SECONDS = 2.0
+
+_images = OrderedDict()  # (session_id, window) -> PNG bytes
+_lock = threading.Lock()
+_rendered = threading.Condition(_lock)
+_wanted = set()  # session ids requested by handlers since the last tick
+_thread = None
+_stopping = False
+
+
+# ---------------------------
+# 🔏 Payloads
+# ---------------------------
+def current_window(now: float = None):
+    return int((now if now is not None else time.time()) // QR_ROTATE_SECONDS)
+
+
+def seconds_until_rotation(now: float = None):
+    now = now if now is not None else time.time()
+    return QR_ROTATE_SECONDS - (now % QR_ROTATE_SECONDS)
+
+
+def _sign(message: str, size: int = 12):
+    digest = hmac.new(QR_TOKEN_SECRET.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:size]).decode("ascii")
+
+
+def _code(session_id: str, window: int):
+    return _sign(f"{session_id}.{window}")
+
+
+def payload(session_id: str, window: int = None):
+    window = current_window() if window is None else window
+    return f"{session_id}.{window}.{_code(session_id, window)}"
+
+
+def validate(session_id: str, qr_payload: str):
+    """True if the scanned payload belongs to this session's current or previous window."""
+    try:
+        scanned_session, window, code = qr_payload.rsplit(".", 2)
+        window = int(window)
+    except (AttributeError, ValueError):
+        return False
+    if scanned_session != session_id or current_window() - window not in (0, 1):
+        return False
+    return hmac.compare_digest(code, _code(session_id, window))
+
+
+def session_of(qr_payload: str):
+    """Session id carried by a scanned payload (not validated)."""
+    return qr_payload.rsplit(".", 2)[0] if qr_payload and qr_payload.count(".") >= 2 else None
+
+
+# ---------------------------
+# 🎟️ Tickets
+# ---------------------------
+def _ticket(purpose: str, ttl: float, *parts):
+    expires = int(time.time() + ttl)
+    return f"{expires}.{_sign('.'.join([purpose, *parts, str(expires)]), 18)}"
+
+
+def _check_ticket(ticket: str, purpose: str, *parts):
+    try:
+        expires, signature = ticket.split(".", 1)
+        expires = int(expires)
+    except (AttributeError, ValueError):
+        return False
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(signature, _sign(".".join([purpose, *parts, str(expires)]), 18))
+
+
+def scan_receipt(session_id: str, usn: str):
+    return _ticket("scan", QR_SCAN_RECEIPT_SECONDS, session_id, usn)
+
+
+def check_scan_receipt(session_id: str, usn: str, receipt: str):
+    return _check_ticket(receipt, "scan", session_id, usn)
+
+
+def stream_ticket(session_id: str):
+    return _ticket("stream", QR_STREAM_TICKET_SECONDS, session_id)
+
+
+def check_stream_ticket(session_id: str, ticket: str):
+    return _check_ticket(ticket, "stream", session_id)
+
+
+# ---------------------------
+# 🖼️ Pre-rendered images
+# ---------------------------
+def _render(session_id: str, window: int):
+    started = time.monotonic()
+    buf = io.BytesIO()
+    qrcode.make(payload(session_id, window)).save(buf, format="PNG")
+    metrics.observe("qr_rotation.render_ms", (time.monotonic() - started) * 1000)
+    return buf.getvalue()
+
+
+def _ensure(session_ids, window: int):
+    """Render current + next window for each session (renderer thread only)."""
+    for session_id in session_ids:
+        for w in (window, window + 1):
+            key = (session_id, w)
+            with _lock:
+                if key in _images:
+                    continue
+            png = _render(session_id, w)
+            with _lock:
+                _images[key] = png
+                while len(_images) > QR_IMAGE_CACHE_SIZE:
+                    _images.popitem(last=False)
+                _rendered.notify_all()
+
+
+def image(session_id: str, window: int = None):
+    """PNG for the session's window from the cache, waiting for the renderer on a miss. None on timeout."""
+    window = current_window() if window is None else window
+    key = (session_id, window)
+    with _lock:
+        png = _images.get(key)
+        if png is not None:
+            _images.move_to_end(key)
+            metrics.inc("qr_rotation.cache_hit")
+            return png
+        metrics.inc("qr_rotation.cache_miss")
+        _wanted.add(session_id)
+        _rendered.notify_all()
+        _rendered.wait_for(lambda: key in _images or _stopping, timeout=RENDER_WAIT_SECONDS)
+        return _images.get(key)
+
+
+def _active_session_ids():
+    db = SessionLocal()
+    try:
+        return [sid for (sid,) in db.execute(
+            select(ActiveSession.session_id).where(
+                ActiveSession.active == True, ActiveSession.expires_at > datetime.utcnow()
+            )
+        )]
+    finally:
+        db.close()
+
+
+def _run():
+    next_scan = 0.0
+    session_ids = []
+    while True:
+        with _lock:
+            if _stopping:
+                return
+            wanted = set(_wanted)
+            _wanted.clear()
+        try:
+            # Rescan active sessions a few times per window
+            if time.monotonic() >= next_scan:
+                session_ids = _active_session_ids()
+                next_scan = time.monotonic() + QR_ROTATE_SECONDS / 4
+            _ensure(sorted(wanted) + [s for s in session_ids if s not in wanted], current_window())
+        except Exception as e:
+            metrics.inc("qr_rotation.errors")
+            print("❌ QR pre-render failed:", e)
+        with _lock:
+            if not _wanted and not _stopping:
+                _rendered.wait(min(1.0, QR_ROTATE_SECONDS / 4))
+
+
+def start():
+    global _thread, _stopping
+    if _thread is not None and _thread.is_alive():
+        return
+    _stopping = False
+    _thread = threading.Thread(target=_run, name="qr-prerender", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread, _stopping
+    with _lock:
+        _stopping = True
+        _rendered.notify_all()
+    if _thread is not None:
+        _thread.join()
+        _thread = None
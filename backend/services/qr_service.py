@@ -1,14 +1,83 @@
 # small helper functions used by qr_routes; kept for separation of concerns
+#
+# Tokens are either kept in a store (QR_TOKEN_MODE=memory / sqlite, see
+# services/qr_token_store.py) or, with QR_TOKEN_MODE=hmac, are self-contained
+# "<classroom_id>.<expires>.<signature>" strings that validate_token checks
+# without any lookup.
 import qrcode
 import io
-from utils.config import QR_EXPIRY_SECONDS
+from utils.config import (
+    QR_EXPIRY_SECONDS, QR_TOKEN_MODE, QR_TOKEN_SECRET, QR_TOKEN_STORE_MAX, QR_TOKEN_STORE_PATH
+)
+from services.qr_token_store import MemoryTokenStore, SQLiteTokenStore
+import base64
+import hashlib
+import hmac
+import secrets
 import time
 
-_active_qrs = {}
+_store = None
+
+
+def _make_store():
+    if QR_TOKEN_MODE == "sqlite":
+        return SQLiteTokenStore(QR_TOKEN_STORE_PATH, QR_TOKEN_STORE_MAX)
+    return MemoryTokenStore(QR_TOKEN_STORE_MAX)
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = _make_store()
+    return _store
+
+
+def set_store(store):
+    """Plug in another shared backend (same methods as MemoryTokenStore)."""
+    global _store
+    _store = store
+
+
+# ---------------------------
+# 🔏 Stateless (HMAC) tokens
+# ---------------------------
+def _sign(message: str):
+    digest = hmac.new(QR_TOKEN_SECRET.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).rstrip(b"=").decode("ascii")
+
+
+def _signed_token(classroom_id: int, expires: int):
+    message = f"{classroom_id}.{expires}"
+    return f"{message}.{_sign(message)}"
+
+
+def _validate_signed(token: str):
+    try:
+        classroom_id, expires, signature = token.split(".")
+        classroom_id, expires = int(classroom_id), int(expires)
+    except ValueError:
+        return False, "invalid"
+    if not hmac.compare_digest(signature, _sign(f"{classroom_id}.{expires}")):
+        return False, "invalid"
+    if time.time() > expires:
+        return False, "expired"
+    return True, classroom_id
+
+
+# ---------------------------
+# 🟩 Public helpers
+# ---------------------------
+def issue_token(classroom_id: int):
+    expires = time.time() + QR_EXPIRY_SECONDS
+    if QR_TOKEN_MODE == "hmac":
+        return _signed_token(classroom_id, int(expires))
+    token = secrets.token_urlsafe(16)
+    get_store().put(token, classroom_id, expires)
+    return token
+
 
 def create_qr_for_classroom(classroom_id: int):
-    token = f"{int(time.time())}-{classroom_id}"
-    _active_qrs[token] = {"classroom_id": classroom_id, "expires": time.time() + QR_EXPIRY_SECONDS}
+    token = issue_token(classroom_id)
     img = qrcode.make(token)
     buf = io.BytesIO()
     img.save(buf, format="PNG")
@@ -16,10 +85,13 @@ def create_qr_for_classroom(classroom_id: int):
     return token, buf
 
 def validate_token(token: str):
-    entry = _active_qrs.get(token)
+    if QR_TOKEN_MODE == "hmac":
+        return _validate_signed(token)
+    entry = get_store().get(token)
     if not entry:
         return False, "invalid"
-    if time.time() > entry["expires"]:
-        _active_qrs.pop(token, None)
+    classroom_id, expires = entry
+    if time.time() > expires:
+        get_store().delete(token)
         return False, "expired"
-    return True, entry["classroom_id"]
+    return True, classroom_id
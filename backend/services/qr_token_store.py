@@ -0,0 +1,143 @@
+# Token stores for services/qr_service.
+# A store maps token -> (classroom_id, expires) and must support:
+#   put(token, classroom_id, expires), get(token) -> (classroom_id, expires) | None,
+#   delete(token), purge() -> number of expired entries removed, __len__()
+# MemoryTokenStore is per process; SQLiteTokenStore is a file shared by every
+# worker on one box. Anything with the same methods (e.g. a Redis-backed store)
+# can be plugged in with qr_service.set_store().
+import heapq
+import os
+import sqlite3
+import threading
+import time
+
+
+class MemoryTokenStore:
+    """In-process store with heap-ordered expiry (O(log n) per token) and a size cap."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._entries = {}  # token -> (classroom_id, expires)
+        self._heap = []  # (expires, token); stale pairs are skipped when popped
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _pop_soonest(self):
+        """Drop the live entry that expires first (caller holds the lock)."""
+        while self._heap:
+            expires, token = heapq.heappop(self._heap)
+            entry = self._entries.get(token)
+            if entry is not None and entry[1] == expires:
+                del self._entries[token]
+                return
+
+    def _purge(self, now: float):
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires, token = heapq.heappop(self._heap)
+            entry = self._entries.get(token)
+            if entry is not None and entry[1] == expires:
+                del self._entries[token]
+                removed += 1
+        # Rebuild once stale pairs (deleted / overwritten tokens) dominate the heap
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(e, t) for t, (_, e) in self._entries.items()]
+            heapq.heapify(self._heap)
+        return removed
+
+    def purge(self):
+        with self._lock:
+            return self._purge(time.time())
+
+    def put(self, token: str, classroom_id: int, expires: float):
+        with self._lock:
+            self._purge(time.time())
+            if token not in self._entries:
+                while len(self._entries) >= self.max_entries:
+                    self._pop_soonest()
+            self._entries[token] = (classroom_id, expires)
+            heapq.heappush(self._heap, (expires, token))
+
+    def get(self, token: str):
+        with self._lock:
+            return self._entries.get(token)
+
+    def delete(self, token: str):
+        with self._lock:
+            self._entries.pop(token, None)
+
+
+class SQLiteTokenStore:
+    """
+    File-backed store shared by all workers on one machine (WAL mode, indexed expiry).
+    The size cap is hard: every put checks it in the same write transaction,
+    so concurrent threads / workers can't push the table past max_entries.
+    """
+
+    PURGE_EVERY = 100  # puts between expiry sweeps
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._local = threading.local()
+        self._puts = 0
+        self._puts_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS qr_tokens ("
+                " token TEXT PRIMARY KEY, classroom_id INTEGER NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_qr_tokens_expires ON qr_tokens (expires)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM qr_tokens").fetchone()[0]
+
+    def purge(self):
+        return self._conn().execute("DELETE FROM qr_tokens WHERE expires <= ?", (time.time(),)).rowcount
+
+    def put(self, token: str, classroom_id: int, expires: float):
+        with self._puts_lock:
+            self._puts += 1
+            sweep = self._puts % self.PURGE_EVERY == 0
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front: the count below can't race another writer
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if sweep:
+                conn.execute("DELETE FROM qr_tokens WHERE expires <= ?", (time.time(),))
+            conn.execute(
+                "INSERT OR REPLACE INTO qr_tokens (token, classroom_id, expires) VALUES (?, ?, ?)",
+                (token, classroom_id, expires)
+            )
+            over = conn.execute("SELECT COUNT(*) FROM qr_tokens").fetchone()[0] - self.max_entries
+            if over > 0:
+                # Evict the soonest-expiring tokens, never the one just written
+                conn.execute(
+                    "DELETE FROM qr_tokens WHERE token IN (SELECT token FROM qr_tokens"
+                    " WHERE token != ? ORDER BY expires LIMIT ?)", (token, over)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, token: str):
+        row = self._conn().execute(
+            "SELECT classroom_id, expires FROM qr_tokens WHERE token = ?", (token,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def delete(self, token: str):
+        self._conn().execute("DELETE FROM qr_tokens WHERE token = ?", (token,))
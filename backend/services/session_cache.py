@@ -0,0 +1,114 @@
+# Read-through TTL cache of active QR sessions.
+# Entries are keyed by session_id, plus one "latest active" entry for the
+# student dashboard poll. /qr/generate and /qr/stop call invalidate(), which
+# clears this worker's cache and bumps a shared version counter so every
+# other worker drops its copy on its next read. Expiry needs no invalidation:
+# callers still compare expires_at against the clock.
+import os
+import threading
+import time
+from sqlalchemy import select
+from models.active_session import ActiveSession
+from utils import metrics
+from utils.config import CACHE_VERSION_DIR, SESSION_CACHE_TTL_SECONDS
+from utils.version_counter import VersionCounter
+
+MAX_ENTRIES = 1024
+_LATEST = object()  # key of the "latest active session" entry
+
+_version = VersionCounter(os.path.join(CACHE_VERSION_DIR, "active_sessions.version"))
+_lock = threading.Lock()
+_entries = {}  # key -> (CachedSession | None, stored_at)
+_seen_version = None
+
+
+class CachedSession:
+    """Detached copy of an ActiveSession row (safe to share across requests)."""
+
+    __slots__ = ("session_id", "subject", "teacher_id", "active", "created_at", "expires_at", "classroom_id", "section")
+
+    def __init__(self, row: ActiveSession):
+        for name in self.__slots__:
+            setattr(self, name, getattr(row, name))
+
+
+def _lookup(key):
+    """(True, value, version) on a fresh hit, (False, None, version) otherwise."""
+    global _seen_version
+    if SESSION_CACHE_TTL_SECONDS <= 0:
+        return False, None, None
+    version = _version.get()
+    with _lock:
+        if version != _seen_version:
+            _entries.clear()
+            _seen_version = version
+        hit = _entries.get(key)
+    if hit and time.monotonic() - hit[1] < SESSION_CACHE_TTL_SECONDS:
+        metrics.inc("session_cache.hit")
+        return True, hit[0], version
+    metrics.inc("session_cache.miss")
+    return False, None, version
+
+
+def _store(key, row, version):
+    value = CachedSession(row) if row is not None else None
+    if version is None:
+        return value
+    with _lock:
+        # Skip if invalidated while we were reading: the row may predate the write
+        if version != _seen_version or version != _version.get():
+            return value
+        if len(_entries) >= MAX_ENTRIES:
+            _entries.clear()
+        _entries[key] = (value, time.monotonic())
+    return value
+
+
+def invalidate():
+    """Call after any write to active_sessions."""
+    global _seen_version
+    version = _version.bump()
+    with _lock:
+        _entries.clear()
+        _seen_version = version
+
+
+# ---------------------------
+# 🟩 Lookups (sync + async sessions)
+# ---------------------------
+def _by_id(session_id: str):
+    return select(ActiveSession).where(ActiveSession.session_id == session_id).limit(1)
+
+
+def _latest(now):
+    return (
+        select(ActiveSession)
+        .where(ActiveSession.active == True, ActiveSession.expires_at > now)
+        .order_by(ActiveSession.created_at.desc())
+        .limit(1)
+    )
+
+
+def get_session(db, session_id: str):
+    """Session by id (active or not), or None."""
+    found, value, version = _lookup(session_id)
+    if found:
+        return value
+    return _store(session_id, db.execute(_by_id(session_id)).scalars().first(), version)
+
+
+async def get_session_async(db, session_id: str):
+    found, value, version = _lookup(session_id)
+    if found:
+        return value
+    return _store(session_id, (await db.execute(_by_id(session_id))).scalars().first(), version)
+
+
+async def get_latest_active_async(db, now):
+    """Most recent active, unexpired session, or None."""
+    found, value, version = _lookup(_LATEST)
+    if not found:
+        value = _store(_LATEST, (await db.execute(_latest(now))).scalars().first(), version)
+    if value is None or value.expires_at <= now:
+        return None
+    return value
@@ -0,0 +1,82 @@
+# Background expiry of QR sessions.
+# An asyncio task (started from the app's startup hook) flips active=False on
+# sessions past expires_at, then sleeps until the next active session expires
+# (at most SESSION_SWEEP_INTERVAL_SECONDS, so sessions created meanwhile are
+# picked up). Every worker runs one; the UPDATE is idempotent, so they don't
+# need to coordinate. Readers still compare expires_at themselves, so a session
+# is never served as valid past its expiry even between sweeps.
+# stop() never cancels a sweep halfway: a cancelled UPDATE can leave its
+# connection inside a write transaction (SQLite: the database stays locked).
+import asyncio
+import time
+from datetime import datetime
+from sqlalchemy import func, select, update
+from models.active_session import ActiveSession
+from services import session_cache
+from utils import metrics
+from utils.config import SESSION_SWEEP_INTERVAL_SECONDS
+from utils.db import AsyncSessionLocal
+
+MIN_SLEEP_SECONDS = 0.5
+
+_task = None
+_stopping = None  # asyncio.Event, set by stop()
+
+
+async def sweep():
+    """Deactivate expired sessions. Returns (rows expired, seconds until the next expiry or None)."""
+    started = time.monotonic()
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(ActiveSession)
+            .where(ActiveSession.active == True, ActiveSession.expires_at <= now)
+            .values(active=False)
+        )
+        next_expiry = (await db.execute(
+            select(func.min(ActiveSession.expires_at)).where(ActiveSession.active == True)
+        )).scalar()
+        await db.commit()
+
+    expired = result.rowcount or 0
+    metrics.observe("session_sweeper.sweep_ms", (time.monotonic() - started) * 1000)
+    metrics.inc("session_sweeper.expired", expired)
+    if expired:
+        session_cache.invalidate()
+
+    if next_expiry is None:
+        return expired, None
+    return expired, (next_expiry.replace(tzinfo=None) - now).total_seconds()
+
+
+async def _run(stopping: asyncio.Event):
+    while not stopping.is_set():
+        delay = SESSION_SWEEP_INTERVAL_SECONDS
+        try:
+            _, until_next = await sweep()
+            if until_next is not None:
+                delay = min(delay, max(until_next, MIN_SLEEP_SECONDS))
+        except Exception as e:
+            metrics.inc("session_sweeper.errors")
+            print("❌ Session expiry sweep failed:", e)
+        try:
+            await asyncio.wait_for(stopping.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start():
+    """Start the sweeper on the running event loop. Safe to call repeatedly."""
+    global _task, _stopping
+    if _task is None or _task.done():
+        _stopping = asyncio.Event()
+        _task = asyncio.get_running_loop().create_task(_run(_stopping))
+
+
+async def stop():
+    """Let a running sweep finish, then end the task."""
+    global _task
+    if _task is not None:
+        _stopping.set()
+        await _task
+        _task = None
@@ -0,0 +1,69 @@
+# Shared test setup: a throwaway SQLite database and runtime directories.
+# The environment has to be set before anything imports utils.config, which
+# is why it happens at module level here (pytest loads conftest.py first).
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="attendance-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'app.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["CACHE_VERSION_DIR"] = os.path.join(_TMP, "run")
+os.environ["ATTENDANCE_LOG_DIR"] = os.path.join(_TMP, "ingest_log")
+os.environ["FACE_DATA_DIR"] = os.path.join(_TMP, "face_data")
+os.environ["QR_TOKEN_STORE_PATH"] = os.path.join(_TMP, "run", "qr_tokens.sqlite3")
+os.environ["JWT_SECRET"] = "test-secret-" + "x" * 32
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["FACE_PRELOAD"] = "0"
+os.environ["FACE_POOL_WORKERS"] = "0"  # tests stub the inference jobs; never spawn the pool
+
+import pytest
+from sqlalchemy import delete
+
+import utils.db  # models import utils.db for Base; load it first, as the app does
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    """Bring the test database to the latest schema, as scripts/migrate.py does on deploy."""
+    from utils.db import engine
+    from utils.migrations import migrate
+    migrate(engine)
+    return engine
+
+
+@pytest.fixture
+def db(schema):
+    """A sync Session on an emptied database; rolled back and cleaned after the test."""
+    from utils.db import Base, SessionLocal
+    from services import geofence, identity_cache, session_cache
+    session = SessionLocal()
+    for table in reversed(Base.metadata.sorted_tables):
+        session.execute(delete(table))
+    session.commit()
+    identity_cache.invalidate()
+    session_cache.invalidate()
+    geofence.invalidate()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    """The app with its startup hooks (ingest flusher, sweepers) running."""
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as c:
+        yield c
+
+
+def register(client, usn: str, name: str, is_teacher: bool = False):
+    """Register a user through the API; returns Authorization headers for them."""
+    r = client.post("/auth/register", json={
+        "usn": usn, "name": name, "email": f"{usn.lower()}@example.com",
+        "password": "secret", "is_teacher": is_teacher
+    })
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
@@ -0,0 +1,47 @@
+import json
+from datetime import datetime, timedelta
+
+from conftest import register
+from services import attendance_summary
+
+
+def _seed(db, usn: str, n: int):
+    start = datetime(2024, 1, 1, 9, 0)
+    rows = [
+        {"user_usn": usn, "session_id": f"s-{i}", "classroom_id": 1, "subject": "DS",
+         "qr_match": True, "location_match": True, "face_match": True, "marked_by_teacher": False,
+         "timestamp": start + timedelta(hours=i)}
+        for i in range(n)
+    ]
+    attendance_summary.insert_marks(db, rows)
+    db.commit()
+
+
+def test_history_pages_follow_next_cursor(client, db):
+    headers = register(client, "S1", "stud1")
+    _seed(db, "S1", 120)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"cursor": cursor} if cursor else {}
+        page = client.get("/attendance/history/stud1", params=params, headers=headers).json()
+        assert page["total_records"] == 120  # totals cover everything, not just the page
+        seen += [r["id"] for r in page["records"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert pages == 3  # default limit 50
+    assert len(seen) == len(set(seen)) == 120
+    assert seen == sorted(seen, reverse=True)  # ids grow with time: newest first across pages
+
+
+def test_history_ndjson_streams_everything(client, db):
+    headers = register(client, "S1", "stud1")
+    _seed(db, "S1", 70)
+
+    r = client.get("/attendance/history/stud1", params={"format": "ndjson"}, headers=headers)
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert lines[0]["total_records"] == 70
+    assert len(lines) == 71
@@ -0,0 +1,134 @@
+import fcntl
+import glob
+import json
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from conftest import register
+from models.attendance_model import Attendance
+from services import attendance_ingest, attendance_summary
+from utils.config import ATTENDANCE_LOG_DIR
+
+
+def _row(usn, session_id, subject="DS"):
+    return {
+        "user_usn": usn, "session_id": session_id, "classroom_id": 1, "subject": subject,
+        "qr_match": True, "location_match": True, "face_match": True, "marked_by_teacher": False,
+        "timestamp": datetime(2024, 1, 5, 9, 0).isoformat()
+    }
+
+
+def _committed(db):
+    db.expire_all()
+    return sorted(db.execute(select(Attendance.session_id, Attendance.user_usn)).all())
+
+
+@pytest.fixture
+def manual_flush(monkeypatch):
+    """The background flusher only runs when the test calls flush()."""
+    monkeypatch.setattr(attendance_ingest, "ATTENDANCE_FLUSH_INTERVAL_MS", 3_600_000)
+
+
+@pytest.fixture
+def ingest(db, manual_flush):
+    attendance_ingest.start()
+    yield attendance_ingest
+    attendance_ingest.stop()
+
+
+def _orphan(owner, lines, torn=None):
+    """Segments + lock of a worker that died without flushing."""
+    with open(os.path.join(ATTENDANCE_LOG_DIR, f"{owner}.1.log"), "w", encoding="utf-8") as f:
+        for row in lines:
+            f.write(json.dumps(row) + "\n")
+        if torn:
+            f.write(torn)  # no newline: the append was never acknowledged
+    open(os.path.join(ATTENDANCE_LOG_DIR, f"{owner}.lock"), "w").close()
+
+
+def test_append_is_pending_until_flush(ingest, db):
+    assert ingest.append(_row("S1", "a"))
+    assert not ingest.append(_row("S1", "a"))  # already pending
+    assert ingest.is_pending("a", "S1")
+    assert [r["session_id"] for r in ingest.pending_for_user("S1")] == ["a"]
+    assert _committed(db) == []
+
+    assert ingest.flush() == 1
+    assert _committed(db) == [("a", "S1")]
+    assert ingest.pending_for_user("S1") == []
+    assert attendance_summary.for_student(db, "S1")[0]["records"] == 1
+
+
+def test_flush_removes_only_committed_segments(ingest, db):
+    ingest.append(_row("S1", "a"))
+    ingest.flush()
+    ingest.append(_row("S2", "a"))
+    segments = glob.glob(os.path.join(ATTENDANCE_LOG_DIR, f"{ingest._owner}.*.log"))
+    assert len(segments) == 1  # the current segment, holding the unflushed row
+    with open(segments[0], encoding="utf-8") as f:
+        assert [json.loads(line)["user_usn"] for line in f] == ["S2"]
+
+
+def test_recover_replays_a_dead_workers_log_once(ingest, db):
+    ingest.append(_row("S1", "a"))
+    ingest.flush()
+    _orphan("dead-1", [_row("S1", "a"), _row("S2", "a"), _row("S3", "a")], torn='{"user_usn": "S4"')
+
+    assert ingest.recover() == 3
+    assert _committed(db) == [("a", "S1"), ("a", "S2"), ("a", "S3")]
+    assert attendance_summary.for_student(db, "S1")[0]["records"] == 1  # replayed duplicate not counted
+    assert glob.glob(os.path.join(ATTENDANCE_LOG_DIR, "dead-1.*")) == []
+    assert ingest.recover() == 0
+
+
+def test_recover_skips_a_live_owner(ingest, db):
+    _orphan("alive-1", [_row("S1", "b")])
+    with open(os.path.join(ATTENDANCE_LOG_DIR, "alive-1.lock"), "a") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        assert ingest.recover() == 0
+    assert _committed(db) == []
+    assert ingest.recover() == 1  # released: now it's an orphan
+
+
+def test_recover_does_not_create_lock_files(ingest, db, monkeypatch):
+    gone = os.path.join(ATTENDANCE_LOG_DIR, "replayed-elsewhere.lock")
+    real_glob = glob.glob
+    monkeypatch.setattr(attendance_ingest.glob, "glob",
+                        lambda pattern: [gone] if pattern.endswith("*.lock") else real_glob(pattern))
+    assert ingest.recover() == 0
+    assert not os.path.exists(gone)
+
+
+@pytest.fixture
+def api(manual_flush, client):
+    return client
+
+
+def test_history_counts_the_pending_session_as_held(api, db):
+    headers = register(api, "S1", "stud1")
+    attendance_summary.record_session_held(db, "Networks")
+    db.commit()
+    attendance_ingest.append(_row("S1", "qr-9", subject="Networks"))
+
+    body = api.get("/attendance/history/stud1", headers=headers).json()
+    networks = next(s for s in body["by_subject"] if s["subject"] == "Networks")
+    assert (networks["total"], networks["attended"], networks["sessions_held"]) == (1, 1, 1)
+    assert body["records"][0]["pending"] is True
+
+
+def test_session_view_lists_pending_marks(api, db):
+    teacher = register(api, "T1", "teach", is_teacher=True)
+    register(api, "S1", "stud1")
+    attendance_ingest.append(_row("S1", "qr-9"))
+
+    body = api.get("/attendance/session/qr-9", headers=teacher).json()
+    assert [(r["usn"], r["student_name"], r.get("pending")) for r in body["records"]] == [("S1", "stud1", True)]
+    assert body["present_count"] == 1
+
+    attendance_ingest.flush()
+    body = api.get("/attendance/session/qr-9", headers=teacher).json()
+    assert [(r["usn"], r.get("pending")) for r in body["records"]] == [("S1", None)]
+    assert body["present_count"] == 1
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from conftest import register
+from models.attendance_model import Attendance
+from services import attendance_summary
+
+
+def _row(usn, session_id, subject="DS", by_teacher=False, **checks):
+    return {
+        "user_usn": usn, "session_id": session_id, "classroom_id": 1, "subject": subject,
+        "qr_match": checks.get("qr", not by_teacher), "location_match": checks.get("loc", not by_teacher),
+        "face_match": checks.get("face", not by_teacher), "marked_by_teacher": by_teacher,
+        "timestamp": datetime(2024, 1, 5, 9, 0)
+    }
+
+
+def _summary(db, usn):
+    return {r["subject"]: r for r in attendance_summary.for_student(db, usn)}
+
+
+def test_insert_marks_is_idempotent(db):
+    rows = [_row("S1", "a"), _row("S2", "a"), _row("S1", "b")]
+    assert len(attendance_summary.insert_marks(db, rows)) == 3
+    assert attendance_summary.insert_marks(db, rows) == []
+    db.commit()
+
+    assert db.execute(select(func.count(Attendance.id))).scalar() == 3
+    assert _summary(db, "S1")["DS"]["records"] == 2
+    assert _summary(db, "S2")["DS"]["records"] == 1
+
+
+def test_insert_marks_counts_only_new_rows_of_a_partial_chunk(db):
+    attendance_summary.insert_marks(db, [_row("S1", "a")])
+    inserted = attendance_summary.insert_marks(db, [_row("S1", "a"), _row("S1", "b"), _row("S2", "a")])
+    db.commit()
+
+    assert [(r["user_usn"], r["session_id"]) for r in inserted] == [("S1", "b"), ("S2", "a")]
+    assert _summary(db, "S1")["DS"]["records"] == 2
+
+
+def test_teacher_rows_count_as_attended_only_with_a_passed_check(db):
+    attendance_summary.insert_marks(db, [
+        _row("S1", "a", by_teacher=True),
+        _row("S1", "b", by_teacher=True, face=True),
+        _row("S1", "c")
+    ])
+    db.commit()
+    s = _summary(db, "S1")["DS"]
+    assert (s["records"], s["attended"], s["teacher_marked"]) == (3, 2, 2)
+
+
+def test_manual_session_is_held_once(db):
+    assert attendance_summary.record_manual_session(db, "manual-T1-DS-20240105", "DS", "T1")
+    assert not attendance_summary.record_manual_session(db, "manual-T1-DS-20240105", "DS", "T1")
+    db.commit()
+    assert attendance_summary.for_subject(db, "DS")[0] == 1
+
+
+def test_rebuild_matches_incremental(db):
+    attendance_summary.insert_marks(db, [_row("S1", "a"), _row("S2", "a"), _row("S1", "b", by_teacher=True)])
+    attendance_summary.record_manual_session(db, "manual-T1-DS-20240105", "DS", "T1")
+    db.commit()
+    before = attendance_summary.for_subject(db, "DS")
+
+    attendance_summary.rebuild(db)
+    db.commit()
+    assert attendance_summary.for_subject(db, "DS") == before
+
+
+def test_subject_summary_is_teachers_only(client, db):
+    student = register(client, "S1", "stud1")
+    teacher = register(client, "T1", "teach", is_teacher=True)
+    attendance_summary.insert_marks(db, [_row("S1", "a"), _row("S2", "a")])
+    db.commit()
+
+    assert client.get("/attendance/summary/DS", headers=student).status_code == 403
+    r = client.get("/attendance/summary/DS", headers=teacher)
+    assert r.status_code == 200
+    assert [s["usn"] for s in r.json()["students"]] == ["S1", "S2"]
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+import pytest
+from passlib.context import CryptContext
+from sqlalchemy import update
+
+from conftest import register
+from models.user_model import User
+from services import auth_service
+from services.auth_service import AuthBusyError
+
+
+def test_hash_and_verify_run_on_the_bcrypt_pool():
+    threads = []
+    stored = asyncio.run(auth_service.hash_password("secret"))
+    ok, new_hash = asyncio.run(auth_service.verify_password("secret", stored))
+    assert ok and new_hash is None
+    assert asyncio.run(auth_service.verify_password("wrong", stored)) == (False, None)
+
+    asyncio.run(auth_service._run(lambda: threads.append(threading.current_thread().name)))
+    assert threads[0].startswith("bcrypt")
+
+
+def test_plaintext_and_other_cost_hashes_are_upgraded():
+    ok, new_hash = asyncio.run(auth_service.verify_password("secret", "secret"))
+    assert ok and auth_service.pwd_context.identify(new_hash) == "bcrypt"
+    assert asyncio.run(auth_service.verify_password("nope", "secret")) == (False, None)
+
+    old = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("secret")
+    ok, new_hash = asyncio.run(auth_service.verify_password("secret", old))
+    assert ok and new_hash and not auth_service.pwd_context.needs_update(new_hash)
+
+
+def test_queue_limit_rejects_and_is_released_by_the_job(monkeypatch):
+    monkeypatch.setattr(auth_service, "AUTH_HASH_QUEUE_LIMIT", 1)
+    release = threading.Event()
+
+    async def scenario():
+        slow = asyncio.ensure_future(auth_service._run(release.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(AuthBusyError):
+            await auth_service._run(len, "x")
+
+        slow.cancel()  # the client went away, but bcrypt is still running
+        await asyncio.sleep(0.01)
+        with pytest.raises(AuthBusyError):
+            await auth_service._run(len, "x")
+
+        release.set()
+        for _ in range(100):
+            if auth_service._pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        return await auth_service._run(len, "x")
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_login_upgrades_a_legacy_password(client, db):
+    register(client, "S1", "stud1")
+    db.execute(update(User).where(User.usn == "S1").values(password_hash="secret"))
+    db.commit()
+
+    r = client.post("/auth/login", json={"email": "s1@example.com", "password": "secret"})
+    assert r.status_code == 200 and r.json()["user"]["usn"] == "S1"
+    db.expire_all()
+    assert db.query(User.password_hash).filter(User.usn == "S1").scalar().startswith("$2")
+    assert client.post("/auth/login", json={"email": "s1@example.com", "password": "bad"}).status_code == 401
+
+
+def test_login_answers_503_when_busy(client, db, monkeypatch):
+    register(client, "S1", "stud1")
+
+    async def busy(password, stored):
+        raise AuthBusyError("full")
+
+    monkeypatch.setattr(auth_service, "verify_password", busy)
+    r = client.post("/auth/login", json={"email": "s1@example.com", "password": "secret"})
+    assert r.status_code == 503 and r.headers["Retry-After"]
@@ -0,0 +1,90 @@
+import base64
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import register
+from ml_models import classroom_recognizer
+from routes import facial_routes
+from routes.facial_routes import require_face_model
+from services import face_embedding_service
+
+
+def test_identify_assigns_closest_pairs_first():
+    enrolled = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    faces = np.array([
+        [0.9, 0.2, 0],   # A
+        [0.8, 1.0, 0],   # within the threshold of A too, but A is taken by the closer face 0
+        [-1, 0, 0]       # nobody
+    ], dtype=np.float32)
+    matches = classroom_recognizer.identify(faces, ["A", "B", "C"], enrolled, threshold=0.4)
+    assert sorted((face, usn) for face, usn, _ in matches) == [(0, "A"), (1, "B")]
+
+
+def test_two_faces_never_mark_the_same_student():
+    enrolled = np.array([[1, 0]], dtype=np.float32)
+    faces = np.array([[1, 0.05], [1, 0]], dtype=np.float32)
+    matches = classroom_recognizer.identify(faces, ["A"], enrolled, threshold=0.5)
+    assert [(face, usn) for face, usn, _ in matches] == [(1, "A")]  # the closer face wins
+
+
+def test_identify_with_no_faces_or_no_students():
+    assert classroom_recognizer.identify(np.zeros((0, 0)), ["A"], np.ones((1, 2))) == []
+    assert classroom_recognizer.identify(np.ones((1, 2)), [], np.zeros((0, 0))) == []
+
+
+@pytest.fixture
+def enrolled(monkeypatch, tmp_path):
+    """Stored embeddings for S1 and S2 (S3 is registered without one)."""
+    monkeypatch.setattr(face_embedding_service, "FACE_DATA_DIR", str(tmp_path))
+    for usn, vec in (("S1", [1.0, 0.0]), ("S2", [0.0, 1.0])):
+        cv2.imwrite(face_embedding_service.photo_path(usn), np.zeros((4, 4, 3), dtype=np.uint8))
+        face_embedding_service.save_embedding(usn, vec)
+
+
+def test_load_enrolled_embeddings_reports_missing(enrolled):
+    found, matrix, missing = classroom_recognizer.load_enrolled_embeddings(["S1", "S3", "S2"])
+    assert found == ["S1", "S2"] and missing == ["S3"]
+    assert matrix.shape == (2, 2)
+
+
+def _photo():
+    ok, buf = cv2.imencode(".png", np.zeros((16, 16, 3), dtype=np.uint8))
+    return base64.b64encode(buf.tobytes()).decode()
+
+
+def test_classroom_photo_marks_identified_students(client, db, enrolled, monkeypatch):
+    teacher = register(client, "T1", "teach", is_teacher=True)
+    student = register(client, "S1", "stud1")
+    register(client, "S2", "stud2")
+    register(client, "S3", "stud3")
+    session_id = client.post("/qr/generate", json={"subject": "DS", "teacher_id": "T1"},
+                             headers=teacher).json()["session_id"]
+
+    faces = np.array([[0.0, 1.0], [1.0, 0.02], [-1.0, 0.0]], dtype=np.float32)
+    areas = [{"x": i} for i in range(3)]
+    jobs = []
+
+    def one_pass(fn, *args):
+        jobs.append(fn)
+        fut = Future()
+        fut.set_result((faces, areas))
+        return fut
+
+    monkeypatch.setattr(facial_routes.batcher, "submit_job", one_pass)
+    client.app.dependency_overrides[require_face_model] = lambda: None
+    try:
+        body = {"image": _photo(), "session_id": session_id}
+        assert client.post("/facial/classroom", json=body, headers=student).status_code == 403
+        first = client.post("/facial/classroom", json=body, headers=teacher).json()
+        again = client.post("/facial/classroom", json=body, headers=teacher).json()
+    finally:
+        client.app.dependency_overrides.pop(require_face_model, None)
+
+    assert len(jobs) == 2  # one inference pass per photo
+    assert (first["faces_detected"], first["unknown_faces"]) == (3, 1)
+    assert sorted(first["marked"]) == ["S1", "S2"]
+    assert first["missing_embeddings"] == ["S3"]
+    assert again["marked"] == [] and again["already_marked"] == ["S1", "S2"]
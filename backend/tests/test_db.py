@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from models.user_model import User
+from utils import db as db_module
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///x.db", "sqlite+aiosqlite:///x.db"),
+    ("mysql+pymysql://u:secret@h/app", "mysql+aiomysql://u:secret@h/app"),
+    ("postgresql://u:secret@h/app", "postgresql+asyncpg://u:secret@h/app"),
+    ("mssql+pyodbc://u:secret@h/app", "mssql+pyodbc://u:secret@h/app"),  # unknown backend: left as is
+])
+def test_async_url_swaps_in_the_async_driver(url, expected):
+    assert db_module._async_url(url) == expected
+
+
+def test_pool_options_come_from_config(monkeypatch):
+    monkeypatch.setattr(db_module, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(db_module, "DB_MAX_OVERFLOW", 4)
+    options = db_module._engine_options("mysql+pymysql://u:p@h/app")
+    assert options["pool_size"] == 3 and options["max_overflow"] == 4
+    assert options["pool_pre_ping"] is True
+    assert db_module._engine_options("sqlite:///x.db") == {"connect_args": {"check_same_thread": False}}
+
+
+def test_async_session_reads_what_the_sync_session_wrote(db):
+    db.add(User(usn="S1", name="stud1", email="s1@example.com", password_hash="x", is_teacher=False))
+    db.commit()
+
+    async def read():
+        agen = db_module.get_async_db()
+        session = await agen.__anext__()
+        try:
+            return (await session.execute(text("SELECT name FROM users WHERE usn = 'S1'"))).scalar()
+        finally:
+            await agen.aclose()
+
+    assert db_module.async_engine.url.drivername == "sqlite+aiosqlite"
+    assert asyncio.run(read()) == "stud1"
@@ -0,0 +1,105 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from services.face_batcher import FaceBatcher, FaceBusyError
+
+
+class Dispatcher:
+    """Records batches; resolves each one right away unless hold=True."""
+    def __init__(self, hold=False):
+        self.hold = hold
+        self.batches = []
+        self.jobs = []
+        self.dispatched = threading.Event()
+
+    def __call__(self, images):
+        self.batches.append(list(images))
+        job = Future()
+        self.jobs.append((job, images))
+        if not self.hold:
+            self.finish(-1)
+        self.dispatched.set()
+        return job
+
+    def finish(self, i):
+        job, images = self.jobs[i]
+        job.set_result(list(images))  # echo: each image is its own "embedding"
+
+
+def _batcher(dispatch, **kwargs):
+    kwargs.setdefault("max_batch_size", 8)
+    kwargs.setdefault("max_wait_ms", 200)
+    return FaceBatcher(dispatch, name="test_batch", **kwargs)
+
+
+def test_concurrent_submits_share_one_batch():
+    dispatch = Dispatcher()
+    batcher = _batcher(dispatch)
+    futures = [batcher.submit(i) for i in range(5)]
+    assert [f.result(timeout=2) for f in futures] == [0, 1, 2, 3, 4]
+    assert dispatch.batches == [[0, 1, 2, 3, 4]]
+
+
+def test_batches_are_capped_at_max_size():
+    dispatch = Dispatcher()
+    batcher = _batcher(dispatch, max_batch_size=2)
+    futures = [batcher.submit(i) for i in range(5)]
+    [f.result(timeout=2) for f in futures]
+    assert all(len(b) <= 2 for b in dispatch.batches)
+    assert sorted(i for b in dispatch.batches for i in b) == [0, 1, 2, 3, 4]
+
+
+def test_a_failed_image_only_fails_its_own_future():
+    dispatch = Dispatcher()
+    batcher = _batcher(dispatch)
+    ok, bad = batcher.submit("a"), batcher.submit(ValueError("no face"))
+    assert ok.result(timeout=2) == "a"
+    with pytest.raises(ValueError, match="no face"):
+        bad.result(timeout=2)
+
+
+def test_a_failed_dispatch_fails_the_whole_batch():
+    def broken(images):
+        raise RuntimeError("pool down")
+
+    batcher = _batcher(broken)
+    futures = [batcher.submit(i) for i in range(3)]
+    for f in futures:
+        with pytest.raises(RuntimeError, match="pool down"):
+            f.result(timeout=2)
+
+
+def test_next_batch_waits_for_a_free_worker():
+    dispatch = Dispatcher(hold=True)
+    batcher = _batcher(dispatch, max_wait_ms=1, max_in_flight=1)
+    first = batcher.submit("a")
+    assert dispatch.dispatched.wait(2)
+    rest = [batcher.submit("b"), batcher.submit("c")]
+    time.sleep(0.05)
+    assert len(dispatch.batches) == 1  # the single worker is busy: b and c keep queueing
+
+    dispatch.finish(0)
+    assert first.result(timeout=2) == "a"
+    deadline = time.monotonic() + 2
+    while len(dispatch.batches) < 2 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert dispatch.batches[1] == ["b", "c"]  # grown into one batch meanwhile
+    dispatch.finish(1)
+    assert [f.result(timeout=2) for f in rest] == ["b", "c"]
+
+
+def test_queue_limit_rejects_and_recovers():
+    dispatch = Dispatcher(hold=True)
+    batcher = _batcher(dispatch, max_pending=2)
+    futures = [batcher.submit("a"), batcher.submit("b")]
+    with pytest.raises(FaceBusyError):
+        batcher.submit("c")
+
+    assert dispatch.dispatched.wait(2)
+    assert dispatch.batches == [["a", "b"]]
+    dispatch.finish(0)
+    assert [f.result(timeout=2) for f in futures] == ["a", "b"]
+    assert batcher.submit("c")  # slots are released once the results are in
@@ -0,0 +1,109 @@
+import base64
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import register
+from routes.facial_routes import require_face_model
+from services import face_embedding_service
+from utils.config import FACE_DATA_DIR
+
+
+def _write_photo(usn, value=128):
+    os.makedirs(FACE_DATA_DIR, exist_ok=True)
+    cv2.imwrite(face_embedding_service.photo_path(usn), np.full((32, 32, 3), value, dtype=np.uint8))
+
+
+@pytest.fixture
+def photo():
+    _write_photo("S1")
+    yield "S1"
+    for path in (face_embedding_service.photo_path("S1"), face_embedding_service.embedding_path("S1")):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def test_saved_embedding_is_reused(photo):
+    face_embedding_service.save_embedding(photo, [1.0, 2.0, 3.0])
+    assert np.allclose(face_embedding_service.load_embedding(photo), [1, 2, 3])
+
+
+def test_missing_embedding_is_none(photo):
+    assert face_embedding_service.load_embedding(photo) is None
+    assert face_embedding_service.load_embedding("nobody") is None
+
+
+def test_touched_photo_keeps_its_embedding(photo):
+    face_embedding_service.save_embedding(photo, [1.0, 2.0])
+    path = face_embedding_service.photo_path(photo)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # copied / touched, same bytes
+    assert np.allclose(face_embedding_service.load_embedding(photo), [1, 2])
+
+
+def test_replaced_photo_invalidates_the_embedding(photo):
+    face_embedding_service.save_embedding(photo, [1.0, 2.0])
+    _write_photo(photo, value=10)
+    path = face_embedding_service.photo_path(photo)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert face_embedding_service.load_embedding(photo) is None
+
+
+def test_embedding_from_another_model_is_stale(photo, monkeypatch):
+    face_embedding_service.save_embedding(photo, [1.0, 2.0])
+    monkeypatch.setattr(face_embedding_service, "FACE_MODEL_NAME", "Facenet")
+    assert face_embedding_service.load_embedding(photo) is None
+
+
+def test_cosine_distance():
+    assert face_embedding_service.cosine_distance([1, 0], [1, 0]) == pytest.approx(0.0)
+    assert face_embedding_service.cosine_distance([1, 0], [0, 1]) == pytest.approx(1.0)
+    assert face_embedding_service.cosine_distance([0, 0], [1, 0]) == 1.0
+
+
+@pytest.fixture
+def face_client(client):
+    client.app.dependency_overrides[require_face_model] = lambda: None
+    yield client
+    client.app.dependency_overrides.pop(require_face_model, None)
+
+
+def _live_image():
+    ok, buf = cv2.imencode(".png", np.full((32, 32, 3), 200, dtype=np.uint8))
+    return base64.b64encode(buf.tobytes()).decode()
+
+
+def test_verify_embeds_only_the_live_image(face_client, db, photo, monkeypatch):
+    headers = register(face_client, "S1", "stud1")
+    face_embedding_service.save_embedding("S1", [1.0, 0.0])
+    embedded = []
+
+    async def embed(img):
+        embedded.append(img)
+        return np.array([1.0, 0.1], dtype=np.float32)
+
+    monkeypatch.setattr(face_embedding_service, "compute_embedding_async", embed)
+    r = face_client.post("/facial/verify", json={"image": _live_image(), "user_id": "stud1"}, headers=headers)
+    assert r.json()["verified"] is True
+    assert len(embedded) == 1 and isinstance(embedded[0], np.ndarray)  # the live frame, not the photo path
+
+
+def test_verify_recomputes_and_stores_a_stale_reference(face_client, db, photo, monkeypatch):
+    headers = register(face_client, "S1", "stud1")
+    embedded = []
+
+    async def embed(img):
+        embedded.append(img)
+        return np.array([0.0, 1.0], dtype=np.float32)
+
+    monkeypatch.setattr(face_embedding_service, "compute_embedding_async", embed)
+    face_client.post("/facial/verify", json={"image": _live_image(), "user_id": "stud1"}, headers=headers)
+    assert embedded[0] == face_embedding_service.photo_path("S1")
+    assert np.allclose(face_embedding_service.load_embedding("S1"), [0, 1])
+
+    embedded.clear()
+    face_client.post("/facial/verify", json={"image": _live_image(), "user_id": "stud1"}, headers=headers)
+    assert len(embedded) == 1
@@ -0,0 +1,109 @@
+import base64
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import register
+from ml_models import face_model
+from routes.facial_routes import require_face_model
+from services import face_embedding_service, face_executor
+from services.face_executor import FacePoolError
+
+
+class FakePool:
+    def __init__(self, error=None):
+        self.error = error
+        self.jobs = []
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        if self.error:
+            raise self.error
+        self.jobs.append(Future())
+        return self.jobs[-1]
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Pretend a one-worker pool is running."""
+    fake = FakePool()
+    monkeypatch.setattr(face_executor, "FACE_POOL_WORKERS", 1)
+    monkeypatch.setattr(face_executor, "_pool", fake)
+    monkeypatch.setattr(face_executor, "_warm", [])
+    return fake
+
+
+def test_without_workers_jobs_run_in_process():
+    assert face_executor.submit(abs, -3).result() == 3
+    with pytest.raises(ZeroDivisionError):
+        face_executor.submit(divmod, 1, 0).result()
+
+
+def test_job_results_and_errors_are_relayed(pool):
+    ok, bad = face_executor.submit(abs, -3), face_executor.submit(abs, "x")
+    pool.jobs[0].set_result(3)
+    pool.jobs[1].set_exception(TypeError("bad operand"))
+    assert ok.result() == 3
+    with pytest.raises(TypeError):
+        bad.result()
+    assert face_executor._pool is pool  # a job's own error leaves the pool alone
+
+
+def test_dead_worker_discards_the_pool(pool):
+    fut = face_executor.submit(abs, -3)
+    pool.jobs[0].set_exception(BrokenProcessPool("worker died"))
+    with pytest.raises(FacePoolError):
+        fut.result()
+    assert pool.shut_down and face_executor._pool is None
+
+
+def test_cancelled_job_is_a_pool_error(pool):
+    fut = face_executor.submit(abs, -3)
+    pool.jobs[0].cancel()
+    with pytest.raises(FacePoolError):
+        fut.result()
+
+
+def test_submit_to_a_shut_down_pool_raises_pool_error(pool):
+    pool.error = RuntimeError("cannot schedule new futures after shutdown")
+    with pytest.raises(FacePoolError):
+        face_executor.submit(abs, -3)
+    assert face_executor._pool is None
+
+
+def test_real_pool_runs_jobs_and_reports_warm_up(monkeypatch):
+    monkeypatch.setattr(face_executor, "FACE_POOL_WORKERS", 1)
+    monkeypatch.setattr(face_executor, "_pool", None)
+    monkeypatch.setattr(face_executor, "_warm", [])
+    face_executor.start()
+    try:
+        assert face_executor.submit(abs, -3).result(timeout=60) == 3
+        face_executor._warm[0].result(timeout=60)
+        # deepface is optional here: readiness follows whether the worker could warm up
+        assert face_executor.is_ready() == face_executor._warm[0].result()
+        assert face_executor.status()["state"] in (face_model.READY, face_model.FAILED)
+    finally:
+        face_executor.shutdown()
+
+
+def test_face_route_answers_503_when_the_pool_is_down(client, db, monkeypatch):
+    headers = register(client, "S1", "stud1")
+    client.app.dependency_overrides[require_face_model] = lambda: None
+    monkeypatch.setattr(face_executor, "start", lambda: None)
+
+    async def pool_down(img):
+        raise FacePoolError("worker died")
+
+    monkeypatch.setattr(face_embedding_service, "compute_embedding_async", pool_down)
+    ok, buf = cv2.imencode(".png", np.zeros((8, 8, 3), dtype=np.uint8))
+    try:
+        r = client.post("/facial/identify", json={"image": base64.b64encode(buf.tobytes()).decode()}, headers=headers)
+    finally:
+        client.app.dependency_overrides.pop(require_face_model, None)
+    assert r.status_code == 503 and r.headers["Retry-After"]
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from ml_models import face_index
+from ml_models.face_index import MIN_TRAIN_SIZE, FaceIndex
+
+
+def _vectors(n, dim=32, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def _filled(n, dim=32):
+    index = FaceIndex()
+    for i, vec in enumerate(_vectors(n, dim)):
+        index.add(f"USN{i:04d}", vec)
+    return index
+
+
+def test_exact_search_finds_the_student():
+    index = _filled(20)
+    vecs = _vectors(20)
+    usn, distance = index.search(vecs[7], k=1)[0]
+    assert usn == "USN0007" and distance == pytest.approx(0.0, abs=1e-5)
+
+
+def test_ivf_search_with_all_lists_equals_exact():
+    index = _filled(MIN_TRAIN_SIZE + 50)
+    assert index.centroids is not None
+    q = _vectors(1, seed=1)[0]
+    assert index.search(q, k=5, nprobe=len(index.centroids)) == index.search_exact(q, k=5)
+
+
+def test_add_replaces_and_remove_keeps_rows_consistent():
+    index = _filled(MIN_TRAIN_SIZE + 10)
+    vecs = _vectors(MIN_TRAIN_SIZE + 10)
+    index.add("USN0003", vecs[5])            # re-enrollment replaces the old vector
+    index.remove("USN0000")                  # last row moves into the hole
+    assert len(index) == MIN_TRAIN_SIZE + 9
+    assert "USN0000" not in index.rows
+    assert all(index.usns[row] == usn for usn, row in index.rows.items())
+    assert sorted(r for lst in index.lists for r in lst) == list(range(len(index)))
+    assert index.search_exact(vecs[5], k=2)[0][1] == pytest.approx(0.0, abs=1e-5)
+
+
+@pytest.mark.parametrize("n", [0, 10, MIN_TRAIN_SIZE + 50])
+def test_save_load_round_trip(tmp_path, n):
+    path = str(tmp_path / "index.npz")
+    index = _filled(n)
+    index.save(path)
+    loaded = FaceIndex.load(path)
+
+    assert loaded.usns == index.usns
+    assert loaded.trained_size == index.trained_size
+    assert (loaded.centroids is None) == (index.centroids is None)
+    for q in _vectors(3, seed=2):
+        assert loaded.search(q, k=3) == index.search(q, k=3)
+    with np.load(path) as data:  # no pickled object arrays on disk
+        assert data["usns"].dtype.kind == "U"
+
+
+def test_load_rejects_pickled_snapshot(tmp_path):
+    path = str(tmp_path / "old.npz")
+    np.savez(path, usns=np.array(["A"], dtype=object), vectors=_vectors(1),
+             centroids=np.zeros((0, 0), dtype=np.float32), trained_size=np.array(0))
+    with pytest.raises(ValueError, match="build_face_index"):
+        FaceIndex.load(path)
+
+
+def test_shared_index_replays_the_log_in_another_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(face_index, "FACE_INDEX_PATH", str(tmp_path / "face_index.npz"))
+    monkeypatch.setattr(face_index, "_index", None)
+    vecs = _vectors(3)
+    face_index.rebuild([("A", vecs[0])])
+    face_index.add("B", vecs[1])
+
+    # A fresh process: snapshot + log replay
+    monkeypatch.setattr(face_index, "_index", None)
+    assert face_index.search(vecs[1], k=1)[0][0] == "B"
+    assert {u for u, _ in face_index.search(vecs[0], k=5)} == {"A", "B"}
@@ -0,0 +1,70 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import register
+from ml_models import face_model
+
+
+@pytest.fixture
+def cold(monkeypatch):
+    monkeypatch.setattr(face_model, "_state", face_model.COLD)
+    monkeypatch.setattr(face_model, "_error", None)
+
+
+@pytest.fixture
+def fake_recognizer(monkeypatch, cold):
+    """Stub the deepface pieces load() uses; counts warm-up passes."""
+    forwards = []
+    monkeypatch.setattr(face_model, "_recognizer", lambda: object())
+    monkeypatch.setattr(face_model, "preprocess", lambda img: np.zeros((1, 4, 4, 3), dtype=np.float32))
+    monkeypatch.setattr(face_model, "forward", lambda batch: forwards.append(batch) or np.zeros((len(batch), 2)))
+    return forwards
+
+
+def test_app_import_does_not_load_deepface():
+    code = "import main, sys; print(any(m in sys.modules for m in ('deepface', 'tensorflow')))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == "False"
+
+
+def test_load_warms_up_once(fake_recognizer):
+    assert face_model.load() and face_model.load()
+    assert face_model.is_ready()
+    assert len(fake_recognizer) == 1
+    assert face_model.status()["state"] == face_model.READY
+
+
+def test_load_failure_is_reported_not_raised(monkeypatch, cold):
+    def missing():
+        raise ImportError("No module named 'deepface'")
+
+    monkeypatch.setattr(face_model, "_deepface", missing)
+    assert face_model.load() is False
+    status = face_model.status()
+    assert status["state"] == face_model.FAILED and "deepface" in status["error"]
+
+
+def test_unsupported_model_name_fails(monkeypatch, fake_recognizer):
+    monkeypatch.setattr(face_model, "FACE_MODEL_NAME", "NotAModel")
+    assert face_model.load() is False
+    assert "unsupported FACE_MODEL_NAME" in face_model.status()["error"]
+    assert fake_recognizer == []
+
+
+def test_face_routes_answer_503_until_warm(client, db, monkeypatch, cold):
+    headers = register(client, "S1", "stud1")
+    started = []
+    monkeypatch.setattr(face_model, "load_in_background", lambda: started.append(True))
+
+    r = client.post("/facial/verify", json={"image": "x", "user_id": "stud1"}, headers=headers)
+    assert r.status_code == 503 and r.headers["Retry-After"]
+    assert started  # the request kicks off loading
+    assert client.get("/facial/ready").json()["state"] == face_model.COLD
+
+
+def test_ready_reports_warm_model(client, fake_recognizer):
+    face_model.load()
+    assert client.get("/facial/ready").json() == dict(face_model.status(), workers=0)
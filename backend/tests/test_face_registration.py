@@ -0,0 +1,80 @@
+import asyncio
+import base64
+import os
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import register
+from ml_models import face_index
+from routes import face_registration_routes
+from routes.facial_routes import require_face_model
+from services import face_batcher, face_embedding_service
+from services.face_batcher import FaceBatcher, FaceBusyError
+
+
+def _done(result):
+    fut = Future()
+    fut.set_result(result)
+    return fut
+
+
+def _image_payload():
+    ok, buf = cv2.imencode(".png", np.full((32, 32, 3), 128, dtype=np.uint8))
+    return "data:image/png;base64," + base64.b64encode(buf.tobytes()).decode()
+
+
+@pytest.fixture
+def face_client(client):
+    client.app.dependency_overrides[require_face_model] = lambda: None
+    yield client
+    client.app.dependency_overrides.pop(require_face_model, None)
+
+
+def test_register_face_is_async():
+    assert asyncio.iscoroutinefunction(face_registration_routes.register_face)
+
+
+def test_submit_job_counts_against_the_queue_limit(monkeypatch):
+    jobs = []
+    monkeypatch.setattr(face_batcher.face_executor, "submit", lambda fn, *args: jobs.append(Future()) or jobs[-1])
+    batcher = FaceBatcher(dispatch=None, max_batch_size=4, max_wait_ms=1, max_pending=1, name="test_batch")
+
+    batcher.submit_job(len, "x")
+    with pytest.raises(FaceBusyError):
+        batcher.submit_job(len, "y")
+    jobs[0].set_result(1)  # done: the slot is released
+    batcher.submit_job(len, "z")
+
+
+def test_register_face_stores_crop_embedding_and_index_entry(face_client, db, monkeypatch):
+    headers = register(face_client, "S1", "stud1")
+    embedding = np.arange(8, dtype=np.float32) + 1
+    crop = np.zeros((16, 16, 3), dtype=np.uint8)
+    monkeypatch.setattr(face_registration_routes.batcher, "submit_job", lambda fn, *args: _done((crop, embedding, 0.99)))
+
+    r = face_client.post("/face-registration/register", json={"image": _image_payload(), "user_id": "stud1"}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert os.path.exists(face_embedding_service.photo_path("S1"))
+    assert np.allclose(face_embedding_service.load_embedding("S1"), embedding)
+    assert face_index.search(embedding, k=1)[0][0] == "S1"
+
+
+def test_register_face_returns_503_when_busy(face_client, db, monkeypatch):
+    headers = register(face_client, "S1", "stud1")
+
+    def busy(fn, *args):
+        raise FaceBusyError("full")
+
+    monkeypatch.setattr(face_registration_routes.batcher, "submit_job", busy)
+    r = face_client.post("/face-registration/register", json={"image": _image_payload(), "user_id": "stud1"}, headers=headers)
+    assert r.status_code == 503 and r.headers["Retry-After"]
+
+
+def test_register_face_rejects_a_photo_without_a_face(face_client, db, monkeypatch):
+    headers = register(face_client, "S1", "stud1")
+    monkeypatch.setattr(face_registration_routes.batcher, "submit_job", lambda fn, *args: _done((None, None, 0)))
+    r = face_client.post("/face-registration/register", json={"image": _image_payload(), "user_id": "stud1"}, headers=headers)
+    assert r.status_code == 400
@@ -0,0 +1,75 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from services import facial_service
+
+
+@pytest.fixture
+def lbph(tmp_path, monkeypatch):
+    monkeypatch.setattr(facial_service, "DATA_DIR", str(tmp_path / "faces"))
+    monkeypatch.setattr(facial_service, "MODEL_PATH", str(tmp_path / "face_model.yml"))
+    (tmp_path / "faces").mkdir()
+
+    def image(name, seed):
+        path = str(tmp_path / f"{name}.png")
+        cv2.imwrite(path, np.random.default_rng(seed).integers(0, 255, (48, 48), dtype=np.uint8))
+        return path
+    return image
+
+
+def _samples():
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(facial_service.MODEL_PATH)
+    return len(recognizer.getHistograms())
+
+
+def test_reenrolling_the_same_images_adds_nothing(lbph):
+    images = [lbph("a", 1), lbph("b", 2)]
+    assert facial_service.enroll_user(1, images)
+    assert not facial_service.enroll_user(1, images)
+    assert _samples() == 2
+
+
+def test_same_content_in_one_batch_is_copied_once(lbph):
+    a = lbph("a", 1)
+    copy = lbph("a-copy", 1)
+    assert len(facial_service.collect_images_for_user(1, [a, copy])) == 1
+
+
+def test_new_images_are_appended_incrementally(lbph):
+    facial_service.enroll_user(1, [lbph("a", 1)])
+    facial_service.enroll_user(2, [lbph("b", 2), lbph("a", 1)])  # same content, other label: still new
+    facial_service.enroll_user(1, [lbph("a", 1), lbph("c", 3)])
+    assert _samples() == 4
+
+
+def test_full_rebuild_matches_the_image_folders(lbph):
+    facial_service.enroll_user(1, [lbph("a", 1), lbph("b", 2)])
+    facial_service.enroll_user(2, [lbph("c", 3)])
+    assert facial_service.train_model()
+    assert _samples() == 3
+    assert facial_service.update_model(1)  # no paths: full rebuild, not a re-append
+    assert _samples() == 3
+
+
+def test_rebuild_racing_an_enrollment_counts_each_image_once(lbph):
+    facial_service.enroll_user(1, [lbph("seed", 0)])
+    images = [lbph(f"img{i}", 10 + i) for i in range(12)]
+
+    def enroll():
+        for i, path in enumerate(images):
+            facial_service.enroll_user(2 + i % 3, [path])
+
+    def rebuild():
+        for _ in range(6):
+            facial_service.train_model(workers=2)
+
+    threads = [threading.Thread(target=enroll), threading.Thread(target=rebuild)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert _samples() == 13
@@ -0,0 +1,89 @@
+import pytest
+
+from conftest import register
+from models.classroom_model import Classroom
+from services import geofence
+from services.geofence import METERS_PER_DEG_LAT, GeofenceIndex, Room
+
+LAT, LON = 12.9345, 77.6050
+M = 1 / METERS_PER_DEG_LAT  # one meter of latitude in degrees
+
+
+def _index():
+    return GeofenceIndex([
+        Room(1, "101", LAT, LON, radius_m=30),
+        Room(2, "hall", LAT + 200 * M, LON, polygon=[
+            [LAT + 150 * M, LON - 0.0005], [LAT + 250 * M, LON - 0.0005],
+            [LAT + 250 * M, LON + 0.0005], [LAT + 150 * M, LON + 0.0005]
+        ]),
+        # A small room inside the hall
+        Room(3, "hall-stage", LAT + 240 * M, LON, radius_m=5),
+    ])
+
+
+def test_circle_containment():
+    index = _index()
+    assert index.locate(LAT + 25 * M, LON).id == 1
+    assert index.locate(LAT + 35 * M, LON) is None
+
+
+def test_polygon_containment():
+    index = _index()
+    assert index.locate(LAT + 160 * M, LON + 0.0004).id == 2
+    assert index.locate(LAT + 160 * M, LON + 0.0006) is None
+
+
+def test_nested_room_wins():
+    assert _index().locate(LAT + 240 * M, LON).id == 3
+
+
+def test_rooms_straddling_grid_cells_are_found():
+    index = GeofenceIndex([Room(1, "edge", LAT, LON, radius_m=300)], cell_deg=0.001)
+    for dlat in (-250, 0, 250):
+        assert index.locate(LAT + dlat * M, LON).id == 1
+
+
+@pytest.fixture
+def rooms(db):
+    db.add_all([
+        Classroom(id=1, room_number="101", lat=LAT, lon=LON, radius_m=30),
+        Classroom(id=2, room_number="102", lat=LAT + 100 * M, lon=LON, radius_m=30),
+    ])
+    db.commit()
+    geofence.invalidate()
+    return db
+
+
+def test_check_expected_room(rooms):
+    room, matches = geofence.check(LAT, LON, 1)
+    assert room.id == 1 and matches
+    room, matches = geofence.check(LAT, LON, 2)  # in 101, session is in 102
+    assert room.id == 1 and not matches
+    room, matches = geofence.check(LAT, LON)      # no expected room: any room
+    assert room.id == 1 and matches
+
+
+def test_unknown_expected_room_never_matches(rooms):
+    room, matches = geofence.check(LAT, LON, 99)
+    assert room.id == 1 and not matches
+
+
+def test_invalidate_reloads_rooms(rooms):
+    assert geofence.check(LAT + 500 * M, LON)[0] is None
+    rooms.add(Classroom(id=3, room_number="103", lat=LAT + 500 * M, lon=LON, radius_m=30))
+    rooms.commit()
+    geofence.invalidate()
+    assert geofence.check(LAT + 500 * M, LON)[0].id == 3
+
+
+def test_fallback_room_when_table_is_empty(db):
+    geofence.invalidate()
+    assert list(geofence.get_index().rooms) == [1]
+
+
+def test_classroom_location_keeps_degrees_and_adds_meters(client, rooms):
+    headers = register(client, "S1", "stud1")
+    body = client.get("/location/classroom-location", headers=headers).json()
+    assert body["radius"] == pytest.approx(30 / METERS_PER_DEG_LAT, abs=1e-6)
+    assert body["radius_m"] == 30
+    assert [r["classroom_id"] for r in body["rooms"]] == [1, 2]
@@ -0,0 +1,96 @@
+import os
+
+from sqlalchemy import event, update
+
+from conftest import register
+from models.teacher_model import Teacher
+from models.user_model import User
+from services import identity_cache
+from utils.config import CACHE_VERSION_DIR
+from utils.db import engine
+from utils.version_counter import VersionCounter
+
+
+def _user(db, usn, name, is_teacher=False):
+    user = User(usn=usn, name=name, email=f"{usn.lower()}@example.com", password_hash="x", is_teacher=is_teacher)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _rename_behind_the_caches_back(db, usn, name):
+    db.execute(update(User).where(User.usn == usn).values(name=name))
+    db.commit()
+
+
+class Queries:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self)
+
+
+def test_repeat_lookups_skip_the_database(db):
+    _user(db, "S1", "stud1")
+    first = identity_cache.user_by_name(db, "stud1")
+    with Queries() as queries:
+        assert identity_cache.user_by_name(db, "stud1").usn == "S1"
+        assert identity_cache.user_by_usn(db, "S1") is first
+    assert queries.count == 0
+    assert not hasattr(first, "password_hash")
+
+
+def test_misses_are_not_cached(db):
+    assert identity_cache.user_by_usn(db, "S1") is None
+    _user(db, "S1", "stud1")  # added outside the API
+    assert identity_cache.user_by_usn(db, "S1").name == "stud1"
+
+
+def test_register_invalidates_every_worker(client, db):
+    register(client, "S1", "stud1")
+    assert identity_cache.user_by_usn(db, "S1").name == "stud1"
+    _rename_behind_the_caches_back(db, "S1", "renamed")
+    assert identity_cache.user_by_usn(db, "S1").name == "stud1"
+
+    # Another worker registers someone: it bumps the shared counter
+    VersionCounter(os.path.join(CACHE_VERSION_DIR, "identity.version")).bump()
+    assert identity_cache.user_by_usn(db, "S1").name == "renamed"
+
+
+def test_warm_preloads_users_and_teachers(db):
+    _user(db, "S1", "stud1")
+    teacher = _user(db, "T1", "teach", is_teacher=True)
+    db.add(Teacher(user_id=teacher.id, teacher_id="F-01", subjects_taken=["DS"]))
+    db.commit()
+
+    assert identity_cache.warm(db) == 2
+    with Queries() as queries:
+        assert identity_cache.user_by_name(db, "stud1").usn == "S1"
+        assert identity_cache.teacher_by_usn(db, "T1").subjects_taken == ["DS"]
+    assert queries.count == 0
+
+
+def test_duplicate_names_resolve_to_the_first_user(db):
+    _user(db, "S1", "same")
+    _user(db, "S2", "same")
+    identity_cache.warm(db)
+    assert identity_cache.user_by_name(db, "same").usn == "S1"
+    identity_cache.invalidate()
+    identity_cache.user_by_usn(db, "S2")  # caching S2 first must not take over the name
+    assert identity_cache.user_by_name(db, "same").usn == "S1"
+
+
+def test_cache_is_bounded(db, monkeypatch):
+    monkeypatch.setattr(identity_cache, "_users", identity_cache._LRU("user", 2))
+    for i in range(3):
+        _user(db, f"S{i}", f"stud{i}")
+        identity_cache.user_by_usn(db, f"S{i}")
+    assert "S0" not in identity_cache._users and "S2" in identity_cache._users
@@ -0,0 +1,63 @@
+import base64
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import register
+from routes.facial_routes import require_face_model
+from services import face_embedding_service
+from utils.image_utils import decode_image
+
+
+def _png(value=90):
+    ok, buf = cv2.imencode(".png", np.full((8, 12, 3), value, dtype=np.uint8))
+    return buf.tobytes()
+
+
+@pytest.mark.parametrize("wrap", [
+    lambda raw: raw,
+    lambda raw: base64.b64encode(raw).decode(),
+    lambda raw: "data:image/png;base64," + base64.b64encode(raw).decode()
+])
+def test_decode_image_accepts_bytes_base64_and_data_urls(wrap):
+    img = decode_image(wrap(_png()))
+    assert img.shape == (8, 12, 3) and img.dtype == np.uint8
+    assert (img == 90).all()
+
+
+@pytest.mark.parametrize("data", [b"", b"not an image", "data:image/png;base64,@@@", base64.b64encode(b"text").decode()])
+def test_decode_image_rejects_garbage(data):
+    with pytest.raises(ValueError):
+        decode_image(data)
+
+
+@pytest.fixture
+def face_client(client):
+    client.app.dependency_overrides[require_face_model] = lambda: None
+    yield client
+    client.app.dependency_overrides.pop(require_face_model, None)
+
+
+def test_verify_writes_nothing_to_disk(face_client, db, monkeypatch, tmp_path):
+    headers = register(face_client, "S1", "stud1")
+    monkeypatch.setattr(face_embedding_service, "FACE_DATA_DIR", str(tmp_path))
+    cv2.imwrite(face_embedding_service.photo_path("S1"), np.zeros((8, 8, 3), dtype=np.uint8))
+    face_embedding_service.save_embedding("S1", [1.0, 0.0])
+
+    async def embed(img):
+        return np.array([1.0, 0.0], dtype=np.float32)
+
+    monkeypatch.setattr(face_embedding_service, "compute_embedding_async", embed)
+    before = sorted(os.listdir(tmp_path))
+    image = base64.b64encode(_png()).decode()
+    r = face_client.post("/facial/verify", json={"image": image, "user_id": "stud1"}, headers=headers)
+    assert r.json()["verified"] is True
+    assert sorted(os.listdir(tmp_path)) == before
+
+
+def test_identify_rejects_an_undecodable_image(face_client, db):
+    headers = register(face_client, "S1", "stud1")
+    r = face_client.post("/facial/identify", json={"image": "bm90IGFuIGltYWdl"}, headers=headers)
+    assert r.status_code == 400
@@ -0,0 +1,70 @@
+import asyncio
+
+from sqlalchemy import delete, update
+
+from conftest import register
+from models.user_model import User
+from services import identity_cache
+from utils import jwt_token
+
+
+def _count_calls(monkeypatch, name):
+    calls = []
+    original = getattr(jwt_token, name)
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(jwt_token, name, counted)
+    return calls
+
+
+def test_get_principal_is_async():
+    assert asyncio.iscoroutinefunction(jwt_token.get_principal)
+
+
+def test_token_is_hashed_once_per_request(client, db, monkeypatch):
+    headers = register(client, "T1", "teach", is_teacher=True)
+    digests = _count_calls(monkeypatch, "_digest")
+    assert client.get("/attendance/summary/DS", headers=headers).status_code == 200
+    assert len(digests) == 1
+
+
+def test_cached_principal_skips_the_threadpool(client, db, monkeypatch):
+    headers = register(client, "T1", "teach", is_teacher=True)
+    loads = _count_calls(monkeypatch, "_load_principal")
+    client.get("/attendance/summary/DS", headers=headers)
+    client.get("/attendance/summary/DS", headers=headers)
+    assert len(loads) == 1
+
+
+def test_principal_refreshes_on_invalidate(client, db):
+    headers = register(client, "T1", "teach", is_teacher=True)
+    assert client.get("/attendance/summary/DS", headers=headers).status_code == 200
+
+    db.execute(update(User).where(User.usn == "T1").values(is_teacher=False))
+    db.commit()
+    # Cached until the identity cache is invalidated (or the TTL passes)
+    assert client.get("/attendance/summary/DS", headers=headers).status_code == 200
+    identity_cache.invalidate()
+    assert client.get("/attendance/summary/DS", headers=headers).status_code == 403
+
+
+def test_principal_refreshes_after_ttl(client, db, monkeypatch):
+    headers = register(client, "T1", "teach", is_teacher=True)
+    client.get("/attendance/summary/DS", headers=headers)
+    db.execute(delete(User).where(User.usn == "T1"))
+    db.commit()
+
+    # No invalidate(): only the TTL expires the cached principal (and the
+    # identity cache's own copy of the user is bypassed)
+    monkeypatch.setattr(jwt_token, "PRINCIPAL_CACHE_TTL_SECONDS", 0)
+    monkeypatch.setattr(identity_cache, "user_by_usn", lambda db, usn: None)
+    r = client.get("/attendance/summary/DS", headers=headers)
+    assert r.status_code == 401 and r.json()["detail"] == "User not found"
+
+
+def test_invalid_token_is_rejected(client, db):
+    r = client.get("/attendance/summary/DS", headers={"Authorization": "Bearer not-a-jwt"})
+    assert r.status_code == 401
@@ -0,0 +1,134 @@
+# Migrations against a database created by the original (pre-migration) models.
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from utils.db import Base
+from utils.migrations import (
+    DUPLICATES_ARCHIVE, MIGRATIONS, SchemaOutOfDateError, _m002_attendance_unique_session_user, _manual_teacher,
+    check_schema, current_version,
+    latest_version, migrate, table_of
+)
+
+LEGACY_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, usn VARCHAR(20) UNIQUE, name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) UNIQUE, password_hash VARCHAR(255) NOT NULL,
+        is_teacher BOOLEAN, photo_path VARCHAR(255))""",
+    """CREATE TABLE attendance (
+        id INTEGER PRIMARY KEY, user_usn VARCHAR(20) REFERENCES users (usn),
+        session_id VARCHAR(100) NOT NULL, classroom_id INTEGER, subject VARCHAR(255),
+        qr_match BOOLEAN, location_match BOOLEAN, face_match BOOLEAN,
+        marked_by_teacher BOOLEAN, timestamp DATETIME)""",
+    """CREATE TABLE active_sessions (
+        session_id VARCHAR(36) PRIMARY KEY, subject VARCHAR(255) NOT NULL,
+        teacher_id VARCHAR(255) NOT NULL, created_at DATETIME,
+        expires_at DATETIME NOT NULL, active BOOLEAN NOT NULL)""",
+    """CREATE TABLE classrooms (
+        id INTEGER PRIMARY KEY, room_number VARCHAR(50) UNIQUE, lat FLOAT NOT NULL,
+        lon FLOAT NOT NULL, image_paths VARCHAR(255))""",
+]
+
+# (id, usn, session_id, subject, qr, loc, face, by_teacher, timestamp)
+LEGACY_ATTENDANCE = [
+    (1, "S1", "qr-1", "DS", 1, 1, 1, 0, "2024-01-05 09:00:00"),
+    (2, "S1", "qr-1", "DS", 1, 1, 1, 0, "2024-01-05 09:01:00"),   # duplicate of 1
+    (3, "S1", "qr-1", "DS", 1, 1, 1, 0, "2024-01-05 09:02:00"),   # duplicate of 1
+    (4, "S2", "qr-1", "DS", 1, 1, 1, 0, "2024-01-05 09:00:30"),
+    # Legacy override ids had no day: one id per teacher + subject forever
+    (5, "S1", "manual-T-01-Data_Structures", "Data Structures", 0, 0, 0, 1, "2024-01-06 10:00:00"),
+    (6, "S1", "manual-T-01-Data_Structures", "Data Structures", 0, 0, 0, 1, "2024-01-07 10:00:00"),
+    (7, "S2", "manual-T-01-Data_Structures", "Data Structures", 0, 0, 0, 1, "2024-01-07 10:05:00"),
+    (8, "S2", "manual-legacy", "DS", 0, 0, 0, 1, "2024-01-08 10:00:00"),
+]
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for ddl in LEGACY_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "INSERT INTO users (id, usn, name, email, password_hash, is_teacher) VALUES"
+            " (1, 'S1', 's1', 's1@x', 'h', 0), (2, 'S2', 's2', 's2@x', 'h', 0), (3, 'T-01', 't', 't@x', 'h', 1)"
+        ))
+        conn.execute(text(
+            "INSERT INTO active_sessions VALUES ('qr-1', 'DS', 'T-01', NULL, '2024-01-05 09:10:00', 0)"
+        ))
+        conn.execute(
+            text(
+                "INSERT INTO attendance (id, user_usn, session_id, subject, qr_match, location_match,"
+                " face_match, marked_by_teacher, timestamp) VALUES (:id, :usn, :sid, :subject, :qr, :loc,"
+                " :face, :teacher, :ts)"
+            ),
+            [dict(zip(("id", "usn", "sid", "subject", "qr", "loc", "face", "teacher", "ts"), r))
+             for r in LEGACY_ATTENDANCE]
+        )
+    # What scripts/migrate.py does: importing utils.db runs create_all(), then migrate()
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def test_check_schema_refuses_unmigrated_database(legacy_engine):
+    with pytest.raises(SchemaOutOfDateError):
+        check_schema(legacy_engine)
+
+
+def test_migrate_legacy_database(legacy_engine):
+    assert migrate(legacy_engine) == [version for version, _, _ in MIGRATIONS]
+    assert check_schema(legacy_engine) == latest_version()
+
+    with legacy_engine.connect() as conn:
+        attendance = table_of(conn, "attendance")
+        rows = {r.id: r.session_id for r in conn.execute(select(attendance.c.id, attendance.c.session_id))}
+        archived = sorted(r.id for r in conn.execute(text(f"SELECT id FROM {DUPLICATES_ARCHIVE}")))
+        manual = dict(conn.execute(text("SELECT session_id, teacher_id FROM manual_sessions")).all())
+        held = dict(conn.execute(text("SELECT subject, sessions_held FROM attendance_summary WHERE usn = '*'")).all())
+        s1 = {r.subject: r for r in conn.execute(text("SELECT * FROM attendance_summary WHERE usn = 'S1'"))}
+        columns = {c.name for c in attendance.columns} | {c.name for c in table_of(conn, "active_sessions").columns}
+
+    # True duplicates are archived, first row kept
+    assert archived == [2, 3]
+    assert set(rows) == {1, 4, 5, 6, 7, 8}
+    # The forever-id is split per day, so two days are two sessions, not duplicates
+    assert rows[5] == "manual-T-01-Data_Structures-20240106"
+    assert rows[6] == rows[7] == "manual-T-01-Data_Structures-20240107"
+    assert rows[8] == "manual-legacy-20240108"
+    # Teacher usn with a "-" is recovered; an id that doesn't parse is skipped
+    assert manual == {
+        "manual-T-01-Data_Structures-20240106": "T-01",
+        "manual-T-01-Data_Structures-20240107": "T-01",
+    }
+    # Summary backfill: 1 QR + 1 manual session for "DS", 2 manual days for "Data Structures"
+    assert held == {"DS": 2, "Data Structures": 2}
+    assert s1["DS"].records == 1 and s1["Data Structures"].records == 2
+    assert {"section", "classroom_id"} <= columns
+
+
+def test_migrate_is_idempotent(legacy_engine):
+    migrate(legacy_engine)
+    assert migrate(legacy_engine) == []
+    with legacy_engine.connect() as conn:
+        assert current_version(conn) == latest_version()
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {DUPLICATES_ARCHIVE}")).scalar() == 2
+
+
+def test_m002_rerun_after_partial_failure(legacy_engine):
+    # On MySQL a failure after the first DDL leaves earlier statements committed;
+    # running the step again must not archive or re-key anything twice.
+    for _ in range(2):
+        with legacy_engine.begin() as conn:
+            _m002_attendance_unique_session_user(conn)
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {DUPLICATES_ARCHIVE}")).scalar() == 2
+        assert conn.execute(text("SELECT session_id FROM attendance WHERE id = 5")).scalar() == \
+            "manual-T-01-Data_Structures-20240106"
+
+
+def test_manual_teacher_parsing():
+    assert _manual_teacher("manual-1AM23CS001-Theory_of_Computation-20240105", "Theory of Computation") == "1AM23CS001"
+    assert _manual_teacher("manual-T-01-Data-Mining-20240105", "Data-Mining") == "T-01"
+    assert _manual_teacher("manual-T-01-Data_Structures", "Data Structures") is None  # no day suffix
+    assert _manual_teacher("manual-legacy-20240105", "DS") is None
+    assert _manual_teacher("manual-T-01-Data_Str~1a2b3c4d-20240105", "Data Structures") is None
@@ -0,0 +1,90 @@
+import pytest
+
+from conftest import register
+from services import qr_rotation
+from utils.config import QR_ROTATE_SECONDS, QR_SCAN_RECEIPT_SECONDS
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Pins time.time() inside qr_rotation; advance with clock.now += seconds."""
+    class Clock:
+        now = NOW
+    monkeypatch.setattr(qr_rotation.time, "time", lambda: Clock.now)
+    return Clock
+
+
+def test_validate_accepts_current_and_previous_window(clock):
+    window = qr_rotation.current_window()
+    assert qr_rotation.validate("s1", qr_rotation.payload("s1"))
+    assert qr_rotation.validate("s1", qr_rotation.payload("s1", window - 1))
+    assert not qr_rotation.validate("s1", qr_rotation.payload("s1", window - 2))
+    assert not qr_rotation.validate("s1", qr_rotation.payload("s1", window + 1))  # not shown yet
+
+
+def test_screenshot_expires_one_window_later(clock):
+    shown = qr_rotation.payload("s1")
+    clock.now += QR_ROTATE_SECONDS
+    assert qr_rotation.validate("s1", shown)
+    clock.now += QR_ROTATE_SECONDS
+    assert not qr_rotation.validate("s1", shown)
+
+
+@pytest.mark.parametrize("bad", [
+    None, "", "garbage", "s1.notanumber.code", "s1.{w}.forged", "s2.{w}.{code}"
+])
+def test_validate_rejects_malformed_and_forged(clock, bad):
+    good = qr_rotation.payload("s1")
+    _, w, code = good.rsplit(".", 2)
+    if bad is not None:
+        bad = bad.format(w=w, code=code)
+    assert not qr_rotation.validate("s1", bad)
+
+
+def test_session_of_handles_dotted_ids():
+    session_id = "manual-T1.DS"
+    assert qr_rotation.session_of(qr_rotation.payload(session_id)) == session_id
+    assert qr_rotation.validate(session_id, qr_rotation.payload(session_id))
+    assert qr_rotation.session_of("no-dots") is None
+    assert qr_rotation.session_of(None) is None
+
+
+def test_scan_receipt_is_bound_and_expires(clock):
+    receipt = qr_rotation.scan_receipt("s1", "S1")
+    assert qr_rotation.check_scan_receipt("s1", "S1", receipt)
+    assert not qr_rotation.check_scan_receipt("s1", "S2", receipt)
+    assert not qr_rotation.check_scan_receipt("s2", "S1", receipt)
+    assert not qr_rotation.check_stream_ticket("s1", receipt)  # purposes don't mix
+    assert not qr_rotation.check_scan_receipt("s1", "S1", "not-a-ticket")
+
+    clock.now += QR_SCAN_RECEIPT_SECONDS + 1
+    assert not qr_rotation.check_scan_receipt("s1", "S1", receipt)
+
+
+def test_image_is_rendered_for_current_and_next_window():
+    qr_rotation.start()
+    try:
+        window = qr_rotation.current_window()
+        assert qr_rotation.image("s1", window).startswith(b"\x89PNG")
+        # The renderer keeps the next window ready before the rotation
+        assert qr_rotation.image("s1", window + 1).startswith(b"\x89PNG")
+    finally:
+        qr_rotation.stop()
+
+
+def test_scan_hands_out_a_receipt_for_a_live_session(client, db):
+    teacher = register(client, "T1", "teach", is_teacher=True)
+    student = register(client, "S1", "stud1")
+    session_id = client.post("/qr/generate", json={"subject": "DS", "teacher_id": "T1"},
+                             headers=teacher).json()["session_id"]
+
+    old = qr_rotation.payload(session_id, qr_rotation.current_window() - 2)
+    assert client.post("/qr/scan", json={"payload": old}, headers=student).status_code == 400
+
+    r = client.post("/qr/scan", json={"payload": qr_rotation.payload(session_id)}, headers=student)
+    assert r.status_code == 200
+    assert qr_rotation.check_scan_receipt(session_id, "S1", r.json()["qr_receipt"])
+
+    assert client.post("/qr/scan", json={"payload": qr_rotation.payload("nope")}, headers=student).status_code == 404
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from services import qr_service
+from services.qr_token_store import MemoryTokenStore, SQLiteTokenStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(max_entries):
+        if request.param == "memory":
+            return MemoryTokenStore(max_entries)
+        return SQLiteTokenStore(str(tmp_path / "tokens.sqlite3"), max_entries)
+    return make
+
+
+def test_put_get_delete(make_store):
+    store = make_store(10)
+    store.put("a", 1, time.time() + 60)
+    assert store.get("a")[0] == 1
+    store.delete("a")
+    assert store.get("a") is None
+
+
+def test_purge_drops_expired(make_store):
+    store = make_store(10)
+    store.put("old", 1, time.time() - 1)
+    store.put("new", 1, time.time() + 60)
+    store.purge()  # the memory store also sweeps on every put
+    assert store.get("old") is None
+    assert store.get("new") is not None and len(store) == 1
+
+
+def test_cap_evicts_the_soonest_expiring(make_store):
+    store = make_store(3)
+    now = time.time()
+    for i in range(5):
+        store.put(f"t{i}", 1, now + 100 - i)  # later tokens expire sooner
+    assert len(store) == 3
+    assert store.get("t4") is not None  # the token just written is kept
+    assert store.get("t0") is not None and store.get("t1") is not None
+
+
+def test_cap_holds_under_concurrent_puts(make_store):
+    store = make_store(50)
+    now = time.time()
+
+    def writer(n):
+        for i in range(100):
+            store.put(f"w{n}-{i}", 1, now + 60 + i)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(store) == 50
+
+
+def test_hmac_tokens_validate_without_a_store(monkeypatch):
+    monkeypatch.setattr(qr_service, "QR_TOKEN_MODE", "hmac")
+    token = qr_service.issue_token(7)
+    assert qr_service.validate_token(token) == (True, 7)
+    classroom_id, expires, signature = token.split(".")
+    assert qr_service.validate_token(f"8.{expires}.{signature}") == (False, "invalid")
+    expired = qr_service._signed_token(7, int(time.time()) - 1)
+    assert qr_service.validate_token(expired) == (False, "expired")
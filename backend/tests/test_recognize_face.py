@@ -0,0 +1,75 @@
+import io
+import json
+import multiprocessing
+
+import cv2
+import numpy as np
+import pytest
+
+from ml_models import recognize_face
+
+
+def _face(seed, size=48):
+    return np.random.default_rng(seed).integers(0, 255, (size, size), dtype=np.uint8)
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    """A two-label LBPH model, loaded into this process as the batch workers do."""
+    path = str(tmp_path / "face_model.yml")
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train([_face(1), _face(2)], np.array([7, 9]))
+    recognizer.write(path)
+    monkeypatch.setattr(recognize_face, "MODEL_PATH", path)
+    recognize_face._init_worker(single_thread=False)
+    return path
+
+
+class WholeImageCascade:
+    """Stands in for the Haar cascade: one face covering the (downscaled) image."""
+    def detectMultiScale(self, img, **kwargs):
+        return [(0, 0, img.shape[1], img.shape[0])]
+
+
+def test_iter_paths_expands_dirs_and_lists(tmp_path):
+    (tmp_path / "frames" / "sub").mkdir(parents=True)
+    for name in ("frames/b.jpg", "frames/a.PNG", "frames/notes.txt", "frames/sub/c.jpeg"):
+        (tmp_path / name).write_bytes(b"")
+    listing = tmp_path / "list.txt"
+    listing.write_text("x.jpg\n\ny.jpg\n")
+
+    paths = list(recognize_face.iter_paths([str(tmp_path / "frames"), "@" + str(listing), "z.bmp"]))
+    assert [p.replace(str(tmp_path), "") for p in paths[:3]] == ["/frames/a.PNG", "/frames/b.jpg", "/frames/sub/c.jpeg"]
+    assert paths[3:] == ["x.jpg", "y.jpg", "z.bmp"]
+
+
+def test_prediction_uses_the_full_resolution_crop(model, tmp_path, monkeypatch):
+    path = str(tmp_path / "big.png")
+    cv2.imwrite(path, cv2.resize(_face(2), (960, 960), interpolation=cv2.INTER_NEAREST))
+    monkeypatch.setattr(recognize_face, "_cascade", WholeImageCascade())
+
+    result = recognize_face.recognize_one(path)
+    assert result["faces"] == 1 and result["label"] == 9
+    assert set(result["timings_ms"]) == {"read", "detect", "predict", "total"}
+
+
+def test_bad_frames_are_reported_not_raised(model, tmp_path):
+    garbage = tmp_path / "garbage.jpg"
+    garbage.write_bytes(b"not an image")
+    assert recognize_face.recognize_one(str(garbage))["error"] == "unreadable"
+    assert recognize_face.recognize_one(None)["error"]  # exceptions become an error field
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="workers must inherit the patched MODEL_PATH")
+def test_run_batch_streams_one_line_per_image(model, tmp_path):
+    frames = tmp_path / "frames"
+    frames.mkdir()
+    for i in range(5):
+        cv2.imwrite(str(frames / f"{i}.png"), _face(i, size=64))
+    (frames / "broken.jpg").write_bytes(b"broken")
+
+    out = io.StringIO()
+    assert recognize_face.run_batch([str(frames)], workers=2, out=out, chunksize=2) == 6
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(r["path"] for r in results) == sorted(str(p) for p in frames.iterdir())
+    assert [r for r in results if r.get("error")][0]["path"].endswith("broken.jpg")
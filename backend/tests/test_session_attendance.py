@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from conftest import register
+from models.active_session import ActiveSession
+from models.student_model import Student
+from models.user_model import User
+from services import attendance_summary
+from utils.db import async_engine
+
+
+def _mark(db, usns, session_id="sess-1"):
+    start = datetime(2024, 1, 5, 9, 0)
+    attendance_summary.insert_marks(db, [
+        {"user_usn": usn, "session_id": session_id, "classroom_id": 1, "subject": "DS",
+         "qr_match": True, "location_match": True, "face_match": True, "marked_by_teacher": False,
+         "timestamp": start + timedelta(minutes=i)}
+        for i, usn in enumerate(usns)
+    ])
+    db.commit()
+
+
+def _students(client, n):
+    usns = [f"S{i}" for i in range(n)]
+    for i, usn in enumerate(usns):
+        register(client, usn, f"stud{i}")
+    return usns
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self)
+
+
+def test_polling_with_since_id_returns_only_new_rows(client, db):
+    teacher = register(client, "T1", "teach", is_teacher=True)
+    usns = _students(client, 5)
+    _mark(db, usns[:3])
+
+    first = client.get("/attendance/session/sess-1", params={"limit": 2}, headers=teacher).json()
+    assert [r["usn"] for r in first["records"]] == ["S1", "S0"]  # newest first within a page
+    assert first["has_more"] and first["records"][0]["student_name"] == "stud1"
+    assert (first["present_count"], first["total_students"]) == (3, 5)
+
+    second = client.get("/attendance/session/sess-1", params={"since_id": first["cursor"]}, headers=teacher).json()
+    assert [r["usn"] for r in second["records"]] == ["S2"] and not second["has_more"]
+
+    idle = client.get("/attendance/session/sess-1", params={"since_id": second["cursor"]}, headers=teacher).json()
+    assert idle["records"] == [] and idle["cursor"] == second["cursor"]
+    assert idle["present_count"] == 3  # stats still come back on an empty poll
+
+    _mark(db, usns[3:])
+    latest = client.get("/attendance/session/sess-1", params={"since_id": idle["cursor"]}, headers=teacher).json()
+    assert [r["usn"] for r in latest["records"]] == ["S4", "S3"]
+
+
+def test_statement_count_does_not_grow_with_rows(client, db):
+    teacher = register(client, "T1", "teach", is_teacher=True)
+    usns = _students(client, 6)
+    _mark(db, usns[:1], session_id="small")
+    _mark(db, usns, session_id="big")
+
+    counts = []
+    for session_id in ("small", "big"):
+        client.get(f"/attendance/session/{session_id}", headers=teacher)  # warm the session cache
+        with StatementCounter() as counter:
+            body = client.get(f"/attendance/session/{session_id}", headers=teacher).json()
+        counts.append(counter.count)
+        assert all(r["student_name"] for r in body["records"])
+    assert 0 < counts[0] == counts[1]
+
+
+def test_total_students_is_the_sessions_section(client, db):
+    teacher = register(client, "T1", "teach", is_teacher=True)
+    usns = _students(client, 3)
+    for usn, section in zip(usns, ["A", "A", "B"]):
+        user = db.query(User).filter(User.usn == usn).one()
+        db.add(Student(user_id=user.id, usn=usn, name=user.name, email=user.email, section=section))
+    db.add(ActiveSession(session_id="sec-a", subject="DS", teacher_id="T1", active=True, section="A",
+                         created_at=datetime.utcnow(), expires_at=datetime.utcnow() + timedelta(minutes=10)))
+    db.commit()
+    _mark(db, usns[:1], session_id="sec-a")
+
+    body = client.get("/attendance/session/sec-a", headers=teacher).json()
+    assert (body["present_count"], body["total_students"]) == (1, 2)
+    assert body["percentage"] == 50
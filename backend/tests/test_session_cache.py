@@ -0,0 +1,87 @@
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from conftest import register
+from models.active_session import ActiveSession
+from services import session_cache
+from utils.config import CACHE_VERSION_DIR
+from utils.version_counter import VersionCounter
+
+
+def _add(db, session_id, active=True):
+    now = datetime.utcnow()
+    db.add(ActiveSession(session_id=session_id, subject="DS", teacher_id="T1", active=active,
+                         created_at=now, expires_at=now + timedelta(minutes=10)))
+    db.commit()
+
+
+def _deactivate_behind_the_caches_back(db, session_id):
+    db.execute(update(ActiveSession).where(ActiveSession.session_id == session_id).values(active=False))
+    db.commit()
+
+
+def test_lookups_are_served_from_the_cache_until_invalidated(db):
+    _add(db, "s1")
+    assert session_cache.get_session(db, "s1").active
+    _deactivate_behind_the_caches_back(db, "s1")
+    assert session_cache.get_session(db, "s1").active  # cached
+
+    session_cache.invalidate()
+    assert not session_cache.get_session(db, "s1").active
+
+
+def test_misses_are_cached_too(db):
+    assert session_cache.get_session(db, "later") is None
+    _add(db, "later")
+    assert session_cache.get_session(db, "later") is None
+    session_cache.invalidate()
+    assert session_cache.get_session(db, "later") is not None
+
+
+def test_another_workers_invalidate_drops_our_copy(db):
+    _add(db, "s1")
+    session_cache.get_session(db, "s1")
+    _deactivate_behind_the_caches_back(db, "s1")
+
+    # Another worker: its own mapping of the same counter file
+    VersionCounter(os.path.join(CACHE_VERSION_DIR, "active_sessions.version")).bump()
+    assert not session_cache.get_session(db, "s1").active
+
+
+def test_a_read_racing_an_invalidate_is_not_cached(db):
+    _add(db, "s1")
+
+    class RacingSession:
+        """Reads the row, then a writer commits and invalidates before we store it."""
+        def execute(self, stmt):
+            result = db.execute(stmt)
+            _deactivate_behind_the_caches_back(db, "s1")
+            session_cache.invalidate()
+            return result
+
+    assert session_cache.get_session(RacingSession(), "s1").active  # the (old) row it read
+    assert not session_cache.get_session(db, "s1").active  # ... but that was not cached
+
+
+def test_ttl_bounds_staleness(db, monkeypatch):
+    _add(db, "s1")
+    session_cache.get_session(db, "s1")
+    _deactivate_behind_the_caches_back(db, "s1")
+    monkeypatch.setattr(session_cache, "SESSION_CACHE_TTL_SECONDS", 1e-9)
+    assert not session_cache.get_session(db, "s1").active
+
+
+def test_generate_and_stop_invalidate(client, db):
+    teacher = register(client, "T1", "teach", is_teacher=True)
+    assert client.get("/qr/active-session").json() == {"active": False}
+
+    session_id = client.post("/qr/generate", json={"subject": "DS", "teacher_id": "T1"},
+                             headers=teacher).json()["session_id"]
+    assert client.get("/qr/active-session").json()["session_id"] == session_id
+    assert client.get(f"/qr/verify/{session_id}").json()["valid"]
+
+    client.post("/qr/stop", json={"session_id": session_id}, headers=teacher)
+    assert client.get("/qr/active-session").json() == {"active": False}
+    assert client.get(f"/qr/verify/{session_id}").status_code == 400
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from models.active_session import ActiveSession
+from services import session_cache, session_sweeper
+from utils.db import async_engine
+
+
+def _session(db, session_id, expires_in):
+    now = datetime.utcnow()
+    db.add(ActiveSession(session_id=session_id, subject="DS", teacher_id="T1", active=True,
+                         created_at=now, expires_at=now + timedelta(seconds=expires_in)))
+    db.commit()
+
+
+def _active(db):
+    db.expire_all()
+    return sorted(db.execute(select(ActiveSession.session_id).where(ActiveSession.active == True)).scalars())
+
+
+async def _sweep():
+    try:
+        return await session_sweeper.sweep()
+    finally:
+        await async_engine.dispose()  # connections belong to this test's event loop
+
+
+def test_sweep_expires_past_sessions_and_reports_the_next(db):
+    _session(db, "old", -60)
+    _session(db, "soon", 30)
+    _session(db, "later", 600)
+
+    expired, until_next = asyncio.run(_sweep())
+    assert expired == 1
+    assert until_next == pytest.approx(30, abs=5)
+    assert _active(db) == ["later", "soon"]
+    assert asyncio.run(_sweep())[0] == 0  # idempotent
+
+
+def test_sweep_with_nothing_active(db):
+    assert asyncio.run(_sweep()) == (0, None)
+
+
+def test_expiring_a_session_invalidates_the_cache(db):
+    _session(db, "old", -60)
+    assert session_cache.get_session(db, "old").active
+    asyncio.run(_sweep())
+    assert not session_cache.get_session(db, "old").active
+
+
+@pytest.fixture
+def no_sweeper(monkeypatch):
+    monkeypatch.setattr(session_sweeper, "start", lambda: None)
+
+
+def test_active_session_poll_is_read_only(no_sweeper, client, db):
+    _session(db, "old", -60)
+    assert client.get("/qr/active-session").json() == {"active": False}
+    assert _active(db) == ["old"]  # left for the sweeper
+
+
+def test_stop_waits_for_a_running_sweep(db, monkeypatch):
+    events = []
+
+    async def slow_sweep():
+        events.append("start")
+        await asyncio.sleep(0.05)
+        events.append("end")
+        return 0, None
+
+    monkeypatch.setattr(session_sweeper, "sweep", slow_sweep)
+
+    async def start_then_stop():
+        session_sweeper.start()
+        await asyncio.sleep(0.01)
+        await session_sweeper.stop()
+
+    asyncio.run(start_then_stop())
+    assert events == ["start", "end"]  # never cancelled halfway through its transaction
@@ -0,0 +1,55 @@
+from sqlalchemy import func, select
+
+from conftest import register
+from models.attendance_model import Attendance
+from services import attendance_summary
+
+
+def _attendance_rows(db):
+    db.expire_all()
+    return db.execute(select(func.count(Attendance.id))).scalar()
+
+
+def test_override_is_bulk_and_idempotent(client, db):
+    teacher = register(client, "T1", "teach", is_teacher=True)
+    register(client, "S1", "stud1")
+    register(client, "S2", "stud2")
+    body = {"subject": "Data Structures", "usns": ["S1", "S2", "S1", "NOPE"]}
+
+    first = client.post("/teacher/mark", json=body, headers=teacher).json()
+    assert first["marked"] == ["S1", "S2"]
+    assert first["invalid"] == ["NOPE"] and first["already_present"] == []
+    assert first["session_id"].startswith("manual-T1-Data_Structures-")
+
+    again = client.post("/teacher/mark", json=body, headers=teacher).json()
+    assert again["marked"] == [] and again["already_present"] == ["S1", "S2"]
+    assert again["session_id"] == first["session_id"]
+    assert _attendance_rows(db) == 2
+
+    held, students = attendance_summary.for_subject(db, "Data Structures")
+    assert held == 1  # the manual session counts once, however often it is overridden
+    assert {s["usn"]: s["teacher_marked"] for s in students} == {"S1": 1, "S2": 1}
+
+
+def test_override_into_a_session_needs_ownership(client, db):
+    t1 = register(client, "T1", "teach1", is_teacher=True)
+    t2 = register(client, "T2", "teach2", is_teacher=True)
+    register(client, "S1", "stud1")
+    qr_session = client.post("/qr/generate", json={"subject": "DS", "teacher_id": "T1"},
+                             headers=t1).json()["session_id"]
+
+    def mark(headers, session_id):
+        return client.post("/teacher/mark", json={"subject": "DS", "usns": ["S1"], "session_id": session_id},
+                           headers=headers)
+
+    assert mark(t2, qr_session).status_code == 403
+    assert mark(t2, "manual-T1-DS-20240105").status_code == 403
+    assert mark(t2, "unknown-session").status_code == 403
+    assert mark(t1, qr_session).json()["marked"] == ["S1"]
+    assert mark(t1, "manual-T1-DS-20240105").json()["marked"] == ["S1"]
+
+
+def test_override_validates_input(client, db):
+    teacher = register(client, "T1", "teach", is_teacher=True)
+    assert client.post("/teacher/mark", json={"usns": ["S1"]}, headers=teacher).status_code == 400
+    assert client.post("/teacher/mark", json={"subject": "DS", "usns": []}, headers=teacher).status_code == 400
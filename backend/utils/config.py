@@ -1,8 +1,73 @@
 import os
+from dotenv import load_dotenv
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+load_dotenv(os.path.join(BASE_DIR, ".env"))
 
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'attendance.db')}")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")  # derived from DATABASE_URL when unset
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; below MySQL wait_timeout
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
 JWT_SECRET = os.getenv("JWT_SECRET", "supersecretkey")  # change in prod
 JWT_ALGORITHM = "HS256"
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "50000"))  # verified tokens kept in memory per worker
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))  # re-resolve the caller's user this often
 QR_EXPIRY_SECONDS = 60 * 5  # QR valid for 5 minutes
+QR_TOKEN_MODE = os.getenv("QR_TOKEN_MODE", "memory")  # memory | sqlite (shared by workers) | hmac (stateless)
+QR_TOKEN_STORE_PATH = os.getenv("QR_TOKEN_STORE_PATH", os.path.join(BASE_DIR, "run", "qr_tokens.sqlite3"))
+QR_TOKEN_STORE_MAX = int(os.getenv("QR_TOKEN_STORE_MAX", "10000"))  # hard cap: each put evicts the soonest-expiring beyond it
+QR_TOKEN_SECRET = os.getenv("QR_TOKEN_SECRET", JWT_SECRET)  # signs hmac-mode QR tokens + rotating payloads
+QR_ROTATE_SECONDS = int(os.getenv("QR_ROTATE_SECONDS", "15"))  # a session's QR payload changes this often
+QR_IMAGE_CACHE_SIZE = int(os.getenv("QR_IMAGE_CACHE_SIZE", "256"))  # pre-rendered PNGs kept (2 per active session)
+# /attendance/mark must carry a scanned payload or scan receipt. Set to 0 only
+# while rolling out, until every student client sends one (StudentDashboard.jsx does)
+QR_REQUIRE_ROTATING_CODE = os.getenv("QR_REQUIRE_ROTATING_CODE", "1") == "1"
+QR_SCAN_RECEIPT_SECONDS = int(os.getenv("QR_SCAN_RECEIPT_SECONDS", "180"))  # scan -> mark grace (location + face steps)
+QR_STREAM_TICKET_SECONDS = int(os.getenv("QR_STREAM_TICKET_SECONDS", "60"))  # projector SSE connect ticket
+
+# Face verification
+FACE_MODEL_NAME = os.getenv("FACE_MODEL_NAME", "VGG-Face")
+FACE_DISTANCE_THRESHOLD = float(os.getenv("FACE_DISTANCE_THRESHOLD", "0.68"))  # cosine, VGG-Face default
+FACE_DATA_DIR = os.getenv("FACE_DATA_DIR", os.path.join(BASE_DIR, "face_data"))
+FACE_PRELOAD = os.getenv("FACE_PRELOAD", "1") == "1"  # set 0 on workers that never serve face routes
+FACE_NOT_READY_RETRY_AFTER = 5  # seconds
+FACE_BATCH_MAX_SIZE = int(os.getenv("FACE_BATCH_MAX_SIZE", "16"))
+FACE_BATCH_MAX_WAIT_MS = float(os.getenv("FACE_BATCH_MAX_WAIT_MS", "10"))
+FACE_POOL_WORKERS = int(os.getenv("FACE_POOL_WORKERS", "2"))  # 0 = run inference in-process
+FACE_QUEUE_LIMIT = int(os.getenv("FACE_QUEUE_LIMIT", "64"))  # queued + in-flight images before 503
+FACE_BUSY_RETRY_AFTER = 2  # seconds
+FACE_GROUP_DETECTOR = os.getenv("FACE_GROUP_DETECTOR", "opencv")  # detector for classroom photos
+FACE_INDEX_PATH = os.getenv("FACE_INDEX_PATH", os.path.join(FACE_DATA_DIR, "face_index.npz"))
+FACE_INDEX_NPROBE = int(os.getenv("FACE_INDEX_NPROBE", "8"))  # IVF lists scanned per query
+FACE_CROP_SIZE = int(os.getenv("FACE_CROP_SIZE", "224"))  # stored reference face is size x size
+
+# Attendance write-behind ingestion (POST /attendance/mark)
+ATTENDANCE_WRITE_BEHIND = os.getenv("ATTENDANCE_WRITE_BEHIND", "1") == "1"  # 0 = insert + commit per request
+ATTENDANCE_LOG_DIR = os.getenv("ATTENDANCE_LOG_DIR", os.path.join(BASE_DIR, "ingest_log"))
+ATTENDANCE_LOG_FSYNC = os.getenv("ATTENDANCE_LOG_FSYNC", "1") == "1"  # fsync each append before acking
+ATTENDANCE_FLUSH_INTERVAL_MS = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL_MS", "200"))
+ATTENDANCE_FLUSH_BATCH = int(os.getenv("ATTENDANCE_FLUSH_BATCH", "500"))  # rows per INSERT + COMMIT
+
+# Geofence (location check against the classrooms table)
+GEOFENCE_DEFAULT_RADIUS_M = float(os.getenv("GEOFENCE_DEFAULT_RADIUS_M", "100"))  # rooms without radius_m
+GEOFENCE_CELL_DEG = float(os.getenv("GEOFENCE_CELL_DEG", "0.002"))  # grid cell size (~220 m of latitude)
+GEOFENCE_REFRESH_SECONDS = float(os.getenv("GEOFENCE_REFRESH_SECONDS", "60"))  # reload rooms at least this often (scripts/set_classroom.py: at once)
+# Used when the classrooms table is empty (the original single hardcoded room)
+GEOFENCE_FALLBACK_LAT = float(os.getenv("GEOFENCE_FALLBACK_LAT", "12.934533"))
+GEOFENCE_FALLBACK_LON = float(os.getenv("GEOFENCE_FALLBACK_LON", "77.605000"))
+
+# In-process caches (invalidated across workers via version files in CACHE_VERSION_DIR)
+CACHE_VERSION_DIR = os.getenv("CACHE_VERSION_DIR", os.path.join(BASE_DIR, "run"))
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "5"))  # 0 disables the cache
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))  # entries per map (name, user, teacher)
+
+# Background expiry of QR sessions (sleeps until the next expiry, at most this long)
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "30"))
+
+# Password hashing (bcrypt) - runs on its own bounded pool, see services/auth_service.py
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # hashes with another cost are upgraded on login
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(os.cpu_count() or 2)))  # concurrent bcrypt ops
+AUTH_HASH_QUEUE_LIMIT = int(os.getenv("AUTH_HASH_QUEUE_LIMIT", "256"))  # queued + running before 503
+AUTH_BUSY_RETRY_AFTER = 2  # seconds
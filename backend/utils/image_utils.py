@@ -0,0 +1,31 @@
+# Shared in-memory image decoding for the face routes (no temp files)
+import base64
+import binascii
+import cv2
+import numpy as np
+
+
+def decode_base64(data: str):
+    """Return raw bytes from a base64 string or a "data:image/...;base64," URL."""
+    if "," in data:
+        data = data.split(",", 1)[1]  # Remove "data:image/jpeg;base64,"
+    try:
+        return base64.b64decode(data)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid base64 image data")
+
+
+def decode_image(data):
+    """
+    Decode an uploaded image into a BGR NumPy array with cv2.imdecode.
+    Accepts raw bytes or a base64 string / data URL.
+    Raises ValueError if the data is not a readable image.
+    """
+    if isinstance(data, str):
+        data = decode_base64(data)
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    img = cv2.imdecode(buf, cv2.IMREAD_COLOR) if buf.size else None
+    if img is None:
+        raise ValueError("Invalid image data")
+    return img
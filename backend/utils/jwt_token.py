@@ -1,7 +1,13 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from fastapi import HTTPException, Header
+from fastapi import HTTPException, Header, Request
+from fastapi.concurrency import run_in_threadpool
+import hashlib
+import threading
+import time
 import jwt
-from utils.config import JWT_SECRET, JWT_ALGORITHM
+from utils import metrics
+from utils.config import JWT_SECRET, JWT_ALGORITHM, PRINCIPAL_CACHE_TTL_SECONDS, TOKEN_CACHE_SIZE
 
 def create_access_token(data: dict, expires_minutes: int = 60*24):
     """Create a JWT access token"""
@@ -19,25 +25,142 @@ def decode_access_token(token: str):
     except jwt.PyJWTError:
         return None
 
-def verify_token(authorization: str = Header(None)):
-    """
-    Verify JWT token from Authorization header
-    Used as a dependency in FastAPI routes
-    """
+# ---------------------------
+# Verified-claims cache: token digest -> claims (+ principal), kept until exp
+# (the principal is refreshed sooner, see get_principal)
+# ---------------------------
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _digest(token: str):
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def _cached_entry(digest: bytes):
+    with _cache_lock:
+        entry = _cache.get(digest)
+        if entry is None:
+            return None
+        if entry["exp"] <= time.time():
+            del _cache[digest]
+            return None
+        _cache.move_to_end(digest)
+        return entry
+
+
+def _cache_claims(digest: bytes, payload: dict):
+    exp = payload.get("exp")
+    if exp is None:
+        return  # tokens without exp are never cached
+    with _cache_lock:
+        _cache[digest] = {"claims": payload, "exp": float(exp), "principal": None}
+        while len(_cache) > TOKEN_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _bearer_token(authorization: str):
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header missing")
-    
+
     # Check if it starts with "Bearer "
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid authorization format")
-    
+
     # Extract token
-    token = authorization.split(" ")[1]
-    
+    return authorization.split(" ")[1]
+
+
+def _verified(authorization: str):
+    """(cache entry or None, claims) for the header; the token is hashed once per call."""
+    token = _bearer_token(authorization)
+    digest = _digest(token)
+
+    entry = _cached_entry(digest)
+    if entry is not None:
+        metrics.inc("token_cache.hit")
+        return entry, entry["claims"]
+    metrics.inc("token_cache.miss")
+
     # Decode and verify token
     payload = decode_access_token(token)
-    
+
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
-    
-    return payload
+
+    _cache_claims(digest, payload)
+    return _cached_entry(digest), payload
+
+
+def verify_token(authorization: str = Header(None)):
+    """
+    Verify JWT token from Authorization header
+    Used as a dependency in FastAPI routes
+
+    Verified claims are cached by token digest until the token's exp, so
+    repeat requests skip parsing and the HMAC check.
+    """
+    return dict(_verified(authorization)[1])
+
+
+# ---------------------------
+# Request-scoped principal
+# ---------------------------
+class Principal:
+    """
+    Who is calling: resolved from the token's usn and cached with the token's
+    claims, until identity_cache is invalidated or PRINCIPAL_CACHE_TTL_SECONDS pass.
+    """
+
+    __slots__ = ("user_id", "usn", "name", "is_teacher", "teacher_profile_id")
+
+    def __init__(self, user, teacher=None):
+        self.user_id = user.id
+        self.usn = user.usn
+        self.name = user.name
+        self.is_teacher = bool(user.is_teacher)
+        self.teacher_profile_id = teacher.id if teacher is not None else None
+
+
+def _load_principal(usn: str):
+    # Lazy: services import this module for verify_token
+    from services import identity_cache
+    from utils.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        user = identity_cache.user_by_usn(db, usn)
+        if user is None:
+            return None
+        teacher = identity_cache.teacher_by_usn(db, usn) if user.is_teacher else None
+        return Principal(user, teacher)
+    finally:
+        db.close()
+
+
+async def get_principal(request: Request, authorization: str = Header(None)):
+    """
+    Dependency returning the caller's Principal (also set on request.state.principal).
+    FastAPI resolves it once per request; the user lookup is cached with the token.
+    A valid token whose user no longer exists gets 401.
+
+    async so the hot async routes don't hop to the threadpool for it: a cache
+    hit stays on the event loop, only a miss (database lookup) goes to a thread.
+    """
+    from services import identity_cache
+
+    entry, claims = _verified(authorization)
+    version = identity_cache.version()
+    cached = entry["principal"] if entry is not None else None
+    if cached is not None and cached[1] == version and time.monotonic() - cached[2] < PRINCIPAL_CACHE_TTL_SECONDS:
+        metrics.inc("principal_cache.hit")
+        principal = cached[0]
+    else:
+        metrics.inc("principal_cache.miss")
+        principal = await run_in_threadpool(_load_principal, claims.get("usn"))
+        if principal is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        if entry is not None:
+            entry["principal"] = (principal, version, time.monotonic())
+    request.state.principal = principal
+    return principal
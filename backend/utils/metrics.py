@@ -0,0 +1,40 @@
+# Minimal in-process metrics registry, exposed as JSON at GET /metrics
+import threading
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_summaries = {}
+
+
+def inc(name: str, value: float = 1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float):
+    """Record one sample (count / sum / max / last) for a distribution-like metric."""
+    with _lock:
+        s = _summaries.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0, "last": 0.0})
+        s["count"] += 1
+        s["sum"] += value
+        s["max"] = max(s["max"], value)
+        s["last"] = value
+
+
+def snapshot():
+    with _lock:
+        summaries = {
+            name: dict(s, avg=(s["sum"] / s["count"]) if s["count"] else 0.0)
+            for name, s in _summaries.items()
+        }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "summaries": summaries
+        }
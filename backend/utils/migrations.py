@@ -0,0 +1,299 @@
+# utils/migrations.py
+#
+# Versioned schema migrations. create_all() only creates missing tables, it
+# never alters existing ones, so changes to existing tables (new indexes,
+# constraints, columns) are added here as numbered steps. The applied
+# version is kept in the schema_version table.
+#
+# Migrations are applied only by scripts/migrate.py (run it once per deploy,
+# before starting the workers); the app just checks the version at startup
+# (check_schema). Some steps rewrite data, and MySQL commits every DDL
+# statement on its own, so a step is only atomic up to its first DDL: each
+# function must also be safe to re-run after failing halfway.
+#
+# Add a migration by appending (version, description, function) to MIGRATIONS.
+# Each function gets a connection inside a transaction and must be safe to
+# run on a database that create_all() just built (use checkfirst / inspect).
+# Migrations must not call service code: a step has to do the same thing
+# whenever it runs, so freeze any SQL it needs inside the migration.
+
+import hashlib
+import re
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, bindparam, case, func, inspect, literal, or_, select, text
+)
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateColumn
+
+_meta = MetaData()
+schema_version = Table(
+    "schema_version", _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _create_index(conn, table_name: str, index_name: str):
+    """Create an index declared on a model (models are the single source of truth)."""
+    from utils.db import Base
+
+    table = Base.metadata.tables[table_name]
+    index = next(i for i in table.indexes if i.name == index_name)
+    existing = {i["name"] for i in inspect(conn).get_indexes(table_name)}
+    if index_name not in existing:
+        index.create(conn)
+
+
+def _add_column(conn, table_name: str, column_name: str):
+    """Add a column declared on a model to an existing table, if missing."""
+    from utils.db import Base
+
+    column = Base.metadata.tables[table_name].c[column_name]
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if column_name not in existing:
+        ddl = CreateColumn(column).compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+
+
+def table_of(conn, table_name: str):
+    """Reflect the table as it exists in the database (not as the model says)."""
+    return Table(table_name, MetaData(), autoload_with=conn)
+
+
+# ---------------------------
+# Migrations
+# ---------------------------
+def _m001_hot_query_indexes(conn):
+    _create_index(conn, "attendance", "ix_attendance_session_id_id")
+    _create_index(conn, "attendance", "ix_attendance_user_usn_timestamp")
+    _create_index(conn, "attendance", "ix_attendance_subject_timestamp")
+    _create_index(conn, "users", "ix_users_name")
+
+
+_DAY_SUFFIX = re.compile(r"-\d{8}$")
+_MANUAL_DAY_ID = re.compile(r"^manual-(?P<body>.+)-\d{8}$")
+DUPLICATES_ARCHIVE = "attendance_duplicates_archive"
+
+
+def _day_key(session_id: str, ts, max_len: int):
+    """<session_id>-YYYYMMDD, shortening over-long ids to prefix~hash so the column still fits."""
+    key = f"{session_id}-{ts:%Y%m%d}"
+    if len(key) <= max_len:
+        return key
+    digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()[:8]
+    return f"{session_id[:max_len - len(digest) - 10]}~{digest}-{ts:%Y%m%d}"
+
+
+def _manual_teacher(session_id: str, subject: str):
+    """
+    Teacher usn of a manual-<teacher usn>-<subject>-<YYYYMMDD> id, or None.
+    Usns and subjects may contain "-", so the subject part (built from the
+    row's subject as the override route does) is stripped from the end rather
+    than splitting on "-". Ids shortened by _day_key can't be parsed.
+    """
+    match = _MANUAL_DAY_ID.match(session_id)
+    subject_key = "-" + (subject or "").replace(" ", "_")
+    if not match or "~" in session_id or not match["body"].endswith(subject_key):
+        return None
+    return match["body"][:-len(subject_key)] or None
+
+
+def _m002_attendance_unique_session_user(conn):
+    attendance = table_of(conn, "attendance")
+    max_len = attendance.c.session_id.type.length or 100
+
+    # DDL first: on MySQL it commits by itself, so everything after it (the
+    # re-key, archive and delete) stays in one transaction. Every statement
+    # below is also a no-op on a second run.
+    archive = Table(DUPLICATES_ARCHIVE, MetaData(), *[Column(c.name, c.type) for c in attendance.columns])
+    archive.create(conn, checkfirst=True)
+
+    # Manual overrides used one session id per (teacher, subject) forever;
+    # they are now per day. Re-key legacy rows so different days don't collide.
+    legacy = [
+        {"row_id": row_id, "new_session_id": _day_key(session_id, ts, max_len)}
+        for row_id, session_id, ts in conn.execute(
+            select(attendance.c.id, attendance.c.session_id, attendance.c.timestamp)
+            .where(attendance.c.session_id.like("manual-%"))
+        )
+        if ts is not None and not _DAY_SUFFIX.search(session_id)
+    ]
+    if legacy:
+        conn.execute(
+            attendance.update()
+            .where(attendance.c.id == bindparam("row_id"))
+            .values(session_id=bindparam("new_session_id")),
+            legacy
+        )
+
+    # True duplicates (same student, same session) keep their first row; the
+    # others are copied to attendance_duplicates_archive before being deleted.
+    # The extra derived table is required by MySQL for DELETE ... WHERE id IN (SELECT ... same table).
+    duplicates = (
+        "id NOT IN ("
+        " SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM attendance GROUP BY session_id, user_usn) AS keep"
+        ")"
+    )
+    removed = conn.execute(text(f"SELECT COUNT(*) FROM attendance WHERE {duplicates}")).scalar()
+    if removed:
+        names = ", ".join(c.name for c in attendance.columns)
+        conn.execute(text(
+            f"INSERT INTO {DUPLICATES_ARCHIVE} ({names}) SELECT {names} FROM attendance"
+            f" WHERE {duplicates} AND id NOT IN (SELECT id FROM {DUPLICATES_ARCHIVE})"
+        ))
+        conn.execute(text(f"DELETE FROM attendance WHERE {duplicates}"))
+        print(f"⚠️ Migration 2: moved {removed} duplicate attendance rows to {DUPLICATES_ARCHIVE}")
+        for session_id, usn, n in conn.execute(text(
+            f"SELECT session_id, user_usn, COUNT(*) FROM {DUPLICATES_ARCHIVE}"
+            " GROUP BY session_id, user_usn ORDER BY COUNT(*) DESC"
+        )).fetchmany(20):
+            print(f"   {session_id} / {usn}: {n} extra")
+    _create_index(conn, "attendance", "uq_attendance_session_user")
+
+
+def _m003_active_sessions_expiry_index(conn):
+    _create_index(conn, "active_sessions", "ix_active_sessions_active_expires_at")
+
+
+def _m004_attendance_summary_backfill(conn):
+    """attendance_summary as of this version (services/attendance_summary.py may change later)."""
+    attendance = table_of(conn, "attendance")
+    summary = table_of(conn, "attendance_summary")
+    active_sessions = table_of(conn, "active_sessions")
+    a = attendance.c
+    subject = func.coalesce(a.subject, "")
+    attended = or_(
+        a.marked_by_teacher.is_(None), a.marked_by_teacher == False,
+        a.qr_match == True, a.location_match == True, a.face_match == True
+    )
+
+    conn.execute(summary.delete())
+    conn.execute(summary.insert().from_select(
+        ["usn", "subject", "records", "attended", "teacher_marked", "face_verified", "sessions_held", "last_seen"],
+        select(
+            a.user_usn,
+            subject,
+            func.count(a.id),
+            func.sum(case((attended, 1), else_=0)),
+            func.sum(case((a.marked_by_teacher == True, 1), else_=0)),
+            func.sum(case((a.face_match == True, 1), else_=0)),
+            literal(0),
+            func.max(a.timestamp)
+        )
+        .where(a.user_usn.isnot(None))
+        .group_by(a.user_usn, subject)
+    ))
+
+    # Sessions held per subject on the usn "*" row: QR sessions + manual session ids
+    held = defaultdict(int)
+    for subj, n in conn.execute(
+        select(active_sessions.c.subject, func.count()).group_by(active_sessions.c.subject)
+    ):
+        held[subj or ""] += n
+    manual = {}
+    for session_id, subj in conn.execute(select(a.session_id, subject).where(a.session_id.like("manual-%")).distinct()):
+        manual.setdefault(session_id, subj)
+    for subj in manual.values():
+        held[subj or ""] += 1
+    if held:
+        conn.execute(summary.insert(), [
+            {"usn": "*", "subject": subj, "records": 0, "attended": 0,
+             "teacher_marked": 0, "face_verified": 0, "sessions_held": n, "last_seen": None}
+            for subj, n in held.items()
+        ])
+
+
+def _m005_geofence_columns(conn):
+    _add_column(conn, "classrooms", "radius_m")
+    _add_column(conn, "classrooms", "footprint")
+    _add_column(conn, "active_sessions", "classroom_id")
+
+
+def _m006_manual_sessions_backfill(conn):
+    """Register existing override sessions so their next override isn't counted as a new session."""
+    from utils.db import insert_ignore
+    attendance = table_of(conn, "attendance")
+    manual_sessions = table_of(conn, "manual_sessions")
+    rows, skipped = {}, 0
+    for session_id, subject in conn.execute(
+        select(attendance.c.session_id, attendance.c.subject)
+        .where(attendance.c.session_id.like("manual-%"))
+        .distinct()
+    ):
+        teacher = _manual_teacher(session_id, subject)
+        if teacher is None:
+            skipped += 1  # still counted by attendance_summary.rebuild() via the attendance rows
+            continue
+        rows.setdefault(session_id, {"session_id": session_id, "subject": subject or "", "teacher_id": teacher})
+    if skipped:
+        print(f"⚠️ Migration 6: skipped {skipped} manual session ids that don't parse as manual-<usn>-<subject>-<day>")
+    if rows:
+        rows = list(rows.values())
+        conn.execute(insert_ignore(manual_sessions), rows)
+
+
+def _m007_session_section(conn):
+    _add_column(conn, "active_sessions", "section")
+
+
+MIGRATIONS = [
+    (1, "attendance + users hot-query indexes", _m001_hot_query_indexes),
+    (2, "unique (session_id, user_usn) on attendance", _m002_attendance_unique_session_user),
+    (3, "active_sessions (active, expires_at) index", _m003_active_sessions_expiry_index),
+    (4, "backfill attendance_summary", _m004_attendance_summary_backfill),
+    (5, "classroom geofence columns + session classroom", _m005_geofence_columns),
+    (6, "backfill manual_sessions from override attendance", _m006_manual_sessions_backfill),
+    (7, "active_sessions section", _m007_session_section),
+]
+
+
+def current_version(conn):
+    return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+
+class SchemaOutOfDateError(RuntimeError):
+    """The database is behind the code: run scripts/migrate.py."""
+
+
+def check_schema(engine):
+    """Called at app startup instead of migrating: refuse to serve an unmigrated database."""
+    with engine.connect() as conn:
+        version = current_version(conn) if inspect(conn).has_table("schema_version") else 0
+    if version < latest_version():
+        raise SchemaOutOfDateError(
+            f"Database schema is at version {version}, the code needs {latest_version()}: "
+            f"run `python scripts/migrate.py` first"
+        )
+    return version
+
+
+def migrate(engine):
+    """Apply pending migrations in order (scripts/migrate.py). Returns the list of versions applied."""
+    schema_version.create(engine, checkfirst=True)
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        with engine.connect() as conn:
+            if current_version(conn) >= version:
+                continue
+        try:
+            with engine.begin() as conn:
+                fn(conn)
+                conn.execute(schema_version.insert().values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                ))
+            applied.append(version)
+            print(f"✅ Migration {version} applied: {description}")
+        except SQLAlchemyError:
+            # Another migrate.py run may have applied it concurrently
+            with engine.connect() as conn:
+                if current_version(conn) >= version:
+                    continue
+            raise
+    return applied
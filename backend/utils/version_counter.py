@@ -0,0 +1,48 @@
+# Cross-process version counter backed by a small mmap'd file.
+# Readers compare an 8-byte integer in shared memory (no syscall, no DB);
+# writers bump it under an flock. Workers use it to tell each other
+# "your in-process cache is stale".
+import fcntl
+import mmap
+import os
+import struct
+import threading
+
+_FMT = "<Q"
+_SIZE = struct.calcsize(_FMT)
+
+
+class VersionCounter:
+    def __init__(self, path: str):
+        self.path = path
+        self._map = None
+        self._lock = threading.Lock()
+
+    def _mapped(self):
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    try:
+                        if os.fstat(fd).st_size < _SIZE:
+                            os.ftruncate(fd, _SIZE)
+                        self._map = mmap.mmap(fd, _SIZE)
+                    finally:
+                        os.close(fd)  # the mapping keeps the file alive
+        return self._map
+
+    def get(self):
+        return struct.unpack_from(_FMT, self._mapped())[0]
+
+    def bump(self):
+        """Increment the shared counter and return the new value."""
+        m = self._mapped()
+        with open(self.path, "r+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                value = struct.unpack_from(_FMT, m)[0] + 1
+                struct.pack_into(_FMT, m, 0, value)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return value
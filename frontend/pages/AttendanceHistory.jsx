@@ -4,17 +4,21 @@ function AttendanceHistory({ user, onBack }) {
   const [records, setRecords] = useState([]);
   const [stats, setStats] = useState({ total: 0, attended: 0, percentage: 0 });
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchAttendanceHistory();
   }, []);
 
-  const fetchAttendanceHistory = async () => {
+  // Records come one page at a time (newest first); `cursor` asks for the next older page
+  const fetchAttendanceHistory = async (cursor = null) => {
     try {
       const token = localStorage.getItem("token");
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
       
       // Get user's USN from localStorage or user object
-      const response = await fetch(`http://localhost:5000/attendance/history/${user.name}`, {
+      const response = await fetch(`http://localhost:5000/attendance/history/${user.name}${query}`, {
         headers: {
           "Authorization": `Bearer ${token}`
         }
@@ -23,7 +27,8 @@ function AttendanceHistory({ user, onBack }) {
       const data = await response.json();
 
       if (response.ok) {
-        setRecords(data.records || []);
+        setRecords(prev => cursor ? [...prev, ...(data.records || [])] : (data.records || []));
+        setNextCursor(data.next_cursor || null);
         const totalRecords = data.total_records || 0;
         const attended = data.attended || 0;
         const percentage = totalRecords > 0 ? ((attended / totalRecords) * 100).toFixed(2) : 0;
@@ -38,9 +43,15 @@ function AttendanceHistory({ user, onBack }) {
       console.error("Error fetching attendance:", error);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    fetchAttendanceHistory(nextCursor);
+  };
+
   if (loading) {
     return (
       <div className="dashboard">
@@ -104,7 +115,7 @@ function AttendanceHistory({ user, onBack }) {
               </thead>
               <tbody>
                 {records.map((record, index) => (
-                  <tr key={record.id}>
+                  <tr key={record.id ?? `pending-${index}`}>
                     <td>{index + 1}</td>
                     <td>{new Date(record.timestamp).toLocaleString()}</td>
                     <td>{record.subject || 'N/A'}</td>
@@ -132,6 +143,11 @@ function AttendanceHistory({ user, onBack }) {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <button onClick={loadMore} className="btn" disabled={loadingMore}>
+                {loadingMore ? "Loading..." : "Load older records"}
+              </button>
+            )}
           </div>
         )}
       </div>
@@ -1,12 +1,15 @@
 import { useState, useEffect, useRef } from "react";
-import QRCode from "react-qr-code";
 import AttendanceHistory from "./AttendanceHistory";
 import FaceRegistration from "./FaceRegistration";
 
 function StudentDashboard({ user, onLogout }) {
   const [attendanceActive, setAttendanceActive] = useState(false);
   const [currentSession, setCurrentSession] = useState(null);
-  const [qrValue, setQrValue] = useState("");
+  const [qrReceipt, setQrReceipt] = useState(null);   // from /qr/scan, sent with the mark
+  const [scanning, setScanning] = useState(false);
+  const [manualCode, setManualCode] = useState("");
+  const scanVideoRef = useRef(null);
+  const scanTimerRef = useRef(null);
   const [step, setStep] = useState(1);
   const [location, setLocation] = useState(null);
   const [locationVerified, setLocationVerified] = useState(false);
@@ -40,22 +43,19 @@ function StudentDashboard({ user, onLogout }) {
               teacher_id: data.teacher_id
             });
 
-            setQrValue(JSON.stringify({
-              session_id: data.session_id,
-              subject: data.subject
-            }));
-
+            setQrReceipt(null);
             setMarkedSessionId(null);
             setAttendanceMarked(false);
             setStep(1);
             setLocation(null);
             setLocationVerified(false);
             setCameraActive(false);
+            stopScanner();
           }
         } else {
           setAttendanceActive(false);
           setCurrentSession(null);
-          setQrValue("");
+          setQrReceipt(null);
         }
       } catch (error) {
         console.log(error);
@@ -67,10 +67,74 @@ function StudentDashboard({ user, onLogout }) {
     return () => clearInterval(t);
   }, [showHistory, showFaceRegistration, currentSession?.session_id]);
 
-  // ---- QR Verify ----
-  const handleVerifyQR = () => {
-    setStep(2);
-    alert("✅ QR Code Verified!");
+  // ---- QR Scan (rotating code on the projector) ----
+  const stopScanner = () => {
+    clearInterval(scanTimerRef.current);
+    const stream = scanVideoRef.current?.srcObject;
+    if (stream) stream.getTracks().forEach((t) => t.stop());
+    setScanning(false);
+  };
+
+  useEffect(() => () => stopScanner(), []);
+
+  const submitScan = async (payload) => {
+    try {
+      const token = localStorage.getItem("token");
+      const res = await fetch("http://localhost:5000/qr/scan", {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${token}`
+        },
+        body: JSON.stringify({ payload: payload.trim() })
+      });
+
+      const data = await res.json();
+      if (!res.ok) {
+        alert(data.detail || "❌ Invalid QR code");
+        return false;
+      }
+      if (data.session_id !== currentSession.session_id) {
+        alert("❌ This QR belongs to a different session");
+        return false;
+      }
+
+      stopScanner();
+      setQrReceipt(data.qr_receipt);
+      setStep(2);
+      alert("✅ QR Code Verified!");
+      return true;
+    } catch (error) {
+      alert("Error verifying QR code");
+      return false;
+    }
+  };
+
+  const handleStartScan = async () => {
+    try {
+      const stream = await navigator.mediaDevices.getUserMedia({
+        video: { facingMode: "environment" }
+      });
+      scanVideoRef.current.srcObject = stream;
+      scanVideoRef.current.play();
+      setScanning(true);
+
+      if (!("BarcodeDetector" in window)) return;   // manual entry below
+      const detector = new window.BarcodeDetector({ formats: ["qr_code"] });
+      let busy = false;
+      scanTimerRef.current = setInterval(async () => {
+        if (busy || !scanVideoRef.current) return;
+        busy = true;
+        try {
+          const codes = await detector.detect(scanVideoRef.current);
+          if (codes.length) await submitScan(codes[0].rawValue);
+        } finally {
+          busy = false;
+        }
+      }, 500);
+    } catch (error) {
+      alert("❌ Cannot access camera");
+    }
   };
 
   // ---- Location ----
@@ -166,7 +230,8 @@ function StudentDashboard({ user, onLogout }) {
           session_id: currentSession.session_id,
           student_id: user.name,
           location,
-          face_image: faceImage
+          face_image: faceImage,
+          qr_receipt: qrReceipt
         })
       });
 
@@ -250,15 +315,39 @@ function StudentDashboard({ user, onLogout }) {
             {step === 1 && (
               <div className="text-center">
                 <h6 className="mt-3">Step 1: QR Verification</h6>
-                <p className="text-muted">QR Code detected!</p>
+                <p className="text-muted">Scan the QR code shown by your teacher.</p>
 
-                <div className="my-3">
-                  <QRCode value={qrValue} size={200} />
-                </div>
+                <video
+                  ref={scanVideoRef}
+                  muted
+                  playsInline
+                  style={{ width: "100%", maxWidth: "400px", borderRadius: "8px", display: scanning ? "inline-block" : "none" }}
+                />
 
-                <button className="btn btn-success btn-lg" onClick={handleVerifyQR}>
-                  ✓ Verify QR Code
-                </button>
+                {!scanning ? (
+                  <button className="btn btn-success btn-lg mt-3" onClick={handleStartScan}>
+                    📷 Scan QR Code
+                  </button>
+                ) : (
+                  <p className="text-muted mt-2">Point the camera at the QR code...</p>
+                )}
+
+                {/* Browsers without BarcodeDetector: paste the code from a scanner app */}
+                <div className="input-group mt-3 mx-auto" style={{ maxWidth: "400px" }}>
+                  <input
+                    className="form-control"
+                    placeholder="Or paste scanned code"
+                    value={manualCode}
+                    onChange={(e) => setManualCode(e.target.value)}
+                  />
+                  <button
+                    className="btn btn-outline-success"
+                    disabled={!manualCode.trim()}
+                    onClick={() => submitScan(manualCode)}
+                  >
+                    ✓ Verify
+                  </button>
+                </div>
               </div>
             )}
 
@@ -1,11 +1,15 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 
 function TeacherAttendanceView({ session, onBack }) {
   const [attendanceList, setAttendanceList] = useState([]);
   const [stats, setStats] = useState({ total: 0, present: 0, percentage: 0 });
   const [loading, setLoading] = useState(true);
+  const cursorRef = useRef(null);
 
   useEffect(() => {
+    // New session: start from scratch, then only fetch rows newer than the cursor
+    cursorRef.current = null;
+    setAttendanceList([]);
     fetchSessionAttendance();
     // Refresh every 5 seconds to show live updates
     const interval = setInterval(fetchSessionAttendance, 5000);
@@ -16,7 +20,8 @@ function TeacherAttendanceView({ session, onBack }) {
     try {
       const token = localStorage.getItem("token");
       
-      const response = await fetch(`http://localhost:5000/attendance/session/${session.session_id}`, {
+      const since = cursorRef.current !== null ? `?since_id=${cursorRef.current}` : "";
+      const response = await fetch(`http://localhost:5000/attendance/session/${session.session_id}${since}`, {
         headers: {
           "Authorization": `Bearer ${token}`
         }
@@ -25,7 +30,13 @@ function TeacherAttendanceView({ session, onBack }) {
       const data = await response.json();
 
       if (response.ok) {
-        setAttendanceList(data.records || []);
+        const newRecords = data.records || [];
+        // Pending marks come back on every poll until committed: replace by USN
+        setAttendanceList(prev => {
+          const seen = new Set(newRecords.map(r => r.usn));
+          return [...newRecords, ...prev.filter(r => !seen.has(r.usn))];
+        });
+        cursorRef.current = data.cursor ?? cursorRef.current;
         setStats({
           total: data.total_students || 0,
           present: data.present_count || 0,
@@ -7,12 +7,14 @@ function TeacherDashboard({ user, onLogout }) {
   const [attendanceActive, setAttendanceActive] = useState(false);
   const [qrValue, setQrValue] = useState("");
   const [selectedSubject, setSelectedSubject] = useState("");
+  const [section, setSection] = useState("");   // optional: roster for the present %
   const [sessionId, setSessionId] = useState("");
   const [loading, setLoading] = useState(false);
   const [showAttendanceView, setShowAttendanceView] = useState(false);
   const [showOverride, setShowOverride] = useState(false);
   const [currentSession, setCurrentSession] = useState(null);
   const [timeLeft, setTimeLeft] = useState(600);
+  const [qrImage, setQrImage] = useState("");   // rotating QR pushed by the server
 
   const [subjects, setSubjects] = useState([]);   // <-- FIXED: DB subjects
 
@@ -56,10 +58,61 @@ function TeacherDashboard({ user, onLogout }) {
     return () => clearInterval(interval);
   }, [attendanceActive, timeLeft]);
 
+  // ROTATING QR (server-sent events, new image every rotation)
+  useEffect(() => {
+    if (!attendanceActive || !sessionId) return;
+
+    let source = null;
+    let retry = null;
+    let closed = false;
+
+    // EventSource can't send the JWT header: connect with a short-lived ticket,
+    // and fetch a fresh one whenever the stream drops
+    const connect = async () => {
+      try {
+        const token = localStorage.getItem("token");
+        const res = await fetch(`http://localhost:5000/qr/stream-ticket/${sessionId}`, {
+          method: "POST",
+          headers: { "Authorization": `Bearer ${token}` }
+        });
+        if (!res.ok || closed) return;
+        const { ticket } = await res.json();
+
+        source = new EventSource(
+          `http://localhost:5000/qr/stream/${sessionId}?ticket=${encodeURIComponent(ticket)}`
+        );
+        source.onmessage = (e) => {
+          const data = JSON.parse(e.data);
+          setQrImage(data.image);
+          setQrValue(data.payload);
+        };
+        source.addEventListener("end", () => {
+          closed = true;
+          source.close();
+        });
+        source.onerror = () => {
+          source.close();
+          if (!closed) retry = setTimeout(connect, 2000);
+        };
+      } catch (error) {
+        console.error("QR stream error:", error);
+        if (!closed) retry = setTimeout(connect, 2000);
+      }
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
+  }, [attendanceActive, sessionId]);
+
   // RESET UI
   const resetUI = () => {
     setAttendanceActive(false);
     setQrValue("");
+    setQrImage("");
     setSessionId("");
     setCurrentSession(null);
     setTimeLeft(600);
@@ -83,7 +136,8 @@ function TeacherDashboard({ user, onLogout }) {
         },
         body: JSON.stringify({
           subject: selectedSubject,
-          teacher_id: user.usn
+          teacher_id: user.usn,
+          section: section.trim() || null
         })
       });
 
@@ -201,6 +255,15 @@ function TeacherDashboard({ user, onLogout }) {
                 ))}
               </select>
 
+              <input
+                className="form-control mb-3"
+                style={{ maxWidth: "400px", margin: "0 auto" }}
+                placeholder="Section (optional, e.g. A)"
+                value={section}
+                onChange={(e) => setSection(e.target.value)}
+                disabled={loading}
+              />
+
               <div className="mt-2">
                 <button
                   className="btn btn-primary me-3"
@@ -229,7 +292,11 @@ function TeacherDashboard({ user, onLogout }) {
               <p>Session ID: {sessionId}</p>
 
               <div className="my-3">
-                <QRCode value={qrValue} size={220} />
+                {qrImage ? (
+                  <img src={qrImage} alt="Attendance QR" width={220} height={220} />
+                ) : (
+                  <QRCode value={qrValue} size={220} />
+                )}
               </div>
 
               <button